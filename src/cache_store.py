@@ -0,0 +1,250 @@
+import os
+import time
+import glob
+import sqlite3
+import hashlib
+import threading
+
+DEFAULT_QUOTA_MB = 256
+FLUSH_EVERY = 64        # Pending index updates that trigger a write
+FLUSH_INTERVAL = 5.0    # Seconds after which pending index updates are written anyway
+EVICT_TARGET = 0.9      # Evict down to this fraction of the quota
+
+def get_app_data_dir():
+    return os.path.join(os.getenv('LOCALAPPDATA') or os.path.expanduser('~/.local/share'), 'MiniDexed_Service_Utility')
+
+def url_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+class CacheStore:
+    """
+    Content-addressed download cache shared by the voice and MIDI file browsers.
+    Entries are keyed by SHA-256 of the URL and point to a blob named by the
+    SHA-256 of its content, so identical downloads are stored once.
+    The index lives in SQLite but is held in memory: lookups never touch the disk
+    index, and hit counts / access times are written back in batches.
+    When the blobs exceed the quota, least recently used entries are evicted.
+    """
+    def __init__(self, root, quota_bytes=DEFAULT_QUOTA_MB * 1024 * 1024):
+        self.root = root
+        self.blob_dir = os.path.join(root, 'blobs')
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.quota_bytes = quota_bytes
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(root, 'index.sqlite'), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, blob TEXT NOT NULL, size INTEGER NOT NULL, "
+            "hits INTEGER NOT NULL DEFAULT 0, last_access REAL NOT NULL, created REAL NOT NULL)")
+        self._db.commit()
+        # key -> [blob, size, hits, last_access, created]
+        self._entries = {}
+        self._blob_refs = {}
+        self.total_size = 0
+        for key, blob, size, hits, last_access, created in self._db.execute("SELECT * FROM entries"):
+            self._add_entry(key, [blob, size, hits, last_access, created])
+        self._dirty = set()
+        self._deleted = set()
+        self._last_flush = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _add_entry(self, key, entry):
+        self._entries[key] = entry
+        refs = self._blob_refs.get(entry[0], 0)
+        if refs == 0:
+            self.total_size += entry[1]
+        self._blob_refs[entry[0]] = refs + 1
+
+    def _remove_entry(self, key):
+        self._release_blob(self._entries.pop(key))
+        self._dirty.discard(key)
+        self._deleted.add(key)
+
+    def _release_blob(self, entry):
+        refs = self._blob_refs[entry[0]] - 1
+        if refs:
+            self._blob_refs[entry[0]] = refs
+        else:
+            del self._blob_refs[entry[0]]
+            self.total_size -= entry[1]
+            try:
+                os.remove(self._blob_path(entry[0]))
+            except OSError:
+                pass
+
+    def _blob_path(self, blob):
+        return os.path.join(self.blob_dir, blob[:2], blob)
+
+    def _touch(self, key, entry):
+        entry[2] += 1
+        entry[3] = time.time()
+        self._dirty.add(key)
+        self._maybe_flush()
+
+    def contains(self, url):
+        # Presence check that does not count as a hit or miss (used by the prefetcher)
+        return url_key(url) in self._entries
+
+    def get_path(self, url):
+        """Return the local path of a cached download, or None."""
+        key = url_key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touch(key, entry)
+            return self._blob_path(entry[0])
+
+    def get(self, url):
+        """Return the cached bytes for url, or None."""
+        path = self.get_path(url)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            # Blob vanished behind our back; forget the entry
+            with self._lock:
+                key = url_key(url)
+                if key in self._entries:
+                    self._remove_entry(key)
+                self.hits -= 1
+                self.misses += 1
+            return None
+
+    def put(self, url, data):
+        """Store data for url and return the blob path."""
+        return self._put_key(url_key(url), data)
+
+    def _put_key(self, key, data):
+        blob = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(blob)
+        with self._lock:
+            if blob not in self._blob_refs:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + f'.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            old = self._entries.get(key)
+            now = time.time()
+            if old is not None and old[0] == blob:
+                # Same content again: keep the blob, only refresh the entry
+                old[3] = now
+            else:
+                # Reference the new blob before the old one is released (and possibly deleted)
+                self._add_entry(key, [blob, len(data), 0, now, now])
+                if old is not None:
+                    self._release_blob(old)
+            self._deleted.discard(key)
+            self._dirty.add(key)
+            self._evict(keep=key)
+            self._maybe_flush()
+        return path
+
+    def _evict(self, keep=None):
+        if self.total_size <= self.quota_bytes:
+            return
+        target = self.quota_bytes * EVICT_TARGET
+        for key in sorted(self._entries, key=lambda k: self._entries[k][3]):
+            if self.total_size <= target:
+                break
+            if key == keep:
+                continue
+            self._remove_entry(key)
+            self.evictions += 1
+
+    def set_quota(self, quota_bytes):
+        with self._lock:
+            self.quota_bytes = quota_bytes
+            self._evict()
+            self.flush()
+
+    def _maybe_flush(self):
+        if len(self._dirty) + len(self._deleted) >= FLUSH_EVERY or time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Write pending index changes in one transaction."""
+        with self._lock:
+            if self._dirty or self._deleted:
+                rows = [(key, *self._entries[key]) for key in self._dirty]
+                with self._db:
+                    if self._deleted:
+                        self._db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in self._deleted])
+                    if rows:
+                        self._db.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self._dirty.clear()
+                self._deleted.clear()
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._db.close()
+
+    def import_legacy_files(self, directory, patterns):
+        """Move files of the old one-file-per-URL caches (named <sha256(url)>.<ext>) into the store."""
+        imported = 0
+        for pattern in patterns:
+            for path in glob.glob(os.path.join(directory, pattern)):
+                key = os.path.splitext(os.path.basename(path))[0]
+                if len(key) != 64:
+                    continue
+                try:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    if key not in self._entries:
+                        self._put_key(key, data)
+                        imported += 1
+                    os.remove(path)
+                except OSError:
+                    continue
+        if imported:
+            self.flush()
+        return imported
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'size': self.total_size,
+                'quota': self.quota_bytes,
+                'evictions': self.evictions,
+            }
+
+    def stats_text(self):
+        s = self.stats()
+        return (f"Cache: {s['hit_ratio'] * 100:.0f}% hits, {s['entries']} items, "
+                f"{s['size'] / 1048576:.1f}/{s['quota'] / 1048576:.0f} MB")
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_cache_store():
+    """Return the process-wide cache store, opening it (and migrating old caches) on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            from PySide6.QtCore import QSettings
+            quota_mb = QSettings("MIDISend", "MIDISendApp").value("cache_quota_mb", DEFAULT_QUOTA_MB, type=int)
+            app_dir = get_app_data_dir()
+            _store = CacheStore(os.path.join(app_dir, 'cache'), quota_mb * 1024 * 1024)
+            _store.import_legacy_files(os.path.join(app_dir, 'patches_cache'), ['*.syx', '*.json'])
+            _store.import_legacy_files(os.path.join(app_dir, 'mid_cache'), ['*.mid'])
+        return _store
+
+def close_cache_store():
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
@@ -35,7 +35,7 @@ class Dialogs:
         print(f"[ERROR] {title}: {message}", file=sys.stderr)
 
 class PreferencesDialog(QDialog):
-    def __init__(self, parent=None, github_token=""):
+    def __init__(self, parent=None, github_token="", cache_quota_mb=256, param_send_rate=100, ftp_connections=2):
         super().__init__(parent)
         self.setWindowTitle("Preferences")
         self.setMinimumWidth(600)  # 150% wider than default 400px
@@ -58,6 +58,33 @@ class PreferencesDialog(QDialog):
         )
         explanation.setMinimumHeight(120)
         layout.addWidget(explanation)
+        # Download cache size limit
+        from PySide6.QtWidgets import QSpinBox
+        quota_layout = QHBoxLayout()
+        quota_layout.addWidget(QLabel("Download cache limit (MB):"))
+        self.cache_quota_spin = QSpinBox()
+        self.cache_quota_spin.setRange(16, 65536)
+        self.cache_quota_spin.setValue(cache_quota_mb)
+        quota_layout.addWidget(self.cache_quota_spin)
+        quota_layout.addWidget(QLabel("Least recently used voices and MIDI files are removed beyond this size."))
+        layout.addLayout(quota_layout)
+        # Voice editor parameter send rate
+        rate_layout = QHBoxLayout()
+        rate_layout.addWidget(QLabel("Voice editor send rate (Hz):"))
+        self.param_send_rate_spin = QSpinBox()
+        self.param_send_rate_spin.setRange(5, 1000)
+        self.param_send_rate_spin.setValue(param_send_rate)
+        rate_layout.addWidget(self.param_send_rate_spin)
+        rate_layout.addWidget(QLabel("Maximum updates per second and parameter while dragging; the final value is always sent."))
+        layout.addLayout(rate_layout)
+        ftp_layout = QHBoxLayout()
+        ftp_layout.addWidget(QLabel("Update connections:"))
+        self.ftp_connections_spin = QSpinBox()
+        self.ftp_connections_spin.setRange(1, 4)
+        self.ftp_connections_spin.setValue(ftp_connections)
+        ftp_layout.addWidget(self.ftp_connections_spin)
+        ftp_layout.addWidget(QLabel("FTP connections used in parallel to upload performance files when updating a device."))
+        layout.addLayout(ftp_layout)
         # Add Clear application data button and explanation
         clear_layout = QHBoxLayout()
         clear_btn = QPushButton("Clear application data")
@@ -68,6 +95,8 @@ class PreferencesDialog(QDialog):
             import shutil
             import os
             from PySide6.QtWidgets import QMessageBox
+            from cache_store import close_cache_store
+            close_cache_store()
             cache_dir = os.path.join(os.getenv('LOCALAPPDATA') or os.path.expanduser('~/.local/share'), 'MiniDexed_Service_Utility')
             try:
                 if os.path.exists(cache_dir):
@@ -82,6 +111,12 @@ class PreferencesDialog(QDialog):
         layout.addWidget(self.buttons)
     def get_github_token(self):
         return self.token_edit.text()
+    def get_param_send_rate(self):
+        return self.param_send_rate_spin.value()
+    def get_ftp_connections(self):
+        return self.ftp_connections_spin.value()
+    def get_cache_quota_mb(self):
+        return self.cache_quota_spin.value()
 
 class DeviceSelectDialog(QDialog):
     def __init__(self, parent=None, device_list=None):
@@ -128,3 +163,131 @@ class AboutDialog(QDialog):
         buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok)
         buttons.accepted.connect(self.accept)
         layout.addWidget(buttons)
+
+class MidiTraceDialog(QDialog):
+    """Shows the MIDI trace ring buffer. Entries are only rendered to text while this dialog is open."""
+    def __init__(self, parent=None, trace=None):
+        super().__init__(parent)
+        from PySide6.QtWidgets import QComboBox
+        from PySide6.QtGui import QFont
+        from midi_trace import TRACE_LEVEL_NAMES
+        self.trace = trace
+        self.setWindowTitle("MIDI Trace")
+        self.resize(700, 450)
+        layout = QVBoxLayout(self)
+        level_layout = QHBoxLayout()
+        level_layout.addWidget(QLabel("Trace level:"))
+        self.level_combo = QComboBox(self)
+        for level, name in TRACE_LEVEL_NAMES.items():
+            self.level_combo.addItem(name, level)
+        self.level_combo.setCurrentIndex(self.level_combo.findData(trace.level))
+        self.level_combo.currentIndexChanged.connect(self.on_level_changed)
+        level_layout.addWidget(self.level_combo)
+        level_layout.addStretch(1)
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.refresh)
+        level_layout.addWidget(refresh_btn)
+        clear_btn = QPushButton("Clear")
+        clear_btn.clicked.connect(self.clear)
+        level_layout.addWidget(clear_btn)
+        layout.addLayout(level_layout)
+        self.text = QTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
+        self.text.setFont(QFont("Courier New"))
+        layout.addWidget(self.text)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.refresh()
+
+    def on_level_changed(self, idx):
+        self.trace.set_level(self.level_combo.itemData(idx))
+
+    def refresh(self):
+        self.text.setPlainText(self.trace.format_text())
+        self.text.verticalScrollBar().setValue(self.text.verticalScrollBar().maximum())
+
+    def clear(self):
+        self.trace.clear()
+        self.text.clear()
+
+class MidiThruDialog(QDialog):
+    """Filter, channel map and transpose for MIDI thru, with its live latency histogram."""
+    def __init__(self, parent=None, thru=None):
+        super().__init__(parent)
+        from PySide6.QtWidgets import QCheckBox, QComboBox, QSpinBox, QGridLayout, QGroupBox
+        from PySide6.QtGui import QFont
+        from PySide6.QtCore import QTimer
+        from thru_router import THRU_TYPES
+        self.thru = thru
+        self.setWindowTitle("MIDI Thru")
+        self.resize(640, 560)
+        layout = QVBoxLayout(self)
+        filter_box = QGroupBox("Forward")
+        filter_layout = QGridLayout(filter_box)
+        self.type_checks = {}
+        for i, (kind, label) in enumerate(THRU_TYPES):
+            cb = QCheckBox(label)
+            cb.setChecked(kind not in thru.blocked_types)
+            cb.toggled.connect(self.apply)
+            filter_layout.addWidget(cb, i // 3, i % 3)
+            self.type_checks[kind] = cb
+        layout.addWidget(filter_box)
+        map_box = QGroupBox("Channel map (input channel -> output channel)")
+        map_layout = QGridLayout(map_box)
+        self.channel_combos = []
+        for ch in range(16):
+            combo = QComboBox()
+            for out_ch in range(16):
+                combo.addItem(str(out_ch + 1), out_ch)
+            combo.addItem("Off", None)
+            out_ch = thru.channel_map[ch]
+            combo.setCurrentIndex(16 if out_ch is None else out_ch)
+            combo.currentIndexChanged.connect(self.apply)
+            map_layout.addWidget(QLabel(f"{ch + 1}:"), ch // 4, (ch % 4) * 2, Qt.AlignmentFlag.AlignRight)
+            map_layout.addWidget(combo, ch // 4, (ch % 4) * 2 + 1)
+            self.channel_combos.append(combo)
+        layout.addWidget(map_box)
+        transpose_layout = QHBoxLayout()
+        transpose_layout.addWidget(QLabel("Transpose notes (semitones):"))
+        self.transpose_spin = QSpinBox()
+        self.transpose_spin.setRange(-48, 48)
+        self.transpose_spin.setValue(thru.transpose)
+        self.transpose_spin.valueChanged.connect(self.apply)
+        transpose_layout.addWidget(self.transpose_spin)
+        transpose_layout.addStretch(1)
+        layout.addLayout(transpose_layout)
+        latency_layout = QHBoxLayout()
+        latency_layout.addWidget(QLabel("Latency from input to send complete:"))
+        latency_layout.addStretch(1)
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self.reset)
+        latency_layout.addWidget(reset_btn)
+        layout.addLayout(latency_layout)
+        self.histogram_text = QTextEdit()
+        self.histogram_text.setReadOnly(True)
+        self.histogram_text.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
+        self.histogram_text.setFont(QFont("Courier New"))
+        layout.addWidget(self.histogram_text)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        # The histogram is only rendered while the dialog is open
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(500)
+        self.refresh()
+
+    def apply(self, *args):
+        self.thru.configure(
+            blocked_types=[kind for kind, cb in self.type_checks.items() if not cb.isChecked()],
+            channel_map=[combo.currentData() for combo in self.channel_combos],
+            transpose=self.transpose_spin.value())
+
+    def refresh(self):
+        self.histogram_text.setPlainText(self.thru.histogram_text())
+
+    def reset(self):
+        self.thru.reset_stats()
+        self.refresh()
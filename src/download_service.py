@@ -0,0 +1,211 @@
+import queue
+import itertools
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from PySide6.QtCore import QObject, Signal
+
+# Request priorities (lower runs first)
+PRIORITY_USER = 0       # The user clicked on something and is waiting
+PRIORITY_NORMAL = 5
+PRIORITY_PREFETCH = 10  # Background prefetch; only runs when nothing else is queued
+
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = 20  # Seconds
+
+class DownloadRequest:
+    """Handle returned by DownloadService.fetch(); cancel() drops the callback."""
+    def __init__(self, job, callback):
+        self.job = job
+        self.callback = callback
+
+    @property
+    def url(self):
+        return self.job.url
+
+    def cancel(self):
+        self.job.service._cancel(self)
+
+class _Job:
+    def __init__(self, service, url, priority, want_path, use_cache):
+        self.service = service
+        self.url = url
+        self.priority = priority
+        self.want_path = want_path
+        self.use_cache = use_cache
+        self.requests = []
+        self.started = False
+        self.cancelled = False
+
+class DownloadService(QObject):
+    """
+    Shared downloader: a fixed pool of worker threads, one keep-alive requests.Session,
+    a priority queue and de-duplication of requests for a URL that is already queued
+    or running. Results go through the CacheStore (if given) and callbacks are invoked
+    on the thread that owns the service (the GUI thread) as callback(result, error),
+    where result is the downloaded bytes, or the cache file path with want_path=True.
+    use_cache=False bypasses the store, e.g. for listings that go stale.
+    session and cache can be injected, e.g. to test against a local HTTP server.
+    """
+    _completed = Signal(object, object, object)  # requests, result, error
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, session=None, cache=None, timeout=DEFAULT_TIMEOUT):
+        super().__init__()
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        self.cache = cache
+        self.timeout = timeout
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._running = True
+        self.network_fetches = 0
+        self.cache_hits = 0
+        self.deduplicated = 0
+        self._completed.connect(self._deliver)
+        self._threads = []
+        for i in range(max_workers):
+            t = threading.Thread(target=self._worker, name=f"download-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def fetch(self, url, callback, priority=PRIORITY_NORMAL, want_path=False, use_cache=True):
+        key = (url, want_path, use_cache)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                job = self._jobs[key] = _Job(self, url, priority, want_path, use_cache)
+                self._queue.put((priority, next(self._seq), job))
+            else:
+                self.deduplicated += 1
+                if priority < job.priority and not job.started:
+                    # Re-queue at the higher priority; the old queue entry is skipped by the workers
+                    job.priority = priority
+                    self._queue.put((priority, next(self._seq), job))
+            request = DownloadRequest(job, callback)
+            job.requests.append(request)
+        return request
+
+    def is_pending(self, url, want_path=False, use_cache=True):
+        with self._lock:
+            return (url, want_path, use_cache) in self._jobs
+
+    def _cancel(self, request):
+        with self._lock:
+            job = request.job
+            if request in job.requests:
+                job.requests.remove(request)
+            if not job.requests and not job.started:
+                job.cancelled = True
+                self._jobs.pop((job.url, job.want_path, job.use_cache), None)
+
+    def _worker(self):
+        while self._running:
+            priority, _seq, job = self._queue.get()
+            if job is None:
+                break
+            with self._lock:
+                if job.cancelled or job.started or priority != job.priority:
+                    continue
+                job.started = True
+            result, error = None, None
+            try:
+                result = self._download(job.url, job.want_path, job.use_cache)
+            except Exception as e:
+                error = e
+            with self._lock:
+                self._jobs.pop((job.url, job.want_path, job.use_cache), None)
+                pending = list(job.requests)
+            if pending:
+                self._completed.emit(pending, result, error)
+
+    def _download(self, url, want_path, use_cache=True):
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            cached = cache.get_path(url) if want_path else cache.get(url)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+        resp = self.session.get(url, timeout=self.timeout)
+        resp.raise_for_status()
+        self.network_fetches += 1
+        data = resp.content
+        if cache is not None:
+            path = cache.put(url, data)
+            if want_path:
+                return path
+        elif want_path:
+            raise RuntimeError("want_path requires a cache")
+        return data
+
+    def _deliver(self, pending, result, error):
+        for request in pending:
+            try:
+                request.callback(result, error)
+            except Exception as e:
+                print(f"[ERROR] Download callback for {request.url} failed: {e}")
+
+    def shutdown(self):
+        self._running = False
+        for _ in self._threads:
+            self._queue.put((-1, next(self._seq), None))
+
+_service = None
+
+def get_download_service():
+    """Return the process-wide download service backed by the shared cache store."""
+    global _service
+    from cache_store import get_cache_store
+    if _service is None:
+        _service = DownloadService(cache=get_cache_store())
+    else:
+        # The store is reopened after "Clear application data"
+        _service.cache = get_cache_store()
+    return _service
+
+if __name__ == "__main__":
+    # Self-check against a local HTTP stand-in: python download_service.py
+    import time
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    from PySide6.QtCore import QCoreApplication, QTimer
+    hits = []
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive
+        def do_GET(self):
+            hits.append(self.path)
+            time.sleep(0.05)
+            body = self.path.encode('ascii')
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        def log_message(self, *args):
+            pass
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    app = QCoreApplication([])
+    service = DownloadService(max_workers=1)
+    order = []
+    def done(result, error):
+        order.append(result)
+        if len(order) == 13:
+            app.quit()
+    # Occupy the single worker, then queue prefetches followed by one user request
+    service.fetch(f"{base}/busy", done)
+    time.sleep(0.02)
+    for i in range(10):
+        service.fetch(f"{base}/prefetch/{i}", done, PRIORITY_PREFETCH)
+    service.fetch(f"{base}/click", done, PRIORITY_USER)
+    service.fetch(f"{base}/click", done, PRIORITY_USER)  # Duplicate, shares the first download
+    QTimer.singleShot(5000, app.quit)
+    app.exec()
+    print(f"Delivered {len(order)} results from {len(hits)} HTTP requests; deduplicated {service.deduplicated}")
+    print(f"Order: {[r.decode() for r in order[:4]]} ...")
+    assert order[1] == order[2] == b'/click', "user request should jump ahead of prefetch"
+    service.shutdown()
@@ -0,0 +1,283 @@
+"""
+DX7 voice data codec.
+
+VCED is the unpacked single voice format (155 bytes, one parameter per byte).
+VMEM is the packed format used by 32-voice bank dumps (128 bytes per voice).
+Both store operators in the order OP6..OP1, 21 (VCED) or 17 (VMEM) bytes each.
+
+Bank decoding works on whole columns: for each VMEM byte offset the 32 values of
+all voices are taken with one strided slice, bit fields are extracted with
+bytes.translate() lookup tables, and the result is written into the VCED buffer
+with another strided slice. The cost therefore does not depend on a per-voice
+Python loop.
+"""
+import os
+
+VCED_SIZE = 155
+VMEM_SIZE = 128
+BANK_VOICES = 32
+BANK_DATA_SIZE = BANK_VOICES * VMEM_SIZE  # 4096
+BANK_SYSEX_SIZE = BANK_DATA_SIZE + 8      # F0 43 0n 09 20 00 <data> checksum F7
+VOICE_SYSEX_SIZE = VCED_SIZE + 8          # F0 43 0n 00 01 1B <data> checksum F7
+
+# VCED parameter names (operator parameters repeat 6 times, OP6 first)
+OP_PARAM_NAMES = ['R1', 'R2', 'R3', 'R4', 'L1', 'L2', 'L3', 'L4', 'BP', 'LD', 'RD', 'LC', 'RC',
+                  'RS', 'AMS', 'TS', 'TL', 'PM', 'PC', 'PF', 'PD']
+GLOBAL_PARAM_NAMES = ['PR1', 'PR2', 'PR3', 'PR4', 'PL1', 'PL2', 'PL3', 'PL4', 'ALS', 'FBL', 'OPI',
+                      'LFS', 'LFD', 'LPMD', 'LAMD', 'LFKS', 'LFW', 'LPMS', 'TRNP']
+OP_PARAM_COUNT = len(OP_PARAM_NAMES)           # 21
+GLOBAL_PARAM_OFFSET = 6 * OP_PARAM_COUNT       # 126
+NAME_OFFSET = GLOBAL_PARAM_OFFSET + len(GLOBAL_PARAM_NAMES)  # 145
+NAME_LENGTH = 10
+
+def _unpack_table(shift, width):
+    # Translation table extracting a bit field from a packed byte
+    mask = (1 << width) - 1
+    return bytes(((i >> shift) & mask) for i in range(256))
+
+def _pack_table(shift, width):
+    # Translation table moving a parameter value into its bit field
+    mask = (1 << width) - 1
+    return bytes(((i & mask) << shift) for i in range(256))
+
+# VMEM operator layout: (offset within the 17 operator bytes, VCED parameter, bit shift, bit width)
+_VMEM_OP_FIELDS = [
+    (0, 'R1', 0, 7), (1, 'R2', 0, 7), (2, 'R3', 0, 7), (3, 'R4', 0, 7),
+    (4, 'L1', 0, 7), (5, 'L2', 0, 7), (6, 'L3', 0, 7), (7, 'L4', 0, 7),
+    (8, 'BP', 0, 7), (9, 'LD', 0, 7), (10, 'RD', 0, 7),
+    (11, 'LC', 0, 2), (11, 'RC', 2, 2),
+    (12, 'RS', 0, 3), (12, 'PD', 3, 4),
+    (13, 'AMS', 0, 2), (13, 'TS', 2, 3),
+    (14, 'TL', 0, 7),
+    (15, 'PM', 0, 1), (15, 'PC', 1, 5),
+    (16, 'PF', 0, 7),
+]
+# VMEM global layout: (offset, VCED parameter, bit shift, bit width)
+_VMEM_GLOBAL_FIELDS = [
+    (102, 'PR1', 0, 7), (103, 'PR2', 0, 7), (104, 'PR3', 0, 7), (105, 'PR4', 0, 7),
+    (106, 'PL1', 0, 7), (107, 'PL2', 0, 7), (108, 'PL3', 0, 7), (109, 'PL4', 0, 7),
+    (110, 'ALS', 0, 5),
+    (111, 'FBL', 0, 3), (111, 'OPI', 3, 1),
+    (112, 'LFS', 0, 7), (113, 'LFD', 0, 7), (114, 'LPMD', 0, 7), (115, 'LAMD', 0, 7),
+    (116, 'LFKS', 0, 1), (116, 'LFW', 1, 3), (116, 'LPMS', 4, 3),
+    (117, 'TRNP', 0, 7),
+]
+
+def _build_field_map():
+    # Flatten into (VMEM offset, VCED offset, shift, width) covering all 155 VCED bytes
+    fields = []
+    for op in range(6):
+        for vmem_off, name, shift, width in _VMEM_OP_FIELDS:
+            fields.append((op * 17 + vmem_off, op * OP_PARAM_COUNT + OP_PARAM_NAMES.index(name), shift, width))
+    for vmem_off, name, shift, width in _VMEM_GLOBAL_FIELDS:
+        fields.append((vmem_off, GLOBAL_PARAM_OFFSET + GLOBAL_PARAM_NAMES.index(name), shift, width))
+    for i in range(NAME_LENGTH):
+        fields.append((118 + i, NAME_OFFSET + i, 0, 7))
+    return fields
+
+_FIELDS = _build_field_map()
+VMEM_TO_VCED = [(vmem_off, vced_off, _unpack_table(shift, width)) for vmem_off, vced_off, shift, width in _FIELDS]
+# VMEM offset -> [(VCED offset, pack table)]; several parameters may share one packed byte
+VCED_TO_VMEM = {}
+for _vmem_off, _vced_off, _shift, _width in _FIELDS:
+    VCED_TO_VMEM.setdefault(_vmem_off, []).append((_vced_off, _pack_table(_shift, _width)))
+
+def checksum(data):
+    return (-sum(data)) & 0x7F
+
+def vmem_to_vced(vmem, count=None):
+    """Convert count packed 128-byte voices to a bytearray of count unpacked 155-byte voices."""
+    if count is None:
+        count = len(vmem) // VMEM_SIZE
+    vmem = bytes(vmem[:count * VMEM_SIZE])
+    vced = bytearray(count * VCED_SIZE)
+    for vmem_off, vced_off, table in VMEM_TO_VCED:
+        vced[vced_off::VCED_SIZE] = vmem[vmem_off::VMEM_SIZE].translate(table)
+    return vced
+
+def vced_to_vmem(vced, count=None):
+    """Pack count 155-byte VCED voices into 128-byte VMEM voices (inverse of vmem_to_vced)."""
+    if count is None:
+        count = len(vced) // VCED_SIZE
+    vced = bytes(vced[:count * VCED_SIZE])
+    vmem = bytearray(count * VMEM_SIZE)
+    for vmem_off, fields in VCED_TO_VMEM.items():
+        # Bit fields never overlap, so OR-ing whole columns as big integers combines them
+        packed = 0
+        for vced_off, table in fields:
+            packed |= int.from_bytes(vced[vced_off::VCED_SIZE].translate(table), 'big')
+        vmem[vmem_off::VMEM_SIZE] = packed.to_bytes(count, 'big')
+    return bytes(vmem)
+
+def strip_sysex(data):
+    data = bytes(data)
+    if data and data[0] == 0xF0:
+        data = data[1:]
+    if data and data[-1] == 0xF7:
+        data = data[:-1]
+    return data
+
+class VoiceBank:
+    """
+    32 voices stored as one compact VCED bytearray (32 x 155 bytes).
+    Use voice() for a single voice, column() for one parameter across all voices.
+    """
+    def __init__(self, vced, checksum_ok=True, device=0):
+        self.vced = vced
+        self.count = len(vced) // VCED_SIZE
+        self.checksum_ok = checksum_ok
+        self.device = device
+
+    @classmethod
+    def from_vmem(cls, vmem, expected_checksum=None, device=0):
+        ok = expected_checksum is None or checksum(vmem) == expected_checksum
+        return cls(vmem_to_vced(vmem), ok, device)
+
+    @classmethod
+    def from_sysex(cls, data):
+        """Decode a 4104-byte bank dump (F0/F7 optional). Raises ValueError if it is not one."""
+        data = strip_sysex(data)
+        if len(data) != BANK_DATA_SIZE + 6 or data[0] != 0x43 or data[2] != 0x09:
+            raise ValueError(f"Not a DX7 32-voice bank dump ({len(data)} bytes)")
+        return cls.from_vmem(data[5:5 + BANK_DATA_SIZE], data[5 + BANK_DATA_SIZE], data[1] & 0x0F)
+
+    def voice(self, index):
+        start = index * VCED_SIZE
+        return memoryview(self.vced)[start:start + VCED_SIZE]
+
+    def column(self, offset):
+        return bytes(self.vced[offset::VCED_SIZE])
+
+    def op_param(self, op, name):
+        return self.column(op * OP_PARAM_COUNT + OP_PARAM_NAMES.index(name))
+
+    def global_param(self, name):
+        return self.column(GLOBAL_PARAM_OFFSET + GLOBAL_PARAM_NAMES.index(name))
+
+    @property
+    def names(self):
+        return [voice_name(self.voice(i)) for i in range(self.count)]
+
+    def to_vmem(self):
+        return vced_to_vmem(self.vced, self.count)
+
+    def to_sysex(self, device=None):
+        vmem = self.to_vmem()
+        device = self.device if device is None else device
+        return bytes([0xF0, 0x43, device & 0x0F, 0x09, 0x20, 0x00]) + vmem + bytes([checksum(vmem), 0xF7])
+
+def voice_name(vced):
+    return bytes(vced[NAME_OFFSET:NAME_OFFSET + NAME_LENGTH]).decode('ascii', errors='replace').strip()
+
+def decode_vced_params(d):
+    """Return the parameter dict used by SingleVoiceDumpDecoder for 155 VCED bytes."""
+    params = {'operators': []}
+    for op in range(6):
+        base = op * OP_PARAM_COUNT
+        params['operators'].append(dict(zip(OP_PARAM_NAMES, d[base:base + OP_PARAM_COUNT])))
+    params.update(zip(GLOBAL_PARAM_NAMES, d[GLOBAL_PARAM_OFFSET:NAME_OFFSET]))
+    params['VNAM'] = voice_name(d)
+    for i in range(NAME_LENGTH):
+        params[f'VNAM{i+1}'] = d[NAME_OFFSET + i]
+    return params
+
+def encode_vced_params(params):
+    """Inverse of decode_vced_params(): 155 VCED bytes from a parameter dict."""
+    vced = bytearray(VCED_SIZE)
+    for op, op_params in enumerate(params.get('operators', [])[:6]):
+        base = op * OP_PARAM_COUNT
+        for i, name in enumerate(OP_PARAM_NAMES):
+            vced[base + i] = int(op_params.get(name, 0)) & 0x7F
+    for i, name in enumerate(GLOBAL_PARAM_NAMES):
+        vced[GLOBAL_PARAM_OFFSET + i] = int(params.get(name, 0)) & 0x7F
+    for i in range(NAME_LENGTH):
+        vced[NAME_OFFSET + i] = int(params.get(f'VNAM{i+1}', 32)) & 0x7F
+    return vced
+
+def init_voice_params(name='INIT PATCH'):
+    """
+    Parameters of the DX7 INIT VOICE: algorithm 1 with only OP1 audible (TL 99,
+    OP2-OP6 at 0), pitch EG levels at 50 (no pitch change), full EG rates.
+    """
+    params = {'operators': []}
+    for op in range(6):
+        params['operators'].append({
+            'R1': 99, 'R2': 99, 'R3': 99, 'R4': 99, 'L1': 99, 'L2': 99, 'L3': 99, 'L4': 0,
+            'BP': 39, 'LD': 0, 'RD': 0, 'LC': 0, 'RC': 0, 'RS': 0, 'AMS': 0, 'TS': 0,
+            'TL': 99 if op == 5 else 0,  # Operators are stored OP6 first, so OP1 is the last
+            'PM': 0, 'PC': 1, 'PF': 0, 'PD': 7,
+        })
+    params.update({'PR1': 99, 'PR2': 99, 'PR3': 99, 'PR4': 99, 'PL1': 50, 'PL2': 50, 'PL3': 50, 'PL4': 50,
+                   'ALS': 0, 'FBL': 0, 'OPI': 1, 'LFS': 35, 'LFD': 0, 'LPMD': 0, 'LAMD': 0,
+                   'LFKS': 1, 'LFW': 0, 'LPMS': 3, 'TRNP': 24})
+    name = name.encode('ascii')[:NAME_LENGTH].ljust(NAME_LENGTH)
+    for i in range(NAME_LENGTH):
+        params[f'VNAM{i+1}'] = name[i]
+    return params
+
+def single_voice_sysex(vced, channel=0):
+    """Build a VCED single voice dump (163 bytes) for the given 0-based channel."""
+    vced = bytes(vced[:VCED_SIZE])
+    return bytes([0xF0, 0x43, channel & 0x0F, 0x00, 0x01, 0x1B]) + vced + bytes([checksum(vced), 0xF7])
+
+def find_banks(data):
+    """Decode every 32-voice bank dump found in data; a headerless 4096-byte file is accepted too."""
+    data = bytes(data)
+    if len(data) == BANK_DATA_SIZE:
+        return [VoiceBank.from_vmem(data)]
+    banks = []
+    pos = data.find(b'\xF0\x43')
+    while pos >= 0:
+        block = data[pos:pos + BANK_SYSEX_SIZE]
+        if len(block) == BANK_SYSEX_SIZE and block[3] == 0x09 and block[-1] == 0xF7:
+            banks.append(VoiceBank.from_sysex(block))
+            pos = data.find(b'\xF0\x43', pos + BANK_SYSEX_SIZE)
+        else:
+            pos = data.find(b'\xF0\x43', pos + 2)
+    return banks
+
+def load_bank_file(path):
+    with open(path, 'rb') as f:
+        return find_banks(f.read())
+
+def iter_bank_dir(directory):
+    """Yield (path, VoiceBank) for all banks in *.syx files below directory."""
+    for root, _dirs, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith('.syx'):
+                path = os.path.join(root, name)
+                try:
+                    banks = load_bank_file(path)
+                except (OSError, ValueError) as e:
+                    print(f"[DX7 BANK] Skipping {path}: {e}")
+                    continue
+                for bank in banks:
+                    yield path, bank
+
+if __name__ == "__main__":
+    # Benchmark: bulk conversion versus a per-voice, per-parameter loop
+    import time
+    import random
+    vmem = bytes(random.randrange(128) for _ in range(BANK_DATA_SIZE))
+    def per_voice(vmem):
+        out = bytearray(BANK_VOICES * VCED_SIZE)
+        for v in range(BANK_VOICES):
+            for vmem_off, vced_off, table in VMEM_TO_VCED:
+                out[v * VCED_SIZE + vced_off] = table[vmem[v * VMEM_SIZE + vmem_off]]
+        return out
+    vced = vmem_to_vced(vmem)
+    assert per_voice(vmem) == vced
+    # The INIT voice survives a single voice dump round trip with the expected values
+    dump = single_voice_sysex(encode_vced_params(init_voice_params()))
+    assert len(dump) == VOICE_SYSEX_SIZE and dump[:6] == bytes([0xF0, 0x43, 0x00, 0x00, 0x01, 0x1B])
+    assert checksum(dump[6:6 + VCED_SIZE]) == dump[-2] and dump[-1] == 0xF7
+    init = decode_vced_params(dump[6:6 + VCED_SIZE])
+    assert [init[f'PL{i}'] for i in range(1, 5)] == [50, 50, 50, 50]
+    assert [op['TL'] for op in init['operators']] == [0, 0, 0, 0, 0, 99]  # OP6..OP1
+    assert init['ALS'] == 0 and init['VNAM'] == 'INIT PATCH'
+    assert vmem_to_vced(vced_to_vmem(vced)) == vced
+    for label, fn in (("per-voice", per_voice), ("bulk", vmem_to_vced)):
+        t0 = time.perf_counter()
+        for _ in range(200):
+            fn(vmem)
+        print(f"{label:<10} {(time.perf_counter() - t0) / 200 * 1e6:8.1f} us per bank")
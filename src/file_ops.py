@@ -66,26 +66,12 @@ class FileOps:
         midi = mido.MidiFile()
         track = mido.MidiTrack()
         midi.tracks.append(track)
-        lines = [l.strip() for l in self.main_window.ui.in_text.toPlainText().splitlines() if l.strip()]
-        for line in lines:
+        # Straight from the monitor's message buffer, no text round trip
+        for _, data in self.main_window.ui.midi_in_model.iter_messages():
             try:
-                msg = mido.Message.from_str(line)
-                track.append(msg)
-                continue
+                track.append(mido.Message.from_bytes(data))
             except Exception:
-                pass
-            try:
-                data = self.parse_sysex_text(line)
-                if data:
-                    if not (data[0] & 0x80):
-                        data = [0xF0] + data + [0xF7]
-                    if data[0] == 0xF0:
-                        msg = mido.Message('sysex', data=data[1:-1] if data[-1] == 0xF7 else data[1:])
-                    else:
-                        msg = mido.Message.from_bytes(data)
-                    track.append(msg)
-            except Exception:
-                self.main_window.ui.append_log(f"Skipped invalid MIDI line: {line}")
+                self.main_window.ui.append_log(f"Skipped invalid MIDI message: {data.hex(' ').upper()}")
         if len(track) == 0:
             Dialogs.show_error(self.main_window, "Error", "No valid MIDI data in MIDI In to save.")
             return
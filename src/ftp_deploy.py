@@ -0,0 +1,391 @@
+import os
+import re
+import json
+import ftplib
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEPLOY_BLOCK = 64 * 1024   # Bytes per FTP data block
+DEPLOY_CONNECTIONS = 2     # Connections used for many small files (performances)
+SMALL_FILE = 256 * 1024    # Files up to this size go through the connection pool
+
+# Unix style LIST line: permissions, links, owner, group, size, date, name
+_LIST_LINE = re.compile(r'^([dl-])\S*\s+\d+\s+\S+\s+\S+\s+(\d+)\s+(\w{3}\s+\d+\s+[\d:]+)\s+(.+)$')
+
+def ftp_connect(host, port=21, user="admin", password="admin", timeout=10):
+    """Default connection factory: a logged in ftplib.FTP in passive mode."""
+    ftp = ftplib.FTP()
+    ftp.connect(host, port, timeout=timeout)
+    ftp.login(user, password)
+    ftp.set_pasv(True)
+    return ftp
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def list_remote_dir(ftp, path):
+    """
+    {name: (size, mtime, is_dir)} for a remote directory, from MLSD if the server
+    has it, otherwise from a Unix style LIST. mtime is the server's own text and is
+    only compared for equality. All three are None for LIST lines in another format
+    (see listing_known()). Returns None if the directory cannot be listed (e.g.
+    does not exist).
+    """
+    try:
+        entries = {}
+        for name, facts in ftp.mlsd(path, facts=['type', 'size', 'modify']):
+            kind = facts.get('type', '')
+            if kind in ('cdir', 'pdir') or name in ('.', '..'):
+                continue
+            size = facts.get('size')
+            entries[name] = (int(size) if size else None, facts.get('modify'), kind == 'dir')
+        return entries
+    except ftplib.error_perm as e:
+        if not str(e).startswith('500') and not str(e).startswith('502'):
+            return None
+    lines = []
+    try:
+        ftp.retrlines(f'LIST {path}', lines.append)
+    except ftplib.error_perm:
+        return None
+    entries = {}
+    for line in lines:
+        m = _LIST_LINE.match(line)
+        if m:
+            kind, size, mtime, name = m.groups()
+            entries[name] = (int(size), mtime, kind == 'd')
+        elif line.strip():
+            name = line.strip().rsplit(' ', 1)[-1]
+            entries[name] = (None, None, None)
+    return entries
+
+def listing_known(entries):
+    """False if some entry could not be parsed, so it is unknown which names are directories."""
+    return all(is_dir is not None for size, mtime, is_dir in entries.values())
+
+class DeployManifest:
+    """
+    What was last deployed to each host: remote path -> {hash, size, mtime}, plus
+    the hashes of .new uploads that were started but not finished. FTP servers
+    cannot tell a file's hash, so a remote file counts as unchanged when its size
+    (and mtime, if listed) match the record of an upload with the same local hash.
+    Kept as JSON in path, or in memory only if path is None.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[ERROR] Could not read deploy manifest {path}: {e}")
+
+    def host(self, host):
+        return self.data.setdefault(host, {"files": {}, "partial": {}})
+
+    def record(self, host, remote, digest, size, mtime=None):
+        with self._lock:
+            self.host(host)["files"][remote] = {"hash": digest, "size": size, "mtime": mtime}
+
+    def set_partial(self, host, remote, digest):
+        with self._lock:
+            partial = self.host(host)["partial"]
+            if digest is None:
+                partial.pop(remote, None)
+            else:
+                partial[remote] = digest
+
+    def forget(self, host, remote):
+        with self._lock:
+            self.host(host)["files"].pop(remote, None)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            text = json.dumps(self.data, indent=1)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        except OSError as e:
+            print(f"[ERROR] Could not write deploy manifest {self.path}: {e}")
+
+class Upload:
+    def __init__(self, local, remote, size, digest, atomic, offset=0):
+        self.local = local
+        self.remote = remote
+        self.size = size
+        self.digest = digest
+        self.atomic = atomic    # Upload as remote.new, then replace remote by renaming
+        self.offset = offset    # Bytes of remote.new already on the device (REST)
+
+class FtpDeployer:
+    """
+    Uploads files and directory trees to an FTP server, sending only what changed.
+    add_file() and add_tree() compare local files with one listing per remote
+    directory and the manifest and queue the uploads; run() creates missing
+    directories, deletes remote files that are gone locally (mirrored trees only),
+    uploads large and atomic files on the main connection (resuming a partial .new
+    with REST) and small files over a pool of connections. progress(done, total)
+    is reported in bytes. connect() returns a new logged in connection, so a
+    local stand-in server (e.g. pyftpdlib) can be used instead of a device.
+    """
+    def __init__(self, connect, host, manifest=None, connections=DEPLOY_CONNECTIONS,
+                 block_size=DEPLOY_BLOCK, status=None, progress=None):
+        self.connect = connect
+        self.host = host
+        self.manifest = manifest if manifest is not None else DeployManifest()
+        self.connections = max(1, connections)
+        self.block_size = block_size
+        self.status = status or print
+        self.progress = progress
+        self.ftp = connect()
+        self.uploads = []
+        self.mkdirs = []
+        self.deletes = []   # (path, is_dir), deepest first
+        self.skipped = 0
+        self._listings = {}
+        self._done = 0
+        self._total = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pool_connections = []
+
+    def _listing(self, path):
+        if path not in self._listings:
+            self._listings[path] = list_remote_dir(self.ftp, path)
+        return self._listings[path]
+
+    def _unchanged(self, remote, size, digest, entry):
+        if entry is None or entry[0] != size:
+            return False
+        record = self.manifest.host(self.host)["files"].get(remote)
+        if not record or record.get("hash") != digest or record.get("size") != size:
+            return False
+        return record.get("mtime") is None or entry[1] is None or record["mtime"] == entry[1]
+
+    def add_file(self, local, remote, atomic=False):
+        parent, name = remote.rsplit('/', 1)
+        listing = self._listing(parent) or {}
+        size = os.path.getsize(local)
+        digest = file_hash(local)
+        if self._unchanged(remote, size, digest, listing.get(name)):
+            self.skipped += 1
+            return
+        offset = 0
+        if atomic:
+            partial = listing.get(name + '.new')
+            started = self.manifest.host(self.host)["partial"].get(remote + '.new')
+            if partial and partial[0] and started == digest and partial[0] <= size:
+                offset = partial[0]
+        self.uploads.append(Upload(local, remote, size, digest, atomic, offset))
+
+    def add_tree(self, local_dir, remote_dir, mirror=True):
+        listing = self._listing(remote_dir)
+        if listing is None:
+            self.mkdirs.append(remote_dir)
+            listing = {}
+        known = listing_known(listing)
+        if not known:
+            # Uploading everything is safe, deleting on a guess is not
+            self.status(f"[WARN] Cannot read the listing of {remote_dir}: uploading all files, deleting none")
+        local_names = set()
+        for item in sorted(os.listdir(local_dir)):
+            local_names.add(item)
+            lpath = os.path.join(local_dir, item)
+            rpath = f"{remote_dir}/{item}"
+            if os.path.isdir(lpath):
+                if known and item in listing and not listing[item][2]:
+                    self.deletes.append((rpath, False))
+                    self._listings[rpath] = None
+                self.add_tree(lpath, rpath, mirror)
+            else:
+                if known and listing.get(item, (None, None, False))[2]:
+                    self._delete_tree(rpath)
+                self.add_file(lpath, rpath)
+        if mirror and known:
+            for name, (size, mtime, is_dir) in listing.items():
+                if name not in local_names:
+                    if is_dir:
+                        self._delete_tree(f"{remote_dir}/{name}")
+                    else:
+                        self.deletes.append((f"{remote_dir}/{name}", False))
+
+    def _delete_tree(self, path):
+        listing = self._listing(path) or {}
+        if not listing_known(listing):
+            self.status(f"[WARN] Cannot read the listing of {path}, not deleting it")
+            return
+        for name, (size, mtime, is_dir) in listing.items():
+            if is_dir:
+                self._delete_tree(f"{path}/{name}")
+            else:
+                self.deletes.append((f"{path}/{name}", False))
+        self.deletes.append((path, True))
+        self._listings[path] = None
+
+    def total_bytes(self):
+        return sum(upload.size - upload.offset for upload in self.uploads)
+
+    def _advance(self, count):
+        with self._lock:
+            self._done += count
+            done = self._done
+        if self.progress:
+            self.progress(done, self._total)
+
+    def _store(self, ftp, upload):
+        target = upload.remote + '.new' if upload.atomic else upload.remote
+        with open(upload.local, 'rb') as f:
+            if upload.offset:
+                f.seek(upload.offset)
+                try:
+                    ftp.storbinary(f'STOR {target}', f, self.block_size,
+                                   callback=lambda data: self._advance(len(data)), rest=upload.offset)
+                except ftplib.error_perm as e:
+                    # REST is refused before any data is sent: upload the whole file
+                    self.status(f"Cannot resume {target} ({e}), uploading it again")
+                    with self._lock:
+                        self._total += upload.offset
+                    upload.offset = 0
+                    f.seek(0)
+                    ftp.storbinary(f'STOR {target}', f, self.block_size,
+                                   callback=lambda data: self._advance(len(data)))
+                else:
+                    self.status(f"Resumed {target} at {upload.offset} bytes")
+            else:
+                if upload.atomic:
+                    self.manifest.set_partial(self.host, target, upload.digest)
+                    self.manifest.save()
+                ftp.storbinary(f'STOR {target}', f, self.block_size,
+                               callback=lambda data: self._advance(len(data)))
+        if upload.atomic:
+            try:
+                ftp.delete(upload.remote)
+            except ftplib.Error:
+                pass
+            ftp.rename(target, upload.remote)
+            self.manifest.set_partial(self.host, target, None)
+        self.manifest.record(self.host, upload.remote, upload.digest, upload.size)
+        self.status(f"Uploaded {upload.remote}")
+
+    def _pool_store(self, upload):
+        ftp = getattr(self._local, 'ftp', None)
+        if ftp is None:
+            ftp = self._local.ftp = self.connect()
+            with self._lock:
+                self._pool_connections.append(ftp)
+        self._store(ftp, upload)
+
+    def run(self):
+        self._done = 0
+        self._total = self.total_bytes()
+        if self.skipped:
+            self.status(f"{self.skipped} files unchanged on {self.host}, skipping them")
+        for path, is_dir in self.deletes:
+            try:
+                if is_dir:
+                    self.ftp.rmd(path)
+                else:
+                    self.ftp.delete(path)
+                    self.manifest.forget(self.host, path)
+                self.status(f"Deleted {path}")
+            except ftplib.Error as e:
+                self.status(f"[WARN] Could not delete {path}: {e}")
+        for path in self.mkdirs:
+            try:
+                self.ftp.mkd(path)
+            except ftplib.Error:
+                pass
+        small = []
+        try:
+            for upload in self.uploads:
+                if self.connections > 1 and not upload.atomic and upload.size <= SMALL_FILE:
+                    small.append(upload)
+                else:
+                    self._store(self.ftp, upload)
+            if small:
+                with ThreadPoolExecutor(max_workers=self.connections) as pool:
+                    for future in [pool.submit(self._pool_store, upload) for upload in small]:
+                        future.result()
+            self._record_mtimes()
+        finally:
+            self.manifest.save()
+        return len(self.uploads)
+
+    def _record_mtimes(self):
+        # One listing per directory written to, so a later change on the device is noticed
+        by_dir = {}
+        for upload in self.uploads:
+            parent, name = upload.remote.rsplit('/', 1)
+            by_dir.setdefault(parent, []).append((name, upload))
+        for parent, uploads in by_dir.items():
+            listing = list_remote_dir(self.ftp, parent) or {}
+            for name, upload in uploads:
+                entry = listing.get(name)
+                if entry and entry[0] == upload.size:
+                    self.manifest.record(self.host, upload.remote, upload.digest, upload.size, entry[1])
+
+    def close(self):
+        for ftp in [self.ftp] + self._pool_connections:
+            try:
+                ftp.quit()
+            except Exception:
+                try:
+                    ftp.close()
+                except Exception:
+                    pass
+        self._pool_connections = []
+
+def deploy_manifest_path():
+    from cache_store import get_app_data_dir
+    return os.path.join(get_app_data_dir(), 'deploy_manifest.json')
+
+if __name__ == "__main__":
+    # Deploy a test tree twice to a local pyftpdlib server: the second run sends nothing
+    import sys
+    import time
+    import logging
+    import tempfile
+    logging.basicConfig(level=logging.WARNING)  # Keep pyftpdlib quiet
+    try:
+        from pyftpdlib.authorizers import DummyAuthorizer
+        from pyftpdlib.handlers import FTPHandler
+        from pyftpdlib.servers import ThreadedFTPServer
+    except ImportError:
+        sys.exit("pyftpdlib is needed for this test")
+    root = tempfile.mkdtemp()
+    os.makedirs(os.path.join(root, 'SD'))
+    authorizer = DummyAuthorizer()
+    authorizer.add_user("admin", "admin", root, perm="elradfmwMT")
+    FTPHandler.authorizer = authorizer
+    server = ThreadedFTPServer(("127.0.0.1", 0), FTPHandler)
+    port = server.address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    local = tempfile.mkdtemp()
+    with open(os.path.join(local, 'kernel8.img'), 'wb') as f:
+        f.write(os.urandom(8 * 1024 * 1024))
+    os.makedirs(os.path.join(local, 'performance', 'bank'))
+    for i in range(200):
+        with open(os.path.join(local, 'performance', 'bank', f'{i:06d}_perf.ini'), 'wb') as f:
+            f.write(os.urandom(2000))
+    manifest = DeployManifest()
+    for run in range(2):
+        deployer = FtpDeployer(lambda: ftp_connect("127.0.0.1", port), "test", manifest, connections=4,
+                               status=lambda msg: None)
+        deployer.add_file(os.path.join(local, 'kernel8.img'), '/SD/kernel8.img', atomic=True)
+        deployer.add_tree(os.path.join(local, 'performance'), '/SD/performance')
+        t0 = time.perf_counter()
+        count = deployer.run()
+        deployer.close()
+        print(f"Run {run + 1}: {count} uploaded, {deployer.skipped} unchanged, "
+              f"{deployer.total_bytes() / 1e6:.1f} MB in {time.perf_counter() - t0:.2f} s")
+    server.close_all()
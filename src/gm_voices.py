@@ -0,0 +1,221 @@
+import os
+import json
+import threading
+from PySide6.QtCore import QObject, QTimer, Signal
+from download_service import PRIORITY_USER
+
+def general_midi_path():
+    path = os.path.join(os.path.dirname(__file__), 'data', 'general_midi.json')
+    if not os.path.exists(path):
+        path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'general_midi.json')
+    return path
+
+def voice_key(name):
+    return name.strip().upper()
+
+class GMVoiceTable:
+    """
+    Lookup tables for replacing General MIDI program changes with DX7 voices.
+    by_name maps the normalised voice name to the first catalogue entry with that
+    name (the one a linear scan would have found); programs maps each GM program
+    number to its (name, voice) candidates from general_midi.json in order of
+    preference, voice being None if the name is not in the catalogue.
+    """
+    def __init__(self, gm_map, voices):
+        self.gm_map = gm_map
+        self.by_name = {}
+        for voice in voices:
+            self.by_name.setdefault(voice_key(voice.get('name', '')), voice)
+        self.programs = {}
+        for program, entry in gm_map.items():
+            self.programs[int(program)] = [(name, self.by_name.get(voice_key(name))) for name in entry.get('dx7_voices', [])]
+
+    def find_voice(self, name):
+        return self.by_name.get(voice_key(name))
+
+    def gm_name(self, program):
+        entry = self.gm_map.get(str(program))
+        return entry.get('name', '') if entry else ''
+
+    def candidates(self, program):
+        return self.programs.get(program, [])
+
+    def primary(self, program):
+        """Return the preferred (name, voice) for a GM program, or None if it has no DX7 voices."""
+        candidates = self.programs.get(program)
+        return candidates[0] if candidates else None
+
+RESOLVE_PARALLEL = 4   # Voice downloads in flight at once
+RESOLVE_TIMEOUT = 10.0  # Seconds until unresolved programs are given up
+
+class GMVoiceResolver(QObject):
+    """
+    Fetches the replacement voices for a set of GM programs in one batch.
+    Up to max_parallel downloads run at once; a failed or unknown voice falls back
+    to the program's next candidate in general_midi.json, and a voice shared by
+    several programs is downloaded once. finished is emitted exactly once with
+    {program: (dx7_name, syx_data, error)} after every program is resolved or
+    timeout seconds have passed (syx_data is None for programs without a voice).
+    """
+    finished = Signal(object)
+
+    def __init__(self, table, max_parallel=RESOLVE_PARALLEL, timeout=RESOLVE_TIMEOUT, service=None, parent=None):
+        super().__init__(parent)
+        self.table = table
+        self.max_parallel = max_parallel
+        self.service = service
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(int(timeout * 1000))
+        self._timer.timeout.connect(self._on_timeout)
+        self.results = {}
+        self._candidates = {}   # program -> remaining (name, voice) candidates
+        self._errors = {}       # program -> last error
+        self._waiting = {}      # signature -> programs waiting for it
+        self._fetched = {}      # signature -> (syx_data, error)
+        self._queue = []        # signatures not requested yet
+        self._requests = {}     # signature -> DownloadRequest in flight
+        self._done = False
+
+    def resolve(self, programs):
+        if self.service is None:
+            from download_service import get_download_service
+            self.service = get_download_service()
+        for program in sorted(set(programs)):
+            candidates = self.table.candidates(program)
+            if not candidates:
+                continue
+            self._candidates[program] = list(candidates)
+            self._next_candidate(program)
+        self._timer.start()
+        self._pump()
+        self._maybe_finish()
+
+    def _next_candidate(self, program):
+        candidates = self._candidates[program]
+        while candidates:
+            name, voice = candidates[0]
+            sig = voice.get('signature') if voice else None
+            if not sig:
+                self._errors[program] = "Voice not found in library" if voice is None else "No signature for voice"
+                candidates.pop(0)
+                continue
+            if sig in self._fetched:
+                if self._accept(program, sig):
+                    return
+                continue
+            if sig not in self._waiting:
+                self._waiting[sig] = []
+                self._queue.append(sig)
+            self._waiting[sig].append(program)
+            return
+        first = self.table.primary(program)
+        self.results[program] = (first[0] if first else None, None, self._errors.get(program, "No DX7 voice"))
+
+    def _accept(self, program, sig):
+        # Use a downloaded voice for program, or drop the candidate if its download failed
+        syx_data, error = self._fetched[sig]
+        name = self._candidates[program].pop(0)[0]
+        if error is None and syx_data:
+            self.results[program] = (name, syx_data, None)
+            return True
+        self._errors[program] = error or "Empty SysEx data"
+        return False
+
+    def _pump(self):
+        from voice_browser import voice_syx_url
+        while self._queue and len(self._requests) < self.max_parallel:
+            sig = self._queue.pop(0)
+            def on_done(data, error, sig=sig):
+                self._on_fetched(sig, list(data) if data else None, error)
+            self._requests[sig] = self.service.fetch(voice_syx_url(sig), on_done, PRIORITY_USER)
+
+    def _on_fetched(self, sig, syx_data, error):
+        if self._done:
+            return
+        self._requests.pop(sig, None)
+        self._fetched[sig] = (syx_data, str(error) if error else None)
+        for program in self._waiting.pop(sig, []):
+            if not self._accept(program, sig):
+                self._next_candidate(program)
+        self._pump()
+        self._maybe_finish()
+
+    def _maybe_finish(self):
+        if not self._done and len(self.results) == len(self._candidates):
+            self._finish()
+
+    def _on_timeout(self):
+        for program in self._candidates:
+            if program not in self.results:
+                first = self.table.primary(program)
+                self.results[program] = (first[0] if first else None, None, "Timed out")
+        self._finish()
+
+    def _finish(self):
+        self._done = True
+        self._timer.stop()
+        self.cancel()
+        self.finished.emit(self.results)
+
+    def cancel(self):
+        self._done = True
+        self._timer.stop()
+        for request in self._requests.values():
+            request.cancel()
+        self._requests.clear()
+        self._queue.clear()
+
+_gm_map = None
+_table = None
+_table_stamp = None
+_table_lock = threading.Lock()
+
+def load_general_midi():
+    global _gm_map
+    if _gm_map is None:
+        with open(general_midi_path(), 'r', encoding='utf-8') as f:
+            _gm_map = json.load(f)
+    return _gm_map
+
+def get_gm_voice_table():
+    """
+    Return the table for the cached patch_list.json, rebuilding it only when the
+    file has changed (modification time or size) since it was last built.
+    """
+    global _table, _table_stamp
+    from voice_browser import get_cache_dir, VOICE_LIST_CACHE_NAME
+    cache_path = os.path.join(get_cache_dir(), VOICE_LIST_CACHE_NAME)
+    with _table_lock:
+        st = os.stat(cache_path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        if _table is None or stamp != _table_stamp:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                voices = json.load(f)
+            _table = GMVoiceTable(load_general_midi(), voices)
+            _table_stamp = stamp
+        return _table
+
+if __name__ == "__main__":
+    # Benchmark: resolve every GM program against a synthetic 40000 voice catalogue
+    import time
+    gm_map = load_general_midi()
+    names = sorted({n for e in gm_map.values() for n in e['dx7_voices']})
+    voices = [{"name": f"VOICE {i:05d}", "signature": f"{i:032x}"} for i in range(40000)]
+    voices += [{"name": f" {n.lower()} ", "signature": f"gm{i}"} for i, n in enumerate(names)]
+    t0 = time.perf_counter()
+    table = GMVoiceTable(gm_map, voices)
+    print(f"Table built in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    def find_linear(name):
+        for v in voices:
+            if v['name'].strip().upper() == name.strip().upper():
+                return v
+        return None
+    t0 = time.perf_counter()
+    linear = [find_linear(gm_map[str(p)]['dx7_voices'][0]) for p in range(128) if gm_map.get(str(p), {}).get('dx7_voices')]
+    t_old = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    indexed = [table.primary(p)[1] for p in range(128) if table.primary(p)]
+    t_new = (time.perf_counter() - t0) * 1000
+    assert linear == indexed
+    print(f"128 programs: linear scan {t_old:.1f} ms, table {t_new:.3f} ms")
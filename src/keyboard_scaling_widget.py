@@ -17,6 +17,7 @@ curve_labels = {
 class KeyboardScalingWidget(QWidget):
     paramsChanged = Signal(int, int, int, int, int)  # break_point, left_depth, right_depth, left_curve, right_curve
     labelHovered = Signal(str)  # Emits param_key when hovering over a label
+    editFinished = Signal()  # Emitted on mouse release after a drag
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setMinimumSize(80, 64)
@@ -291,6 +292,8 @@ class KeyboardScalingWidget(QWidget):
                 rd = max(0, min(99, rd))
                 self.right_depth = rd
             self.update()
+            # Live update while dragging; the receiver rate-limits what it sends
+            self.paramsChanged.emit(self.break_point, self.left_depth, self.right_depth, self.left_curve, self.right_curve)
             return
         # --- Drag logic for labels ---
         if hasattr(self, '_drag_label') and self._drag_label and event.buttons() & Qt.MouseButton.LeftButton:
@@ -365,6 +368,7 @@ class KeyboardScalingWidget(QWidget):
     def mouseReleaseEvent(self, event):
         if (hasattr(self, '_drag_part') and self._drag_part) or (hasattr(self, '_drag_label') and self._drag_label):
             self.paramsChanged.emit(self.break_point, self.left_depth, self.right_depth, self.left_curve, self.right_curve)
+            self.editFinished.emit()
             self._drag_part = None
             self._drag_label = None
         self._last_mouse_pos = None
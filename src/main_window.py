@@ -12,6 +12,7 @@ from PySide6.QtCore import QSettings
 import re
 from updater_dialog import UpdaterDialog, UpdaterProgressDialog
 from updater_worker import UpdaterWorker, DeviceDiscoveryWorker
+from ftp_deploy import DEPLOY_CONNECTIONS
 import sys
 import subprocess
 from windows_firewall_checker import WindowsFirewallChecker
@@ -31,8 +32,7 @@ class MainWindow(QMainWindow):
         # self.midi_handler.note_on_received.connect(self._maybe_forward_any)
         # self.midi_handler.note_off_received.connect(self._maybe_forward_any)
         # self.midi_handler.control_change_received.connect(self._maybe_forward_any)
-        # Instead, use the generic forward callback:
-        self.midi_handler.set_forward_callback(self._maybe_forward_any)
+        # MIDI In to MIDI Out routing is done by self.midi_handler.thru in the input thread
 
         self.ui = UiMainWindow(self)
         self.file_ops = FileOps(self)
@@ -89,7 +89,10 @@ class MainWindow(QMainWindow):
             print(msg)
 
     def init_workers(self):
-        self.receive_worker = None
+        self.receive_worker = MIDIReceiveWorker(self.midi_handler)
+        self.receive_worker.messages_received.connect(self.ui.display_midi_messages)
+        self.receive_worker.log.connect(self.show_status)
+        self.receive_worker.start()
         self.log_worker = LogWorker()
         def log_to_status_and_stdout(msg):
             self.statusBar().showMessage(msg)
@@ -102,7 +105,12 @@ class MainWindow(QMainWindow):
                     ip, port = m.groups()
                     if hasattr(self.ui, 'update_syslog_label'):
                         self.ui.update_syslog_label(ip, port)
-        self.log_worker.log.connect(log_to_status_and_stdout)
+        def log_batch_to_status_and_stdout(messages):
+            # Only the newest message ends up in the status bar
+            for msg in messages[:-1]:
+                print(msg)
+            log_to_status_and_stdout(messages[-1])
+        self.log_worker.log_batch.connect(log_batch_to_status_and_stdout)
         self.log_worker.start()
         # Only start syslog server if port is available
         import socket
@@ -116,7 +124,8 @@ class MainWindow(QMainWindow):
             syslog_port_available = False
         if syslog_port_available:
             self.syslog_worker = SyslogWorker()
-            self.syslog_worker.syslog_message.connect(self.ui.append_syslog)
+            self.syslog_worker.syslog_batch.connect(self.ui.append_syslog_batch)
+            self.syslog_worker.spill_enabled = self.settings.value("syslog_spill", False, type=bool)
             self.syslog_worker.log.connect(log_to_status_and_stdout)
             self.syslog_worker.start()
         else:
@@ -171,8 +180,9 @@ class MainWindow(QMainWindow):
         # Forwarding should be enabled by default if ports are set
         # The `route_midi_in_to_out_enabled` attribute should be checked by forwarding methods
         self.route_midi_in_to_out_enabled = True # Enable by default
-        if hasattr(self.ui, 'route_midi_action') and self.ui.route_midi_action:
-            self.ui.route_midi_action.setChecked(True)
+        self.midi_handler.thru.enabled = True
+        if getattr(self, 'route_midi_action', None):
+            self.route_midi_action.setChecked(True)
         self.show_status("[UI] MIDI In-to-Out forwarding enabled by default.")
 
     def closeEvent(self, event):
@@ -205,43 +215,13 @@ class MainWindow(QMainWindow):
             self.firewall_worker = None
         logging.debug('closeEvent: Closing midi_handler')
         self.midi_handler.close()
+        logging.debug('closeEvent: Writing download cache index')
+        from cache_store import close_cache_store
+        close_cache_store()
         logging.debug('closeEvent: Accepting event')
         event.accept()
         QApplication.quit()
 
-    def _maybe_forward_any(self, msg):
-        # Log every incoming message
-        print(f"[MIDI FORWARD DEBUG] _maybe_forward_any called with: {msg!r} (type: {type(msg)})")
-        # [MIDI FORWARD DEBUG] _maybe_forward_any called with: Message('note_on', channel=0, note=74, velocity=35, time=0) (type: <class 'mido.messages.messages.Message'>)
-
-        if not getattr(self, 'route_midi_in_to_out_enabled', False) or not self.midi_handler:
-            print(f"[MIDI FORWARD DEBUG] Not forwarding: routing_disabled={not getattr(self, 'route_midi_in_to_out_enabled', False)} or no midi_handler")
-            return
-
-        can_send = self.midi_handler.udp_output_active or (self.midi_handler.outport and not getattr(self.midi_handler.outport, 'closed', True))
-        if not can_send:
-            print("[MIDI FORWARD DEBUG] No valid MIDI output configured in MIDIHandler.")
-            return
-
-        # Log where the message will be forwarded and print bytes
-        if self.midi_handler.udp_output_active:
-            midi_bytes = msg.bytes()
-            hex_str = ' '.join(f'{b:02X}' for b in midi_bytes)
-            print(f"[MIDI FORWARD DEBUG] Forwarding to UDP Socket output: {hex_str}")
-        elif self.midi_handler.outport:
-            midi_bytes = msg.bytes()
-            hex_str = ' '.join(f'{b:02X}' for b in midi_bytes)
-            print(f"[MIDI FORWARD DEBUG] Forwarding to MIDI outport {self.midi_handler.current_output_port_name}: {hex_str}")
-        else:
-            print("[MIDI FORWARD DEBUG] No output port to forward to.")
-
-        if isinstance(msg, list):
-            self.midi_handler.send_sysex(msg)
-        elif hasattr(msg, 'type') and hasattr(msg, 'bytes'):
-            self.midi_handler.send_mido_message(msg)
-        else:
-            print(f"[MIDI FORWARD DEBUG] Unknown message type for forwarding: {type(msg)}")
-
     def show_status(self, msg):
         self.statusBar().showMessage(msg)
         print(msg)
@@ -326,7 +306,8 @@ class MainWindow(QMainWindow):
                         return
                 github_token = self.settings.value("github_token", "")
                 progress_dlg = UpdaterProgressDialog(self)
-                worker = UpdaterWorker(release_type, pr_number, device_ip, update_performances, github_token=github_token, src_path=src_path)
+                worker = UpdaterWorker(release_type, pr_number, device_ip, update_performances, github_token=github_token, src_path=src_path,
+                                       ftp_connections=self.settings.value("ftp_connections", DEPLOY_CONNECTIONS, type=int))
                 worker.status.connect(progress_dlg.set_status)
                 worker.progress.connect(progress_dlg.set_progress)
                 def on_finished(success, msg):
@@ -375,7 +356,8 @@ class MainWindow(QMainWindow):
                     return
             github_token = self.settings.value("github_token", "")
             progress_dlg = UpdaterProgressDialog(self)
-            worker = UpdaterWorker(release_type, pr_number, device_ip, update_performances, github_token=github_token, src_path=src_path)
+            worker = UpdaterWorker(release_type, pr_number, device_ip, update_performances, github_token=github_token, src_path=src_path,
+                                   ftp_connections=self.settings.value("ftp_connections", DEPLOY_CONNECTIONS, type=int))
             worker.status.connect(progress_dlg.set_status)
             worker.progress.connect(progress_dlg.set_progress)
             def on_finished(success, msg):
@@ -3,7 +3,7 @@ from PySide6.QtWidgets import QApplication, QDialog, QVBoxLayout, QLabel, QSlide
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QIntValidator
 import os
-import json
+from midi_command_template import load_command_file
 import re
 from dialogs import PreferencesDialog
 from performance_editor import PerformanceEditor
@@ -140,19 +140,100 @@ def setup_menus(main_window):
     def on_route_midi_toggled(checked):
         main_window.settings.setValue("route_midi_in_to_out", checked)
         main_window.route_midi_in_to_out_enabled = checked
+        main_window.midi_handler.thru.enabled = checked
     main_window.route_midi_action.toggled.connect(on_route_midi_toggled)
     main_window.route_midi_in_to_out_enabled = checked
+    main_window.midi_handler.thru.enabled = checked
+
+    # MIDI Thru filter, channel map and latency
+    def load_thru_settings():
+        blocked = main_window.settings.value("thru_blocked_types", "", type=str)
+        channel_map = main_window.settings.value("thru_channel_map", "", type=str).split(",")
+        if len(channel_map) != 16:
+            channel_map = [str(ch) for ch in range(16)]
+        main_window.midi_handler.thru.configure(
+            blocked_types=[kind for kind in blocked.split(",") if kind],
+            channel_map=[None if int(ch) < 0 else int(ch) for ch in channel_map],
+            transpose=main_window.settings.value("thru_transpose", 0, type=int))
+    load_thru_settings()
+    midi_thru_action = QAction("MIDI Thru...", main_window)
+    options_menu.addAction(midi_thru_action)
+    def show_midi_thru():
+        from dialogs import MidiThruDialog
+        thru = main_window.midi_handler.thru
+        dlg = MidiThruDialog(main_window, thru=thru)
+        dlg.exec()
+        main_window.settings.setValue("thru_blocked_types", ",".join(sorted(thru.blocked_types)))
+        main_window.settings.setValue("thru_channel_map", ",".join(str(-1 if ch is None else ch) for ch in thru.channel_map))
+        main_window.settings.setValue("thru_transpose", thru.transpose)
+    midi_thru_action.triggered.connect(show_midi_thru)
+
+    # Coalesce UDP MIDI output
+    udp_coalesce_action = QAction("Coalesce UDP MIDI Datagrams", main_window)
+    udp_coalesce_action.setCheckable(True)
+    udp_coalesce = main_window.settings.value("udp_coalesce", False, type=bool)
+    udp_coalesce_action.setChecked(udp_coalesce)
+    options_menu.addAction(udp_coalesce_action)
+    def on_udp_coalesce_toggled(checked):
+        main_window.settings.setValue("udp_coalesce", checked)
+        main_window.midi_handler.set_udp_coalescing(
+            checked,
+            flush_interval=main_window.settings.value("udp_flush_interval_ms", 1.0, type=float) / 1000.0,
+            max_datagram=main_window.settings.value("udp_max_datagram", 1024, type=int))
+    udp_coalesce_action.toggled.connect(on_udp_coalesce_toggled)
+    on_udp_coalesce_toggled(udp_coalesce)
+
+    # Keep the full syslog in rotating files on disk
+    syslog_spill_action = QAction("Save Syslog to Disk", main_window)
+    syslog_spill_action.setCheckable(True)
+    syslog_spill_action.setChecked(main_window.settings.value("syslog_spill", False, type=bool))
+    options_menu.addAction(syslog_spill_action)
+    def on_syslog_spill_toggled(checked):
+        main_window.settings.setValue("syslog_spill", checked)
+        if getattr(main_window, 'syslog_worker', None):
+            main_window.syslog_worker.spill_enabled = checked
+    syslog_spill_action.toggled.connect(on_syslog_spill_toggled)
+
+    # MIDI Trace
+    from midi_trace import TRACE_OFF
+    main_window.midi_handler.trace.set_level(main_window.settings.value("midi_trace_level", TRACE_OFF, type=int))
+    midi_trace_action = QAction("MIDI Trace...", main_window)
+    options_menu.addAction(midi_trace_action)
+    def show_midi_trace():
+        from dialogs import MidiTraceDialog
+        dlg = MidiTraceDialog(main_window, trace=main_window.midi_handler.trace)
+        dlg.exec()
+        main_window.settings.setValue("midi_trace_level", main_window.midi_handler.trace.level)
+    midi_trace_action.triggered.connect(show_midi_trace)
 
     # Preferences
     preferences_action = QAction("Preferences...", main_window)
     options_menu.addAction(preferences_action)
     def show_preferences():
         from dialogs import PreferencesDialog
+        from cache_store import get_cache_store, DEFAULT_QUOTA_MB
         token = main_window.settings.value("github_token", "")
-        dlg = PreferencesDialog(main_window, github_token=token)
+        from param_outbox import DEFAULT_SEND_RATE
+        quota_mb = main_window.settings.value("cache_quota_mb", DEFAULT_QUOTA_MB, type=int)
+        send_rate = main_window.settings.value("param_send_rate_hz", DEFAULT_SEND_RATE, type=int)
+        from ftp_deploy import DEPLOY_CONNECTIONS
+        ftp_connections = main_window.settings.value("ftp_connections", DEPLOY_CONNECTIONS, type=int)
+        dlg = PreferencesDialog(main_window, github_token=token, cache_quota_mb=quota_mb, param_send_rate=send_rate,
+                                ftp_connections=ftp_connections)
         if dlg.exec():
             new_token = dlg.get_github_token()
             main_window.settings.setValue("github_token", new_token)
+            quota_mb = dlg.get_cache_quota_mb()
+            main_window.settings.setValue("cache_quota_mb", quota_mb)
+            get_cache_store().set_quota(quota_mb * 1024 * 1024)
+            main_window.settings.setValue("param_send_rate_hz", dlg.get_param_send_rate())
+            main_window.settings.setValue("ftp_connections", dlg.get_ftp_connections())
+            from voice_editor_panel import VoiceEditorPanel
+            if VoiceEditorPanel._instance is not None:
+                try:
+                    VoiceEditorPanel._instance.param_outbox.set_rate(dlg.get_param_send_rate())
+                except RuntimeError:
+                    pass  # Panel already deleted
     preferences_action.triggered.connect(show_preferences)
 
     # MIDI Commands Menu
@@ -302,11 +383,8 @@ def setup_menus(main_window):
                 QApplication.instance().midi_handler.send_custom_midi_command(cmd, values)
 
     def load_midi_commands_from_file(json_path):
-        try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return []
+        # Parsed and compiled once; reloaded only when the file changes
+        return load_command_file(json_path)
 
     def add_midi_command_menu_items(menu, commands):
         for cmd in commands:
@@ -1,12 +1,12 @@
 import sys
 import os
-import hashlib
 import requests
 import mido
 import logging
 import json
+import time
 logging.basicConfig(level=logging.DEBUG)
-from PySide6.QtCore import QThread, Signal, Qt, QTimer
+from PySide6.QtCore import Qt, QSettings
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QListWidget, QHBoxLayout, QPushButton, QLabel, QStatusBar, QListWidgetItem, QLineEdit,
     QCheckBox, QApplication, QRadioButton, QButtonGroup
@@ -14,43 +14,91 @@ from PySide6.QtWidgets import (
 from PySide6.QtGui import QIcon
 from dialogs import Dialogs
 from track_channel_dialog import TrackChannelDialog
-from voice_browser import VoiceBrowser
+from cache_store import get_cache_store, get_app_data_dir
+from download_service import get_download_service, PRIORITY_USER
+from gm_voices import get_gm_voice_table, GMVoiceResolver
+from midi_transform import MidiTransform
+from workers import FileSaveWorker
 
 MIDBROWSER_API_URL = "https://gifx.co/chip/browse?path="
+MIDBROWSER_SEARCH_URL = "https://gifx.co/chip/search?query={}&limit=100"
 MIDBROWSER_CACHE_NAME = "midbrowser_cache.json"
+LISTING_TTL = 24 * 3600  # Seconds before a cached listing is refreshed from the server
 
 # Cache directory for .mid files and listings
 def get_mid_cache_dir():
     return os.path.join(os.getenv('LOCALAPPDATA') or os.path.expanduser('~/.local/share'), 'MiniDexed_Service_Utility', 'mid_cache')
 
-class MidFileDownloadWorker(QThread):
-    finished = Signal(str, str, object)  # local_path, file_name, error
-    def __init__(self, url, file_name):
-        super().__init__()
-        self.url = url
-        self.file_name = file_name
-    def run(self):
+def is_mid_path(path):
+    path = path.lower()
+    return path.endswith('.mid') or path.endswith('.midi')
+
+def filter_entries(entries):
+    # Directories first, then MIDI files, alphabetically
+    entries = [e for e in entries if e.get('type') == 'directory' or is_mid_path(e['path'])]
+    entries.sort(key=lambda e: (e.get('type') != 'directory', e['path'].lower()))
+    return entries
+
+def parse_directory_listing(data):
+    if not isinstance(data, list):
+        raise Exception('Unexpected directory listing format')
+    return filter_entries(data)
+
+def parse_search_results(data):
+    if isinstance(data, dict):
+        if 'items' in data:
+            data = [{'type': 'file', 'path': '/' + item['file']} for item in data['items']]
+        elif 'results' in data:
+            data = data['results']
+        else:
+            logging.error(f"Unexpected search result format: {data}")
+            raise Exception(data.get('error', 'Unexpected search result format'))
+    if not isinstance(data, list):
+        logging.error(f"Entries is not a list: {data}")
+        raise Exception('Unexpected search result format')
+    return filter_entries(data)
+
+class ListingCache:
+    """
+    Directory listings and search results keyed by "browse:<path>" / "search:<query>".
+    Entries younger than ttl are served without asking the server; older ones are
+    still shown immediately (and used when offline) while a refresh runs.
+    Persisted as JSON in the application data directory.
+    """
+    def __init__(self, path, ttl=LISTING_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._entries = {}
         try:
-            cache_dir = get_mid_cache_dir()
-            os.makedirs(cache_dir, exist_ok=True)
-            url_hash = hashlib.sha256(self.url.encode('utf-8')).hexdigest()
-            cache_path = os.path.join(cache_dir, url_hash + '.mid')
-            if os.path.exists(cache_path):
-                self.finished.emit(cache_path, self.file_name, None)
-                return
-            resp = requests.get(self.url)
-            resp.raise_for_status()
-            with open(cache_path, 'wb') as f:
-                f.write(resp.content)
-            self.finished.emit(cache_path, self.file_name, None)
-        except Exception as e:
-            self.finished.emit('', self.file_name, e)
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def get(self, key):
+        """Return (entries, fresh), or (None, False) if key was never listed."""
+        cached = self._entries.get(key)
+        if cached is None:
+            return None, False
+        timestamp, entries = cached
+        return entries, time.time() - timestamp < self.ttl
+
+    def put(self, key, entries):
+        self._entries[key] = [time.time(), entries]
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[ERROR] Could not save MIDI browser listing cache: {e}", file=sys.stderr)
 
 class MidBrowser(QDialog):
     def __init__(self, parent=None, main_window=None):
         super().__init__(parent)
         self.main_window = main_window
-        self._active_gm_workers = []
+        self._gm_resolver = None
         self.setWindowTitle("MIDI File Browser")
         self.resize(500, 500)
         layout = QVBoxLayout(self)
@@ -72,10 +120,15 @@ class MidBrowser(QDialog):
         nav_layout.addWidget(self.send_button)
         layout.addLayout(nav_layout)
         self.status_bar = QStatusBar(self)
+        self.cache_label = QLabel(self)
+        self.status_bar.addPermanentWidget(self.cache_label)
         layout.addWidget(self.status_bar)
         self.current_path = "/"
         self.dir_stack = []
         self.entries = []
+        self.listing_cache = ListingCache(os.path.join(get_app_data_dir(), MIDBROWSER_CACHE_NAME))
+        self.listing_request = None
+        self._listing_generation = 0
         self.list_widget.itemDoubleClicked.connect(self.on_item_double_clicked)
         self.list_widget.itemSelectionChanged.connect(self.update_buttons)
         self.search_box.returnPressed.connect(self._do_search)
@@ -89,6 +142,10 @@ class MidBrowser(QDialog):
         self.radio_group.addButton(self.filter_radio)
         layout.insertWidget(1, self.gm_radio)
         layout.insertWidget(2, self.filter_radio)
+        self.save_checkbox = QCheckBox("Save modified file to cache", self)
+        self.save_checkbox.setChecked(QSettings("MIDISend", "MIDISendApp").value("midbrowser_save_modified", True, type=bool))
+        self.save_checkbox.toggled.connect(lambda checked: QSettings("MIDISend", "MIDISendApp").setValue("midbrowser_save_modified", checked))
+        layout.insertWidget(3, self.save_checkbox)
         # Remove old checkboxes if present
         if hasattr(self, 'filter_bank_checkbox'):
             self.filter_bank_checkbox.setParent(None)
@@ -96,6 +153,7 @@ class MidBrowser(QDialog):
             self.replace_gm_checkbox.setParent(None)
 
     def set_status(self, msg, error=False):
+        self.cache_label.setText(get_cache_store().stats_text())
         self.status_bar.showMessage(msg)
         if error:
             print(msg, file=sys.stderr)
@@ -104,30 +162,9 @@ class MidBrowser(QDialog):
 
     def load_directory(self, path):
         logging.info(f"load_directory called with path={path}")
-        self.list_widget.clear()
-        self.entries = []
-        self.breadcrumb_label.setText(f"Path: {path}")
-        self.set_status(f"Loading {path} ...")
-        try:
-            url = MIDBROWSER_API_URL + requests.utils.quote(path)
-            resp = requests.get(url)
-            resp.raise_for_status()
-            entries = resp.json()
-            entries = [e for e in entries if e['type'] == 'directory' or e['path'].lower().endswith('.mid') or e['path'].lower().endswith('.midi')]
-            entries.sort(key=lambda e: (e['type'] != 'directory', not (e['path'].lower().endswith('.mid') or e['path'].lower().endswith('.midi')), e['path'].lower()))
-            self.entries = entries
-            for entry in entries:
-                name = os.path.basename(entry['path'])
-                if entry['type'] == 'directory':
-                    item = QListWidgetItem(QIcon.fromTheme('folder'), name)
-                elif name.lower().endswith('.mid') or name.lower().endswith('.midi'):
-                    item = QListWidgetItem(name)
-                else:
-                    continue
-                self.list_widget.addItem(item)
-            self.set_status(f"{len(entries)} items.")
-        except Exception as e:
-            self.set_status(f"Failed to load directory: {e}", error=True)
+        url = MIDBROWSER_API_URL + requests.utils.quote(path)
+        self._load_listing("browse:" + path, url, parse_directory_listing, f"Path: {path}",
+                           f"Loading {path} ...", "items.", "Failed to load directory")
 
     def _do_search(self):
         text = self.search_box.text().strip()
@@ -135,56 +172,67 @@ class MidBrowser(QDialog):
             self.load_search_results(text)
 
     def load_search_results(self, query):
-        self.set_status(f"Searching for '{query}' ...")
-        self.list_widget.clear()
-        self.entries = []
-        self.breadcrumb_label.setText(f"Search: {query}")
-        try:
-            url = f"https://gifx.co/chip/search?query={requests.utils.quote(query)}&limit=100"
-            logging.info(f"Search URL: {url}")
-            resp = requests.get(url)
-            resp.raise_for_status()
-            entries = resp.json()
-            logging.info(f"Raw search response: {entries}")
-            if isinstance(entries, dict):
-                if 'items' in entries:
-                    items = entries['items']
-                    entries = [
-                        {'type': 'file', 'path': '/' + item['file']} for item in items
-                    ]
-                elif 'results' in entries:
-                    entries = entries['results']
-                else:
-                    logging.error(f"Unexpected search result format: {entries}")
-                    raise Exception(entries.get('error', 'Unexpected search result format'))
-            if not isinstance(entries, list):
-                logging.error(f"Entries is not a list: {entries}")
-                raise Exception('Unexpected search result format')
-            entries = [e for e in entries if e.get('type') == 'directory' or e['path'].lower().endswith('.mid') or e['path'].lower().endswith('.midi')]
-            logging.info(f"Filtered entries: {entries}")
-            entries.sort(key=lambda e: (e.get('type') != 'directory', not (e['path'].lower().endswith('.mid') or e['path'].lower().endswith('.midi')), e['path'].lower()))
-            self.entries = entries
-            for entry in entries:
-                name = os.path.basename(entry['path'])
-                logging.info(f"Adding entry to list: {entry}")
-                if entry.get('type') == 'directory':
-                    item = QListWidgetItem(QIcon.fromTheme('folder'), name)
-                elif name.lower().endswith('.mid') or name.lower().endswith('.midi'):
-                    item = QListWidgetItem(name)
+        url = MIDBROWSER_SEARCH_URL.format(requests.utils.quote(query))
+        logging.info(f"Search URL: {url}")
+        self._load_listing("search:" + query, url, parse_search_results, f"Search: {query}",
+                           f"Searching for '{query}' ...", "items found.", "Search failed")
+
+    def _load_listing(self, key, url, parse, breadcrumb, loading_msg, done_msg, fail_msg):
+        # Only the newest listing may update the view; an older request still in flight is dropped
+        self._listing_generation += 1
+        generation = self._listing_generation
+        if self.listing_request is not None:
+            self.listing_request.cancel()
+            self.listing_request = None
+        self.breadcrumb_label.setText(breadcrumb)
+        cached, fresh = self.listing_cache.get(key)
+        if cached is not None:
+            self._show_entries(cached)
+            self.set_status(f"{len(cached)} {done_msg}")
+            if fresh:
+                return
+        else:
+            self._show_entries([])
+            self.set_status(loading_msg)
+        def on_listing(data, error):
+            if generation != self._listing_generation:
+                return
+            self.listing_request = None
+            if error is None:
+                try:
+                    entries = parse(json.loads(data))
+                except Exception as e:
+                    error = e
+            if error is not None:
+                if cached is not None:
+                    self.set_status(f"{len(cached)} {done_msg} (offline, cached listing: {error})")
                 else:
-                    continue
-                self.list_widget.addItem(item)
-            self.set_status(f"{len(entries)} items found.")
-        except Exception as e:
-            logging.error(f"Search failed: {e}")
-            self.set_status(f"Search failed: {e}", error=True)
+                    self.set_status(f"{fail_msg}: {error}", error=True)
+                return
+            self.listing_cache.put(key, entries)
+            if entries != cached:
+                self._show_entries(entries)
+            self.set_status(f"{len(entries)} {done_msg}")
+        self.listing_request = get_download_service().fetch(url, on_listing, PRIORITY_USER, use_cache=False)
+
+    def _show_entries(self, entries):
+        self.list_widget.setUpdatesEnabled(False)
+        self.list_widget.clear()
+        self.entries = entries
+        for entry in entries:
+            name = os.path.basename(entry['path'])
+            if entry.get('type') == 'directory':
+                self.list_widget.addItem(QListWidgetItem(QIcon.fromTheme('folder'), name))
+            else:
+                self.list_widget.addItem(QListWidgetItem(name))
+        self.list_widget.setUpdatesEnabled(True)
 
     def on_item_double_clicked(self, item):
         idx = self.list_widget.currentRow()
         if idx < 0 or idx >= len(self.entries):
             return
         entry = self.entries[idx]
-        if entry['type'] == 'directory':
+        if entry.get('type') == 'directory':
             self.dir_stack.append(self.current_path)
             self.current_path = entry['path']
             self.load_directory(self.current_path)
@@ -223,9 +271,9 @@ class MidBrowser(QDialog):
         print(f"URL: {url}")
         file_name = os.path.basename(entry['path'])
         self.set_status(f"Downloading {file_name} ...")
-        self.worker = MidFileDownloadWorker(url, file_name)
-        self.worker.finished.connect(self.on_mid_downloaded)
-        self.worker.start()
+        def after_download(local_path, error):
+            self.on_mid_downloaded(local_path or '', file_name, error)
+        self.mid_request = get_download_service().fetch(url, after_download, PRIORITY_USER, want_path=True)
 
     def on_mid_downloaded(self, local_path, file_name, error):
         if error:
@@ -247,22 +295,16 @@ class MidBrowser(QDialog):
                 QApplication.instance().midi_handler.send_sysex(sysex)
             # Set TGs to MIDI channels
             assignments = dlg.get_assignments()
-            new_midi = mido.MidiFile()
-            new_midi.ticks_per_beat = midi.ticks_per_beat
             filter_bank = self.filter_radio.isChecked()
             replace_gm = self.gm_radio.isChecked()
-            filtered_set = set(dlg.filtered_track_indices)
             assign_map = dict(zip(dlg.filtered_track_indices, assignments))
-            gm_map = None
-            gm_voice_results = {}
-            gm_voice_needed = set()
             # Helper to build and send the MIDI file after all downloads
-            def proceed_to_send_midi():
+            def proceed_to_send_midi(gm_results=None):
                 # Show GM replacements dialog if needed
-                if replace_gm and gm_voice_results:
+                if replace_gm and gm_results:
                     from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QDialogButtonBox, QTableWidget, QTableWidgetItem
                     class GMReplacementDialog(QDialog):
-                        def __init__(self, parent, gm_map, gm_voice_results):
+                        def __init__(self, parent, gm_table, gm_results):
                             super().__init__(parent)
                             self.setWindowTitle("GM Program Replacements")
                             layout = QVBoxLayout(self)
@@ -271,69 +313,35 @@ class MidBrowser(QDialog):
                             table = QTableWidget(self)
                             table.setColumnCount(3)
                             table.setHorizontalHeaderLabels(["GM Program #", "GM Name", "DX7 Voice"])
-                            # Only show rows for which a replacement is actually used
-                            used_gm_nums = [int(k) for k in gm_map if gm_map[k]['dx7_voices'] and gm_map[k]['dx7_voices'][0] in gm_voice_results]
-                            table.setRowCount(len(used_gm_nums))
-                            for row, gm_num in enumerate(sorted(used_gm_nums)):
-                                gm_num_str = str(gm_num)
-                                gm_entry = gm_map[gm_num_str]
-                                dx7_name = gm_entry['dx7_voices'][0] if gm_entry['dx7_voices'] else "(none)"
-                                table.setItem(row, 0, QTableWidgetItem(gm_num_str))
-                                table.setItem(row, 1, QTableWidgetItem(gm_entry.get('name', '')))
-                                table.setItem(row, 2, QTableWidgetItem(dx7_name))
+                            # One row per program in the file; the voice is the candidate actually fetched
+                            table.setRowCount(len(gm_results))
+                            for row, gm_num in enumerate(sorted(gm_results)):
+                                dx7_name, syx_data, error = gm_results[gm_num]
+                                table.setItem(row, 0, QTableWidgetItem(str(gm_num)))
+                                table.setItem(row, 1, QTableWidgetItem(gm_table.gm_name(gm_num)))
+                                table.setItem(row, 2, QTableWidgetItem(dx7_name if syx_data else f"(skipped: {error})"))
                             table.resizeColumnsToContents()
                             layout.addWidget(table)
                             buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
                             buttons.accepted.connect(self.accept)
                             buttons.rejected.connect(self.reject)
                             layout.addWidget(buttons)
-                    dlg = GMReplacementDialog(self, gm_map, gm_voice_results)
+                    dlg = GMReplacementDialog(self, gm_table, gm_results)
                     if not dlg.exec():
                         self.set_status("User cancelled after viewing GM replacements.")
                         return
-                # Create new MIDI file with the same tracks and messages
-                # but with the assigned channels and optionally DX7 voices instead of GM program changes
-                for i, track in enumerate(midi.tracks):
-                    new_track = mido.MidiTrack()
-                    if i in assign_map:
-                        channel = assign_map[i] - 1
-                        for msg in track:
-                            if replace_gm and msg.type == "program_change":
-                                gm_num = msg.program
-                                gm_entry = gm_map.get(str(gm_num))
-                                if gm_entry and gm_entry['dx7_voices']:
-                                    dx7_name = gm_entry['dx7_voices'][0]
-                                    syx_data, error = gm_voice_results.get(dx7_name, (None, None))
-                                    if error or not syx_data:
-                                        self.set_status(f"Failed to get SysEx for '{dx7_name}'", error=True)
-                                        continue  # Skip this program change
-                                    # Patch channel in sysex and REPLACE the program change with the SysEx
-                                    sysex = list(syx_data)
-                                    if len(sysex) > 3:
-                                        sysex[2] = 0x10 | (channel & 0x0F)
-                                    if sysex[0] != 0xF0:
-                                        sysex = [0xF0] + sysex
-                                    if sysex[-1] != 0xF7:
-                                        sysex = sysex + [0xF7]
-                                    # Insert SysEx at the same time as the program change, REPLACING it
-                                    msg_sysex = mido.Message('sysex', data=sysex[1:-1], time=msg.time)
-                                    new_track.append(msg_sysex)
-                                    continue  # Do NOT add the original program_change, only the SysEx
-                            if filter_bank:
-                                if msg.type == "program_change":
-                                    continue
-                                if msg.type == "control_change" and hasattr(msg, 'control') and msg.control in (0, 32):
-                                    continue
-                            # Copy all other messages, updating channel if appropriate
-                            if hasattr(msg, 'channel'):
-                                msg_out = msg.copy(channel=channel)
-                            else:
-                                msg_out = msg
-                            new_track.append(msg_out)
-                    else:
-                        for msg in track:
-                            new_track.append(msg)
-                    new_midi.tracks.append(new_track)
+                program_sysex = None
+                if replace_gm:
+                    program_sysex = {}
+                    for program, (dx7_name, syx_data, error) in (gm_results or {}).items():
+                        if not syx_data:
+                            # Its program changes are skipped
+                            self.set_status(f"Failed to get SysEx for GM program {program} ('{dx7_name}'): {error}", error=True)
+                        program_sysex[program] = syx_data
+                # Assigned channels and optionally DX7 voices instead of GM program changes are
+                # applied while the file plays; no rewritten copy is built first
+                transform = MidiTransform(midi, assign_map, filter_bank=filter_bank, program_sysex=program_sysex,
+                                          filename=file_name)
                 mw = self.main_window
                 # Allow if either a real MIDI outport or UDP output is active
                 midi_handler = getattr(mw, 'midi_handler', None)
@@ -344,79 +352,38 @@ class MidBrowser(QDialog):
                     Dialogs.show_error(self, "Error", "No MIDI Out port selected in main window.")
                     return
                 midi_ops = mw.midi_ops
-                def start_new_file():
-                    # Save the modified MIDI file to cache before sending
-                    from file_utils import FileUtils
+                if hasattr(midi_ops, '_repeat_blocked') and getattr(midi_ops, '_repeat_blocked', False):
+                    midi_ops._repeat_blocked = False
+                mw.file_ops.loaded_midi = transform
+                QApplication.instance().midi_handler.stop_midi_file()
+                QApplication.instance().midi_handler.send_midi_file(transform, on_finished=midi_ops.on_midi_send_finished, on_log=mw.show_status)
+                if self.save_checkbox.isChecked():
+                    # Write the modified file to the cache in the background while it plays
                     cache_dir = get_mid_cache_dir()
                     os.makedirs(cache_dir, exist_ok=True)
                     base, ext = os.path.splitext(file_name)
                     modified_path = os.path.join(cache_dir, base + '.modified.mid')
-                    FileUtils.save_mid(modified_path, new_midi)
-                    new_midi.filename = modified_path  # So MIDIHandler can use the file path
-                    mw.show_status(f"Saved modified MIDI to {modified_path}")
-                    mw.file_ops.loaded_midi = new_midi
-                    # Load the file from disk and stream it out timed
-                    midi_to_send = mido.MidiFile(modified_path)
-                    QApplication.instance().midi_handler.send_midi_file(midi_to_send, on_finished=midi_ops.on_midi_send_finished, on_log=mw.show_status)
-                if hasattr(midi_ops, '_repeat_blocked') and getattr(midi_ops, '_repeat_blocked', False):
-                    midi_ops._repeat_blocked = False
-                QApplication.instance().midi_handler.stop_midi_file()
-                QTimer.singleShot(100, start_new_file)
+                    self._save_worker = FileSaveWorker(modified_path, 'mid', transform)
+                    self._save_worker.saved.connect(lambda p: mw.show_status(f"Saved modified MIDI to {p}"))
+                    self._save_worker.error.connect(lambda e: self.set_status(f"Failed to save modified MIDI: {e}", error=True))
+                    self._save_worker.start()
             # GM voice download logic
             if replace_gm:
-                gm_path = os.path.join(os.path.dirname(__file__), 'data', 'general_midi.json')
-                if not os.path.exists(gm_path):
-                    gm_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'general_midi.json')
-                with open(gm_path, 'r', encoding='utf-8') as f:
-                    gm_map = json.load(f)
-                from voice_browser import get_cache_dir, VOICE_LIST_CACHE_NAME
-                cache_path = os.path.join(get_cache_dir(), VOICE_LIST_CACHE_NAME)
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    dx7_voices = json.load(f)
-                def find_dx7_voice_sysex(name):
-                    for v in dx7_voices:
-                        if v['name'].strip().upper() == name.strip().upper():
-                            return v
-                    return None
-                # Collect all needed DX7 voice names for all program changes
+                # Name and GM program lookups are prebuilt; rebuilt only when patch_list.json changes
+                gm_table = get_gm_voice_table()
+                programs = set()
                 for i, track in enumerate(midi.tracks):
                     if i in assign_map:
                         for msg in track:
                             if msg.type == "program_change":
-                                gm_num = msg.program
-                                gm_entry = gm_map.get(str(gm_num))
-                                if gm_entry and gm_entry['dx7_voices']:
-                                    dx7_name = gm_entry['dx7_voices'][0]
-                                    gm_voice_needed.add(dx7_name)
-                # Start all downloads and proceed when all are done
-                if not gm_voice_needed:
-                    logging.debug("No GM replacement voices needed, proceeding to send MIDI.")
-                    proceed_to_send_midi()
-                    return
-                self._pending_gm_downloads = len(gm_voice_needed)
-                logging.debug(f"Starting GM replacement voice downloads: {self._pending_gm_downloads} needed: {list(gm_voice_needed)}")
-                def make_cb(dx7_name):
-                    def cb(syx_data, voice_name, error):
-                        gm_voice_results[dx7_name] = (syx_data, error)
-                        self._pending_gm_downloads -= 1
-                        logging.debug(f"GM voice '{dx7_name}' download finished. Remaining: {self._pending_gm_downloads}")
-                        if self._pending_gm_downloads == 0:
-                            logging.debug("All GM replacement voice downloads finished, proceeding to send MIDI.")
-                            proceed_to_send_midi()
-                    return cb
-                for dx7_name in gm_voice_needed:
-                    dx7_voice = find_dx7_voice_sysex(dx7_name)
-                    cb = make_cb(dx7_name)
-                    if dx7_voice:
-                        worker = VoiceBrowser.get_syx_data_for_voice_async(dx7_voice, cb)
-                        if worker is not None:
-                            self._active_gm_workers.append(worker)
-                        else:
-                            logging.error(f"GM replacement voice '{dx7_name}' worker not started.")
-                            cb(None, dx7_name, Exception("Worker not started"))
-                    else:
-                        logging.error(f"GM replacement voice '{dx7_name}' not found in library.")
-                        cb(None, dx7_name, Exception("Voice not found in library"))
+                                programs.add(msg.program)
+                # All voices are fetched in parallel (with fallbacks); one callback when all are done
+                if self._gm_resolver is not None:
+                    self._gm_resolver.cancel()
+                self._gm_resolver = GMVoiceResolver(gm_table, parent=self)
+                self._gm_resolver.finished.connect(proceed_to_send_midi)
+                logging.debug(f"Resolving GM replacement voices for programs {sorted(programs)}")
+                self._gm_resolver.resolve(programs)
                 return  # Wait for async downloads to finish before proceeding
             # If not replacing GM, just proceed
             proceed_to_send_midi()
@@ -424,18 +391,16 @@ class MidBrowser(QDialog):
             Dialogs.show_error(self, "MIDI Error", f"Failed to parse/send MIDI: {e}")
 
     def closeEvent(self, event):
-        # Ensure all GM replacement workers are stopped and waited for
-        try:
-            for worker in list(getattr(self, '_active_gm_workers', [])):
-                try:
-                    worker.quit()
-                    worker.wait()
-                except Exception:
-                    pass
-            if hasattr(self, '_active_gm_workers'):
-                self._active_gm_workers.clear()
-        except Exception:
-            pass
+        # Drop callbacks of GM replacement and .mid downloads that are still pending
+        if self._gm_resolver is not None:
+            self._gm_resolver.cancel()
+            self._gm_resolver = None
+        if self.listing_request is not None:
+            self.listing_request.cancel()
+            self.listing_request = None
+        if getattr(self, 'mid_request', None):
+            self.mid_request.cancel()
+            self.mid_request = None
         super().closeEvent(event)
 
 if __name__ == "__main__":
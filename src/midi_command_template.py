@@ -0,0 +1,129 @@
+import os
+import re
+import json
+
+# Slot kinds
+SLOT_BYTE = 0     # {param}        -> value & 0x7F
+SLOT_NIBBLE = 1   # 2{param}       -> 0x20 | (value & 0x0F)
+SLOT_14BIT = 2    # value > 127    -> LSB, MSB (e.g. Pitch Bend)
+
+_PARAM_TOKEN = re.compile(r'^([0-9A-Fa-f])?\{([a-zA-Z0-9_]+)\}$')
+
+def param_key(param):
+    # Template keys are the parameter names in lowercase with underscores
+    return param["name"].lower().replace(" ", "_")
+
+class CompiledCommand:
+    """
+    A midi_commands/*.json entry parsed once into a fixed byte buffer plus parameter slots.
+    Encoding copies the buffer and fills in the slots; no string handling is involved.
+    """
+    __slots__ = ('name', 'template', 'slots')
+
+    def __init__(self, name, template, slots):
+        self.name = name
+        self.template = bytes(template)
+        self.slots = tuple(slots)  # (position, parameter index, kind, base, offset)
+
+    @property
+    def is_sysex(self):
+        return bool(self.template) and self.template[0] == 0xF0
+
+    def encode(self, values):
+        buf = bytearray(self.template)
+        for pos, idx, kind, base, offset in self.slots:
+            value = int(values[idx]) - offset
+            if kind == SLOT_NIBBLE:
+                buf[pos] = base | (value & 0x0F)
+            elif kind == SLOT_14BIT:
+                buf[pos] = value & 0x7F
+                buf[pos + 1] = (value >> 7) & 0x7F
+            else:
+                buf[pos] = value & 0x7F
+        return bytes(buf)
+
+    def hex(self, values):
+        return self.encode(values).hex(' ').upper()
+
+def compile_command(cmd):
+    """Compile a command dict from midi_commands/*.json. Raises ValueError for malformed templates."""
+    params = cmd.get("parameters", [])
+    template = cmd.get("template")
+    buf = bytearray()
+    slots = []
+    if template:
+        index = {param_key(p): i for i, p in enumerate(params)}
+        for token in template.split():
+            m = _PARAM_TOKEN.match(token)
+            if m:
+                prefix, key = m.groups()
+                if key not in index:
+                    raise ValueError(f"{cmd.get('name')}: unknown template parameter {{{key}}}")
+                if prefix:
+                    slots.append((len(buf), index[key], SLOT_NIBBLE, int(prefix, 16) << 4, 0))
+                else:
+                    slots.append((len(buf), index[key], SLOT_BYTE, 0, 0))
+                buf.append(0)
+            else:
+                try:
+                    buf.append(int(token, 16))
+                except ValueError:
+                    raise ValueError(f"{cmd.get('name')}: invalid template byte {token!r}")
+        return CompiledCommand(cmd.get("name"), buf, slots)
+    status = cmd.get("status_byte", 0)
+    first = 0
+    if status == 0xF0:
+        buf.append(0xF0)
+    elif params and params[0]["name"].lower() == "channel":
+        # Channel is OR-ed into the status byte; 1..16 ranges are converted to 0..15
+        offset = 1 if params[0]["min"] == 1 else 0
+        slots.append((0, 0, SLOT_NIBBLE, status & 0xF0, offset))
+        buf.append(status & 0xF0)
+        first = 1
+    else:
+        buf.append(status)
+    buf.extend(cmd.get("data", []))
+    for i in range(first, len(params)):
+        if params[i]["max"] > 127:
+            slots.append((len(buf), i, SLOT_14BIT, 0, 0))
+            buf.extend((0, 0))
+        else:
+            slots.append((len(buf), i, SLOT_BYTE, 0, 0))
+            buf.append(0)
+    if status == 0xF0:
+        buf.append(0xF7)
+    return CompiledCommand(cmd.get("name"), buf, slots)
+
+def get_compiled(cmd):
+    # Commands loaded through load_command_file() carry their compiled form already
+    compiled = cmd.get("_compiled")
+    if compiled is None:
+        compiled = cmd["_compiled"] = compile_command(cmd)
+    return compiled
+
+_file_cache = {}
+
+def load_command_file(json_path):
+    """Load and compile a command file; the result is cached until the file's mtime changes."""
+    try:
+        mtime = os.path.getmtime(json_path)
+    except OSError:
+        return []
+    cached = _file_cache.get(json_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            commands = json.load(f)
+    except Exception:
+        return []
+    compiled_commands = []
+    for cmd in commands:
+        try:
+            cmd["_compiled"] = compile_command(cmd)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"[MIDI LOG] Skipping MIDI command in {os.path.basename(json_path)}: {e}")
+            continue
+        compiled_commands.append(cmd)
+    _file_cache[json_path] = (mtime, compiled_commands)
+    return compiled_commands
@@ -1,6 +1,13 @@
 import mido
+import time
 from mido import MidiFile, Message
 from workers import MidiMessageSendWorker
+from midi_trace import MidiTrace, TRACE_IN, TRACE_OUT
+from midi_command_template import get_compiled
+from udp_midi import UdpBatcher, DEFAULT_MAX_DATAGRAM, DEFAULT_FLUSH_INTERVAL
+from sysex_transactions import SysexTransactionManager
+from midi_input import RingBuffer, MidiStreamParser
+from thru_router import ThruRouter
 import socket
 from PySide6.QtCore import Signal, QObject
 
@@ -11,6 +18,8 @@ class MIDIHandler(QObject):
     UDP_PORT = 50007
 
     log_message = Signal(str)
+    # Incoming SysEx data without F0/F7, emitted from the input thread
+    sysex_received = Signal(list)
 
     def __init__(self):
         super().__init__()
@@ -26,6 +35,22 @@ class MIDIHandler(QObject):
         self.forward_callback = None
         self._current_input_port_name = None
         self._current_output_port_name = None
+        # Structured MIDI trace, off by default (see Options > MIDI Trace...)
+        self.trace = MidiTrace()
+        # Optional coalescing of UDP output into fewer datagrams
+        self.udp_coalesce_enabled = False
+        self.udp_flush_interval = DEFAULT_FLUSH_INTERVAL
+        self.udp_max_datagram = DEFAULT_MAX_DATAGRAM
+        self._udp_batcher = None
+        # Request/response engine for device dumps, fed with every incoming SysEx
+        self.sysex_transactions = SysexTransactionManager(self.send_sysex, parent=self)
+        self.sysex_received.connect(self.sysex_transactions.feed)
+        # Input callbacks only push raw bytes here; MIDIReceiveWorker dispatches them in batches
+        self.input_ring = RingBuffer()
+        self._input_parser = MidiStreamParser()  # Used by the dispatcher only
+        self._thru_parser = MidiStreamParser()   # Used by the UDP thread only
+        # MIDI thru runs in the input thread itself (see Options > MIDI Thru...)
+        self.thru = ThruRouter(self.send_raw)
 
     def list_input_ports(self):
         print("[MIDI LOG] list_input_ports called")
@@ -48,26 +73,29 @@ class MIDIHandler(QObject):
             self.udp_sock_in.close()
             self.udp_sock_in = None
             self.udp_input_active = False
+        self._input_parser.reset()
+        self._thru_parser.reset()
         if port_name in (self.UDP_PORT_NAME, self.UDP_MENU_LABEL):
             self.udp_sock_in = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             self.udp_sock_in.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.udp_sock_in.bind((self.UDP_HOST, self.UDP_PORT))
             self.udp_input_active = True
             self._current_input_port_name = port_name
-            # Start a thread to poll UDP input and call self.forward_any
+            # Start a thread to poll UDP input; datagrams are split by the dispatcher
             import threading
             def udp_poll():
                 while self.udp_input_active:
                     try:
-                        data, _ = self.udp_sock_in.recvfrom(1024)
+                        # Largest possible datagram, so big dumps are never truncated
+                        data, _ = self.udp_sock_in.recvfrom(65535)
                         if data:
-                            self.forward_any(data)
+                            self._push_input(data, 'UDP')
                     except Exception:
                         break
             self._udp_thread = threading.Thread(target=udp_poll, daemon=True)
             self._udp_thread.start()
         elif port_name and isinstance(port_name, str):
-            self.inport = mido.open_input(port_name, callback=self.forward_any)
+            self.inport = mido.open_input(port_name, callback=lambda msg: self._push_input(bytes(msg.bin()), 'PORT'))
             self.udp_input_active = False
             self._current_input_port_name = port_name
         else:
@@ -76,10 +104,52 @@ class MIDIHandler(QObject):
             self.udp_input_active = False
             self._current_input_port_name = None
 
+    def _push_input(self, data, transport):
+        # Runs on the rtmidi callback / UDP thread: thru, record and enqueue, nothing else
+        timestamp = time.time()
+        if self.thru.enabled:
+            t_in = time.perf_counter()
+            try:
+                if transport == 'UDP':
+                    # Datagrams may hold several messages or part of one
+                    for _, midi_bytes in self._thru_parser.feed(data, timestamp):
+                        self.thru.route(midi_bytes, t_in)
+                else:
+                    self.thru.route(data, t_in)
+            except Exception:
+                # A thru failure must never stop input (it would end the UDP poll thread)
+                self.thru.errors += 1
+        if self.trace.enabled:
+            self.trace.record(TRACE_IN, transport, data)
+        self.input_ring.push((data, timestamp))
+
     def forward_any(self, msg):
-        # Forward any incoming MIDI data (raw bytes or mido.Message) to the main window
-        if hasattr(self, 'forward_callback') and self.forward_callback:
-            self.forward_callback(msg)
+        """Feed an incoming message (raw bytes or mido.Message) into the input pipeline."""
+        if isinstance(msg, (bytes, bytearray)):
+            self._push_input(bytes(msg), 'UDP')
+        else:
+            self._push_input(bytes(msg.bin()), 'PORT')
+
+    def dispatch_input(self, batch):
+        """
+        Called by MIDIReceiveWorker with a batch of (chunk, timestamp) from input_ring.
+        A chunk is a message from a port or a datagram, which may carry several
+        messages or part of a SysEx. Complete messages are passed to the forward
+        callback, SysEx is emitted as sysex_received, and the (timestamp, bytes)
+        messages are returned for the UI.
+        """
+        messages = []
+        forward = self.forward_callback
+        feed = self._input_parser.feed
+        for data, timestamp in batch:
+            for message in feed(data, timestamp):
+                midi_bytes = message[1]
+                if midi_bytes[0] == 0xF0:
+                    self.sysex_received.emit(list(midi_bytes[1:-1]))
+                if forward:
+                    forward(midi_bytes)
+                messages.append(message)
+        return messages
 
     def set_forward_callback(self, callback):
         self.forward_callback = callback
@@ -92,6 +162,7 @@ class MIDIHandler(QObject):
             self.outport.close()
             self.outport = None
         if self.udp_sock_out:
+            self._close_udp_batcher()
             self.udp_sock_out.close()
             self.udp_sock_out = None
             self.udp_output_active = False
@@ -101,6 +172,7 @@ class MIDIHandler(QObject):
             print(f"[DEBUG] open_output: Detected UDP output selection.")
             self.udp_sock_out = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             self.udp_output_active = True
+            self._update_udp_batcher()
             self.outport = None
             self._midi_send_worker = None
             self._current_output_port_name = port_name
@@ -137,12 +209,12 @@ class MIDIHandler(QObject):
             self.outport.close()
             self.outport = None
         if self.udp_sock_out:
+            self._close_udp_batcher()
             self.udp_sock_out.close()
             self.udp_sock_out = None
             self.udp_output_active = False
 
     def send_sysex(self, data):
-        self.log_message.emit(f"[MIDI LOG] send_sysex called: {data}")
         # Remove 0xF0 and 0xF7 if present
         if data and data[0] == 0xF0:
             data = data[1:]
@@ -152,18 +224,11 @@ class MIDIHandler(QObject):
         if any((b < 0 or b > 127) for b in data):
             print(f"[MIDI LOG] Skipping SysEx: bytes out of range 0..127: {' '.join(f'{b:02X}' for b in data)}")
             return
-        data_wrapped = [0xF0] + data + [0xF7]
-        midi_bytes = bytes(data_wrapped)
-        print(f"[MIDI LOG] Sending... {' '.join(f'{b:02X}' for b in data_wrapped)}")
         if self.udp_output_active and self.udp_sock_out:
-            try:
-                print(f"[DEBUG] UDP sendto: {list(midi_bytes)} to {(self.UDP_HOST, self.UDP_PORT)}")
-                sent = self.udp_sock_out.sendto(midi_bytes, (self.UDP_HOST, self.UDP_PORT))
-                print(f"[DEBUG] UDP sent {sent} bytes")
-            except Exception as e:
-                print(f"[ERROR] UDP sendto failed: {e}")
+            midi_bytes = bytes([0xF0]) + bytes(data) + bytes([0xF7])
+            self._send_udp(midi_bytes)
         elif self.outport and self._midi_send_worker:
-            # Route all outport sends through send_mido_message for consistent debug
+            # Route all outport sends through send_mido_message so tracing happens in one place
             msg = Message('sysex', data=data)
             self.send_mido_message(msg)
 
@@ -190,203 +255,83 @@ class MIDIHandler(QObject):
         self.register_input_callback('sysex', callback)
 
     def send_custom_midi_command(self, cmd, values):
-        self.log_message.emit(f"[MIDI LOG] send_custom_midi_command: cmd={cmd.get('name', cmd)} values={values}")
-        print("[MIDI LOG] send_custom_midi_command called")
-        if not self.outport and not hasattr(self, 'main_window'):
-            return
-        status = cmd.get("status_byte", 0)
-        params = list(values)
-        dx7_names = [
-            "DX7 Bulk Dump Request (Single Voice)",
-            "DX7 Bulk Dump Request (32 Voices)",
-            "DX7 Parameter Change",
-            "DX7 Function Parameter Change",
-            "DX7 Bulk Data (Single Voice)",
-            "DX7 Bulk Data (32 Voices)"
-        ]
-        # Log what will be sent
-        print(f"[MIDI LOG] send_custom_midi_command: cmd={cmd.get('name', cmd)} values={values}")
-        if status == 0xF0 and cmd.get("name") in dx7_names:
-            name = cmd.get("name")
-            data = [0x43]
-            if name == "DX7 Bulk Dump Request (Single Voice)":
-                device, voice = params
-                data += [0x10 | (device & 0x0F), 0x09, 0x20, voice]
-            elif name == "DX7 Bulk Dump Request (32 Voices)":
-                device = params[0]
-                data += [0x10 | (device & 0x0F), 0x09, 0x00, 0x00]
-            elif name == "DX7 Parameter Change":
-                device, param, value = params
-                data += [0x10 | (device & 0x0F), 0x01, param, value]
-            elif name == "DX7 Function Parameter Change":
-                device, func, value = params
-                data += [0x10 | (device & 0x0F), 0x03, func, value]
-            elif name == "DX7 Bulk Data (Single Voice)":
-                device = params[0]
-                voice_data = []
-                if len(params) > 1 and isinstance(params[1], str):
-                    voice_data = [int(x.strip()) for x in params[1].split(',') if x.strip()]
-                data += [0x10 | (device & 0x0F), 0x00, 0x00] + voice_data
-            elif name == "DX7 Bulk Data (32 Voices)":
-                device = params[0]
-                voice_data = []
-                if len(params) > 1 and isinstance(params[1], str):
-                    voice_data = [int(x.strip()) for x in params[1].split(',') if x.strip()]
-                data += [0x10 | (device & 0x0F), 0x00, 0x09] + voice_data
-            sysex_bytes = [0xF0] + data + [0xF7]
-            print(f"[MIDI LOG] Sending DX7 SysEx: {' '.join(f'{b:02X}' for b in sysex_bytes)}")
-            msg = Message('sysex', data=sysex_bytes[1:-1])
-            self._midi_send_worker.send(msg)
-            return
-        elif status == 0xF0:
-            data = [status] + params
-            if data[0] == 0xF0:
-                data = data[1:]
-            if data and data[-1] == 0xF7:
-                data = data[:-1]
-            sysex_bytes = [0xF0] + data + [0xF7]
-            print(f"[MIDI LOG] Sending generic SysEx: {' '.join(f'{b:02X}' for b in sysex_bytes)}")
-            msg = Message('sysex', data=sysex_bytes[1:-1])
-            self._midi_send_worker.send(msg)
-            return
-        else:
-            if cmd["parameters"] and cmd["parameters"][0]["name"].lower() == "channel":
-                channel = params.pop(0)
-                status = (status & 0xF0) | ((channel - 1) & 0x0F)
-            data = [status] + params
-            print(f"[MIDI LOG] Sending MIDI: {' '.join(f'{b:02X}' for b in data)}")
-            msg = Message.from_bytes(data)
-            self._midi_send_worker.send(msg)
+        if not (self.outport or self.udp_output_active):
             return
+        midi_bytes = get_compiled(cmd).encode(values)
+        self.send_mido_message(Message.from_bytes(midi_bytes))
 
     def get_command_hex(self, cmd, values):
-        self.log_message.emit(f"[MIDI LOG] get_command_hex called: cmd={cmd.get('name', cmd)} values={values}")
-        print("[MIDI LOG] get_command_hex called")
-        # If a template is present, use it for SysEx construction
-        template = cmd.get("template")
-        if template:
-            # Build a dict of parameter names to values
-            param_map = {}
-            for i, param in enumerate(cmd.get("parameters", [])):
-                # Use lowercase and underscores for template keys
-                key = param["name"].lower().replace(" ", "_")
-                param_map[key] = values[i]
-            # Special handling for nibbles (e.g., 1{device} means 0x10 | (device & 0x0F))
-            import re
-            def repl(m):
-                prefix = m.group(1)
-                key = m.group(2)
-                if prefix and key in param_map:
-                    # Interpret prefix as hex, bitwise OR with param
-                    return f'{(int(prefix, 16) << 4) | (int(param_map[key]) & 0x0F):02X}'
-                elif key in param_map:
-                    return f'{int(param_map[key]):02X}'
-                return m.group(0)
-            # Match patterns like 2{device_number} or {device_number}
-            hex_str = re.sub(r'([0-9A-Fa-f])\{([a-zA-Z0-9_]+)\}', repl, template)
-            hex_str = re.sub(r'\{([a-zA-Z0-9_]+)\}', lambda m: f'{int(param_map[m.group(1)]):02X}' if m.group(1) in param_map else m.group(0), hex_str)
-            # Remove spaces, split, and convert to bytes
-            bytes_list = [int(b, 16) for b in hex_str.strip().split()]
-            return ' '.join(f'{b:02X}' for b in bytes_list)
-        status = cmd.get("status_byte", 0)
-        params = list(values)
-        dx7_names = [
-            "DX7 Bulk Dump Request (Single Voice)",
-            "DX7 Bulk Dump Request (32 Voices)",
-            "DX7 Parameter Change",
-            "DX7 Function Parameter Change",
-            "DX7 Bulk Data (Single Voice)",
-            "DX7 Bulk Data (32 Voices)"
-        ]
-        if status == 0xF0 and cmd.get("name") in dx7_names:
-            name = cmd.get("name")
-            data = [0x43]
-            if name == "DX7 Bulk Dump Request (Single Voice)":
-                device, voice = params
-                data += [0x10 | (device & 0x0F), 0x09, 0x20, voice]
-            elif name == "DX7 Bulk Dump Request (32 Voices)":
-                device = params[0]
-                data += [0x10 | (device & 0x0F), 0x09, 0x00, 0x00]
-            elif name == "DX7 Parameter Change":
-                device, param, value = params
-                data += [0x10 | (device & 0x0F), 0x01, param, value]
-            elif name == "DX7 Function Parameter Change":
-                device, func, value = params
-                data += [0x10 | (device & 0x0F), 0x03, func, value]
-            elif name == "DX7 Bulk Data (Single Voice)":
-                device = params[0]
-                voice_data = []
-                if len(params) > 1 and isinstance(params[1], str):
-                    voice_data = [int(x.strip()) for x in params[1].split(',') if x.strip()]
-                data += [0x10 | (device & 0x0F), 0x00, 0x00] + voice_data
-            elif name == "DX7 Bulk Data (32 Voices)":
-                device = params[0]
-                voice_data = []
-                if len(params) > 1 and isinstance(params[1], str):
-                    voice_data = [int(x.strip()) for x in params[1].split(',') if x.strip()]
-                data += [0x10 | (device & 0x0F), 0x00, 0x09] + voice_data
-            sysex_bytes = [0xF0] + data + [0xF7]
-            return ' '.join(f'{b:02X}' for b in sysex_bytes)
-        elif status == 0xF0:
-            data = [status] + params
-            if data[0] == 0xF0:
-                data = data[1:]
-            if data and data[-1] == 0xF7:
-                data = data[:-1]
-            sysex_bytes = [0xF0] + data + [0xF7]
-            return ' '.join(f'{b:02X}' for b in sysex_bytes)
-        else:
-            if cmd["parameters"] and cmd["parameters"][0]["name"].lower() == "channel":
-                channel = params.pop(0)
-                status = (status & 0xF0) | ((channel - 1) & 0x0F)
-            data = [status] + params
-            return ' '.join(f'{b:02X}' for b in data)
+        # The command template is compiled once when the command file is loaded
+        return get_compiled(cmd).hex(values)
 
     def send_cc(self, channel, control, value):
-        self.log_message.emit(f"[MIDI LOG] Sending CC: channel={channel+1} control={control} value={value}")
-        msg_bytes = [0xB0 | (channel & 0x0F), control, value]
-        midi_bytes = bytes(msg_bytes)
-        print(f"[MIDI LOG] Sending... {' '.join(f'{b:02X}' for b in msg_bytes)}")
         if self.udp_output_active and self.udp_sock_out:
-            try:
-                print(f"[DEBUG] UDP sendto: {list(midi_bytes)} to {(self.UDP_HOST, self.UDP_PORT)}")
-                sent = self.udp_sock_out.sendto(midi_bytes, (self.UDP_HOST, self.UDP_PORT))
-                print(f"[DEBUG] UDP sent {sent} bytes")
-            except Exception as e:
-                print(f"[ERROR] UDP sendto failed: {e}")
+            self._send_udp(bytes((0xB0 | (channel & 0x0F), control, value)))
         elif self.outport:
-            # Route all outport sends through send_mido_message for consistent debug
+            # Route all outport sends through send_mido_message so tracing happens in one place
             msg = mido.Message('control_change', channel=channel, control=control, value=value)
             self.send_mido_message(msg)
 
     def send_mido_message(self, msg):
         try:
-            print(f"[MIDI LOG] send_mido_message called: {msg}")
-            print(f"[DEBUG] send_mido_message: udp_output_active={self.udp_output_active}, udp_sock_out={self.udp_sock_out}, outport={self.outport}")
-            assert hasattr(msg, 'bytes'), f"send_mido_message: msg must be a mido.Message, got {type(msg)}"
-            midi_bytes = msg.bytes()
-            # Fix: If msg.bytes() returns a list, convert to bytes
-            if isinstance(midi_bytes, list):
-                print(f"[DEBUG] msg.bytes() returned a list, converting to bytes: {midi_bytes}")
-                midi_bytes = bytes(midi_bytes)
-            assert isinstance(midi_bytes, (bytes, bytearray)), f"msg.bytes() must return bytes, got {type(midi_bytes)}"
-            print(f"[MIDI LOG] Sending... {' '.join(f'{b:02X}' for b in midi_bytes)}")
-            print("[DEBUG] About to check UDP send block condition")
             if self.udp_output_active and self.udp_sock_out:
-                print("[DEBUG] Entering UDP send block in send_mido_message")
-                try:
-                    print("[DEBUG] About to send UDP packet")
-                    print(f"[DEBUG] UDP sendto: {list(midi_bytes)} to {(self.UDP_HOST, self.UDP_PORT)}")
-                    sent = self.udp_sock_out.sendto(midi_bytes, (self.UDP_HOST, self.UDP_PORT))
-                    print(f"[DEBUG] UDP sent {sent} bytes")
-                except Exception as e:
-                    print(f"[ERROR] UDP sendto failed: {e}")
+                self._send_udp(bytes(msg.bytes()))
             elif self.outport and hasattr(self.outport, 'send'):
-                print(f"[DEBUG] outport.send: {msg}")
+                if self.trace.enabled:
+                    self.trace.record(TRACE_OUT, 'PORT', msg.bytes())
                 self.outport.send(msg)
         except Exception as e:
             print(f"[FATAL ERROR] send_mido_message exception: {e}")
 
+    def send_raw(self, midi_bytes):
+        """Send one complete MIDI message given as bytes; False if it cannot be sent to a port."""
+        if self.udp_output_active and self.udp_sock_out:
+            self._send_udp(midi_bytes)
+        elif self.outport:
+            try:
+                msg = Message.from_bytes(midi_bytes)
+            except ValueError:
+                # Undefined status bytes (F4, F5, F9, FD) have no mido message
+                return False
+            self.send_mido_message(msg)
+        return True
+
+    def _send_udp(self, midi_bytes):
+        if self.trace.enabled:
+            self.trace.record(TRACE_OUT, 'UDP', midi_bytes)
+        if self._udp_batcher:
+            self._udp_batcher.add(midi_bytes)
+            return
+        try:
+            self.udp_sock_out.sendto(midi_bytes, (self.UDP_HOST, self.UDP_PORT))
+        except Exception as e:
+            print(f"[ERROR] UDP sendto failed: {e}")
+
+    def set_udp_coalescing(self, enabled, flush_interval=None, max_datagram=None):
+        """Pack messages sent close together into one UDP datagram instead of one datagram per message."""
+        self.udp_coalesce_enabled = bool(enabled)
+        if flush_interval is not None:
+            self.udp_flush_interval = flush_interval
+        if max_datagram is not None:
+            self.udp_max_datagram = max_datagram
+        self._update_udp_batcher()
+
+    def _update_udp_batcher(self):
+        self._close_udp_batcher()
+        if self.udp_coalesce_enabled and self.udp_sock_out:
+            self._udp_batcher = UdpBatcher(self.udp_sock_out, (self.UDP_HOST, self.UDP_PORT),
+                                           max_datagram=self.udp_max_datagram, flush_interval=self.udp_flush_interval)
+
+    def _close_udp_batcher(self):
+        if self._udp_batcher:
+            self._udp_batcher.close()
+            self._udp_batcher = None
+
+    def flush_udp(self):
+        # Called by the file player once per scheduling tick
+        if self._udp_batcher:
+            self._udp_batcher.flush()
+
     def send_midi_file(self, midi_file, on_finished=None, on_log=None):
         print(f"[DEBUG] send_midi_file: self id={id(self)} outport={self.outport}, udp_output_active={self.udp_output_active}")
         self.log_message.emit(f"[MIDI LOG] send_midi_file called: {midi_file}")
@@ -0,0 +1,200 @@
+import re
+import time
+import threading
+
+RING_SIZE = 8192       # Incoming messages buffered between the input callback and the dispatcher
+MAX_BATCH = 512        # Messages handled per dispatcher pass
+UI_INTERVAL = 0.02     # Seconds between batched UI updates (at most 50 per second)
+MAX_SYSEX = 1 << 20    # Longest SysEx message assembled from fragments
+SYSEX_BUFFER = 8192    # Initial SysEx buffer, enough for a 32 voice DX7 bank dump
+
+class RingBuffer:
+    """
+    Preallocated single-producer/single-consumer ring. The input callback (producer)
+    only writes slots and advances head, the dispatcher (consumer) only reads slots
+    and advances tail, so neither side takes a lock; each index is written by one
+    thread only. When the ring is full new items are dropped and counted.
+    """
+    def __init__(self, capacity=RING_SIZE):
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self._slots = [None] * size
+        self._mask = size - 1
+        self._head = 0  # Items pushed (producer)
+        self._tail = 0  # Items popped (consumer)
+        self.dropped = 0
+        self.ready = threading.Event()
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def push(self, item):
+        head = self._head
+        if head - self._tail > self._mask:
+            self.dropped += 1
+            return False
+        self._slots[head & self._mask] = item
+        self._head = head + 1  # Publish the slot after it is written
+        self.ready.set()
+        return True
+
+    def pop_batch(self, max_items=MAX_BATCH):
+        tail = self._tail
+        count = min(self._head - tail, max_items)
+        if count <= 0:
+            return []
+        slots = self._slots
+        mask = self._mask
+        batch = []
+        for i in range(tail, tail + count):
+            batch.append(slots[i & mask])
+            slots[i & mask] = None
+        self._tail = tail + count
+        return batch
+
+# Number of data bytes following a status byte; system common messages cancel running status
+_DATA_LEN = [0] * 256
+for _status in range(0x80, 0xF0):
+    _DATA_LEN[_status] = 1 if 0xC0 <= _status < 0xE0 else 2
+_DATA_LEN[0xF1] = 1
+_DATA_LEN[0xF2] = 2
+_DATA_LEN[0xF3] = 1
+_STATUS_BYTE = re.compile(rb'[\x80-\xff]')
+
+class MidiStreamParser:
+    """
+    Incremental MIDI byte-stream parser. feed() takes chunks of any size (a UDP
+    datagram, a piece of one, or a message from a port) and returns the messages
+    completed by it as (timestamp, bytes). Running status is kept across chunks,
+    realtime bytes (F8-FF) are returned at once even in the middle of another
+    message, and SysEx is collected in a preallocated buffer that grows by
+    doubling. SysEx longer than max_sysex is dropped, as is SysEx cut short by
+    another status byte.
+    """
+    def __init__(self, max_sysex=MAX_SYSEX, sysex_buffer=SYSEX_BUFFER):
+        self.max_sysex = max_sysex
+        self._sysex = bytearray(sysex_buffer)
+        self._sysex_len = 0
+        self._in_sysex = False
+        self._overflow = False
+        self._status = 0       # Running status, 0 if none
+        self._message = []     # Bytes of the channel/system message being collected
+        self._needed = 0       # Data bytes still missing from _message
+        self.dropped_sysex = 0
+
+    def reset(self):
+        self._in_sysex = False
+        self._sysex_len = 0
+        self._status = 0
+        self._message = []
+        self._needed = 0
+
+    def _sysex_append(self, data):
+        if self._overflow:
+            return
+        end = self._sysex_len + len(data)
+        if end > self.max_sysex:
+            print(f"[MIDI LOG] Dropping SysEx longer than {self.max_sysex} bytes")
+            self._overflow = True
+            return
+        if end > len(self._sysex):
+            size = len(self._sysex)
+            while size < end:
+                size *= 2
+            self._sysex.extend(bytes(size - len(self._sysex)))
+        self._sysex[self._sysex_len:end] = data
+        self._sysex_len = end
+
+    def _end_sysex(self, complete, messages, timestamp):
+        if complete and not self._overflow:
+            self._sysex_append(b'\xF7')
+            if not self._overflow:
+                messages.append((timestamp, bytes(self._sysex[:self._sysex_len])))
+        else:
+            self.dropped_sysex += 1
+        self._in_sysex = False
+        self._overflow = False
+        self._sysex_len = 0
+
+    def feed(self, data, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        messages = []
+        n = len(data)
+        i = 0
+        search = _STATUS_BYTE.search
+        while i < n:
+            if self._in_sysex:
+                # Copy everything up to the next status byte in one slice
+                match = search(data, i)
+                end = match.start() if match else n
+                if end > i:
+                    self._sysex_append(data[i:end])
+                i = end
+                if i == n:
+                    break
+                status = data[i]
+                i += 1
+                if status >= 0xF8:
+                    messages.append((timestamp, bytes((status,))))
+                elif status == 0xF7:
+                    self._end_sysex(True, messages, timestamp)
+                else:
+                    self._end_sysex(False, messages, timestamp)
+                    i -= 1  # Parse the interrupting status byte normally
+                continue
+            byte = data[i]
+            i += 1
+            if byte >= 0xF8:
+                messages.append((timestamp, bytes((byte,))))
+            elif byte == 0xF0:
+                self._in_sysex = True
+                self._status = 0
+                self._needed = 0
+                self._sysex_len = 0
+                self._sysex_append(b'\xF0')
+            elif byte >= 0x80:
+                needed = _DATA_LEN[byte]
+                self._status = byte if byte < 0xF0 else 0
+                if needed:
+                    self._message = [byte]
+                    self._needed = needed
+                else:
+                    self._needed = 0
+                    if byte != 0xF7:  # A stray F7 outside SysEx is ignored
+                        messages.append((timestamp, bytes((byte,))))
+            elif self._needed:
+                self._message.append(byte)
+                self._needed -= 1
+                if not self._needed:
+                    messages.append((timestamp, bytes(self._message)))
+            elif self._status:
+                # Running status: the status byte is implied
+                self._message = [self._status, byte]
+                self._needed = _DATA_LEN[self._status] - 1
+                if not self._needed:
+                    messages.append((timestamp, bytes(self._message)))
+        return messages
+
+if __name__ == "__main__":
+    # Benchmark: parse a multi-megabyte stream of 32 voice bank dumps with notes and clock in between
+    import random
+    bank = bytes([0xF0, 0x43, 0x00, 0x09, 0x20, 0x00]) + bytes(random.randrange(128) for _ in range(4096)) + bytes([0x00, 0xF7])
+    chunk = bank + bytes([0x90, 60, 100, 62, 100, 0xF8, 64, 100, 0x80, 60, 0])
+    stream = chunk * 1000
+    for size in (1024, 65535):
+        parser = MidiStreamParser()
+        t0 = time.perf_counter()
+        count = 0
+        banks = 0
+        for pos in range(0, len(stream), size):
+            for _, msg in parser.feed(stream[pos:pos + size]):
+                count += 1
+                if msg[0] == 0xF0:
+                    assert msg == bank
+                    banks += 1
+        elapsed = time.perf_counter() - t0
+        assert banks == 1000 and count == 6000, (banks, count)
+        print(f"{len(stream) / 1e6:.1f} MB in {size} byte chunks: {elapsed * 1000:.0f} ms, "
+              f"{len(stream) / 1e6 / elapsed:.0f} MB/s, {count} messages")
@@ -0,0 +1,122 @@
+import time
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer
+from PySide6.QtWidgets import QApplication
+
+MONITOR_CAPACITY = 20000  # Messages kept in the MIDI In view; the oldest are dropped
+
+def refresh_interval_ms():
+    """Milliseconds per frame of the primary screen (16 ms if unknown)."""
+    screen = QApplication.primaryScreen() if QApplication.instance() else None
+    rate = screen.refreshRate() if screen else 0
+    return max(8, int(1000 / rate)) if rate and rate > 1 else 16
+
+class MidiMonitorModel(QAbstractListModel):
+    """
+    Fixed-capacity ring of received (timestamp, bytes) messages for a QListView.
+    append_batch() only queues; the rows are inserted once per display frame, and
+    when the ring is full the oldest rows are removed. Hex text is formatted in
+    data(), i.e. only for the rows the view actually paints.
+    """
+    def __init__(self, capacity=MONITOR_CAPACITY, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._start = 0
+        self._count = 0
+        self._pending = []
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(refresh_interval_ms())
+        self._timer.timeout.connect(self.flush)
+        self.on_flushed = None  # Called after rows were added (e.g. to autoscroll)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._count
+
+    def message(self, row):
+        return self._slots[(self._start + row) % self.capacity]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self._count:
+            return None
+        timestamp, data = self.message(index.row())
+        if role == Qt.ItemDataRole.DisplayRole:
+            return data.hex(' ').upper()
+        if role == Qt.ItemDataRole.ToolTipRole:
+            millis = int(timestamp * 1000) % 1000
+            return f"{time.strftime('%H:%M:%S', time.localtime(timestamp))}.{millis:03d}, {len(data)} bytes"
+        return None
+
+    def append_batch(self, messages):
+        self._pending.extend(messages)
+        if len(self._pending) > self.capacity:
+            del self._pending[:len(self._pending) - self.capacity]
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        capacity = self.capacity
+        if self._count + len(pending) > capacity:
+            evict = self._count + len(pending) - capacity
+            if evict >= self._count:
+                # Everything shown is replaced
+                self.beginResetModel()
+                self._start = 0
+                self._count = 0
+                self._write(pending)
+                self.endResetModel()
+                self._notify()
+                return
+            self.beginRemoveRows(QModelIndex(), 0, evict - 1)
+            for row in range(evict):
+                self._slots[(self._start + row) % capacity] = None
+            self._start = (self._start + evict) % capacity
+            self._count -= evict
+            self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), self._count, self._count + len(pending) - 1)
+        self._write(pending)
+        self.endInsertRows()
+        self._notify()
+
+    def _write(self, messages):
+        for message in messages:
+            self._slots[(self._start + self._count) % self.capacity] = message
+            self._count += 1
+
+    def _notify(self):
+        if self.on_flushed:
+            self.on_flushed()
+
+    def clear(self):
+        self._timer.stop()
+        self.beginResetModel()
+        self._slots = [None] * self.capacity
+        self._start = 0
+        self._count = 0
+        self._pending = []
+        self.endResetModel()
+
+    def iter_messages(self, rows=None):
+        """Yield (timestamp, bytes) oldest first, or for the given rows only."""
+        for row in (range(self._count) if rows is None else rows):
+            yield self.message(row)
+
+    def iter_hex_lines(self, rows=None):
+        for _, data in self.iter_messages(rows):
+            yield data.hex(' ').upper()
+
+if __name__ == "__main__":
+    # Benchmark: one hour of a 1 kHz device (3.6 million messages) into the bounded model
+    app = QApplication([])
+    model = MidiMonitorModel()
+    batch = [(time.time(), bytes((0x90, 60, 100)))] * 20
+    t0 = time.perf_counter()
+    for _ in range(3600 * 1000 // 20 // 50):  # Worker batches of 20 messages, flushed per 50 batches
+        for _ in range(50):
+            model.append_batch(batch)
+        model.flush()
+    elapsed = time.perf_counter() - t0
+    print(f"{model.rowCount()} rows kept of {3600 * 1000} messages, {elapsed:.2f} s for one hour of input")
@@ -79,7 +79,7 @@ class MidiOps:
         self.main_window.show_status("Cleared Out area and MIDI file.")
 
     def clear_in(self):
-        self.main_window.ui.in_text.clear()
+        self.main_window.ui.midi_in_model.clear()
         self.main_window.show_status("Cleared In area.")
 
     def send_file(self):
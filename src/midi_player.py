@@ -0,0 +1,139 @@
+import time
+import mido
+
+DEFAULT_TEMPO = 500000  # Microseconds per beat (120 BPM)
+
+# Below this remaining time the player busy-waits instead of sleeping,
+# since time.sleep() usually overshoots by a millisecond or more.
+SPIN_THRESHOLD = 0.002
+
+def iter_events(midi_file):
+    """
+    Yield (absolute_seconds, msg) for all non-meta messages of a MidiFile.
+    All tracks are merged first and tempo changes are resolved in a single pass,
+    so the time of every event is computed exactly once.
+    """
+    return resolve_tempo(((msg.time, msg) for msg in mido.merge_tracks(midi_file.tracks)), midi_file.ticks_per_beat)
+
+def resolve_tempo(delta_events, ticks_per_beat):
+    """Turn merged (delta_ticks, msg) events into (absolute_seconds, msg), dropping meta messages."""
+    tempo = DEFAULT_TEMPO
+    seconds_per_tick = tempo / 1000000.0 / ticks_per_beat
+    abs_seconds = 0.0
+    for delta, msg in delta_events:
+        if delta:
+            abs_seconds += delta * seconds_per_tick
+        if msg.is_meta:
+            if msg.type == 'set_tempo':
+                tempo = msg.tempo
+                seconds_per_tick = tempo / 1000000.0 / ticks_per_beat
+            continue
+        yield abs_seconds, msg
+
+def batch_events(events):
+    """Group consecutive events with the same timestamp into (seconds, [msgs])."""
+    batch_time = None
+    batch = []
+    for t, msg in events:
+        if batch and t != batch_time:
+            yield batch_time, batch
+            batch = []
+        batch_time = t
+        batch.append(msg)
+    if batch:
+        yield batch_time, batch
+
+def build_schedule(midi_file):
+    """Convert a MidiFile into a list of (absolute_seconds, [msgs]) before playback starts."""
+    return list(batch_events(iter_events(midi_file)))
+
+def schedule_for(source):
+    """
+    Return the schedule to play for source: streaming sources such as
+    midi_transform.MidiTransform produce theirs lazily, MidiFiles are scheduled up front.
+    """
+    if hasattr(source, 'schedule'):
+        return source.schedule()
+    return build_schedule(source)
+
+class PlaybackStats:
+    def __init__(self):
+        self.events = 0
+        self.batches = 0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+        self.elapsed = 0.0
+
+    def add(self, lateness, count):
+        self.batches += 1
+        self.events += count
+        self.total_lateness += lateness
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+
+    @property
+    def mean_jitter(self):
+        return self.total_lateness / self.batches if self.batches else 0.0
+
+    def summary(self):
+        return (f"{self.events} events in {self.batches} batches, {self.elapsed:.2f} s; "
+                f"max lateness {self.max_lateness * 1000:.2f} ms, mean jitter {self.mean_jitter * 1000:.3f} ms")
+
+class MidiPlayer:
+    """
+    Dispatches a pre-computed schedule against the monotonic clock.
+    Every batch is due at start + t, so errors never accumulate over the file
+    (no drift), and all messages sharing a timestamp are sent back to back.
+    The schedule may be any iterable of (seconds, [msgs]), e.g. build_schedule()
+    or batch_events() over a generator. If given, flush() is called after each
+    batch so that transports which coalesce messages can send them together.
+    """
+    def __init__(self, send, should_stop=None, flush=None):
+        self.send = send
+        self.should_stop = should_stop or (lambda: False)
+        self.flush = flush
+        self.stopped = False
+
+    def play(self, schedule):
+        clock = time.perf_counter
+        sleep = time.sleep
+        send = self.send
+        flush = self.flush
+        should_stop = self.should_stop
+        stats = PlaybackStats()
+        self.stopped = False
+        start = clock()
+        for t, msgs in schedule:
+            if should_stop():
+                self.stopped = True
+                break
+            target = start + t
+            remaining = target - clock()
+            while remaining > SPIN_THRESHOLD:
+                # Sleep in short slices so stop requests are honoured during long pauses
+                sleep(min(remaining - SPIN_THRESHOLD, 0.05))
+                if should_stop():
+                    self.stopped = True
+                    break
+                remaining = target - clock()
+            if self.stopped:
+                break
+            while clock() < target:
+                pass
+            stats.add(clock() - target, len(msgs))
+            for msg in msgs:
+                send(msg)
+            if flush:
+                flush()
+        stats.elapsed = clock() - start
+        return stats
+
+if __name__ == "__main__":
+    # Quick timing check: python midi_player.py file.mid
+    import sys
+    midi_file = mido.MidiFile(sys.argv[1])
+    t0 = time.perf_counter()
+    schedule = build_schedule(midi_file)
+    print(f"Scheduled {sum(len(m) for _, m in schedule)} events in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    stats = MidiPlayer(lambda msg: None).play(schedule)
+    print(stats.summary())
@@ -0,0 +1,75 @@
+import time
+from collections import deque
+
+# Trace levels
+TRACE_OFF = 0
+TRACE_MESSAGES = 1  # Direction, transport and length only
+TRACE_BYTES = 2     # Also keep the payload so it can be rendered as hex
+
+TRACE_LEVEL_NAMES = {
+    TRACE_OFF: "Off",
+    TRACE_MESSAGES: "Messages",
+    TRACE_BYTES: "Messages and bytes",
+}
+
+# Directions
+TRACE_OUT = 'OUT'
+TRACE_IN = 'IN'
+
+class MidiTrace:
+    """
+    Level-gated MIDI trace with a bounded in-memory ring buffer.
+    Entries are stored as raw tuples; hex rendering only happens in format_entries(),
+    i.e. when somebody actually looks at the log.
+    Hot send paths must check `enabled` before calling record() so that nothing
+    is allocated while tracing is off.
+    """
+    def __init__(self, capacity=4096, level=TRACE_OFF):
+        self._entries = deque(maxlen=capacity)
+        self.capacity = capacity
+        self.total = 0
+        self.level = TRACE_OFF
+        self.enabled = False
+        self.set_level(level)
+
+    def set_level(self, level):
+        level = int(level)
+        if level not in TRACE_LEVEL_NAMES:
+            level = TRACE_OFF
+        self.level = level
+        self.enabled = level > TRACE_OFF
+
+    def record(self, direction, transport, data):
+        # deque.append is atomic, so the send and receive threads can both record
+        payload = bytes(data) if self.level >= TRACE_BYTES else None
+        self._entries.append((time.time(), direction, transport, len(data), payload))
+        self.total += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.total = 0
+
+    def snapshot(self):
+        return list(self._entries)
+
+    @property
+    def dropped(self):
+        return max(0, self.total - len(self._entries))
+
+    def format_entries(self, entries=None):
+        if entries is None:
+            entries = self.snapshot()
+        lines = []
+        for ts, direction, transport, length, payload in entries:
+            stamp = time.strftime('%H:%M:%S', time.localtime(ts)) + f".{int((ts % 1) * 1000):03d}"
+            line = f"{stamp} {direction:<3} {transport:<4} {length:5d} bytes"
+            if payload is not None:
+                line += "  " + payload.hex(' ').upper()
+            lines.append(line)
+        return lines
+
+    def format_text(self):
+        lines = self.format_entries()
+        if self.dropped:
+            lines.insert(0, f"({self.dropped} older entries dropped, buffer holds {self.capacity})")
+        return '\n'.join(lines)
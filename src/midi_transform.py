@@ -0,0 +1,151 @@
+import os
+import heapq
+import hashlib
+import mido
+from operator import itemgetter
+from midi_player import resolve_tempo, batch_events
+
+def sysex_message(syx_data, channel):
+    """Build a sysex Message from a single voice dump, retargeted to channel."""
+    sysex = list(syx_data)
+    if len(sysex) > 3:
+        sysex[2] = 0x10 | (channel & 0x0F)
+    if sysex[0] != 0xF0:
+        sysex = [0xF0] + sysex
+    if sysex[-1] != 0xF7:
+        sysex = sysex + [0xF7]
+    return mido.Message('sysex', data=sysex[1:-1])
+
+class MidiTransform:
+    """
+    Channel assignment and GM replacement for a MidiFile as a chain of generators:
+    each assigned track is rewritten on the fly (channel remap, bank/program
+    filtering, program change -> voice SysEx), the tracks are merged by time and
+    tempo is resolved while the player consumes the result. Nothing is copied up
+    front, so playback starts at once and memory does not grow with the file.
+
+    assign_map maps track index -> MIDI channel (1-16); tracks not in it are passed
+    through untouched. program_sysex maps GM program -> single voice dump; a program
+    mapped to None has no usable voice and its program changes are dropped.
+    The object can be passed to MIDIHandler.send_midi_file() like a MidiFile (and
+    replayed for repeat), and save() writes the rewritten file.
+    """
+    def __init__(self, midi_file, assign_map, filter_bank=False, program_sysex=None, filename=None):
+        self.midi_file = midi_file
+        self.ticks_per_beat = midi_file.ticks_per_beat
+        self.assign_map = assign_map
+        self.filter_bank = filter_bank
+        self.program_sysex = program_sysex
+        self.filename = filename or getattr(midi_file, 'filename', None)
+        self._sysex_cache = {}
+
+    def _sysex_for(self, program, channel):
+        key = (program, channel)
+        if key not in self._sysex_cache:
+            syx_data = self.program_sysex.get(program)
+            self._sysex_cache[key] = sysex_message(syx_data, channel) if syx_data else None
+        return self._sysex_cache[key]
+
+    def track_events(self, index):
+        """Yield (absolute_ticks, msg) for one track after rewriting."""
+        track = self.midi_file.tracks[index]
+        channel = self.assign_map.get(index)
+        tick = 0
+        if channel is None:
+            for msg in track:
+                tick += msg.time
+                yield tick, msg
+            return
+        channel -= 1
+        program_sysex = self.program_sysex
+        filter_bank = self.filter_bank
+        for msg in track:
+            tick += msg.time
+            msg_type = msg.type
+            if program_sysex is not None and msg_type == 'program_change' and msg.program in program_sysex:
+                sysex = self._sysex_for(msg.program, channel)
+                if sysex is not None:
+                    yield tick, sysex
+                continue
+            if filter_bank:
+                if msg_type == 'program_change':
+                    continue
+                if msg_type == 'control_change' and msg.control in (0, 32):
+                    continue
+            if not msg.is_meta and hasattr(msg, 'channel') and msg.channel != channel:
+                msg = msg.copy(channel=channel)
+            yield tick, msg
+
+    def events(self):
+        """Yield (absolute_seconds, msg) for the whole file, tracks merged."""
+        # heapq.merge is stable, so simultaneous events keep track order like mido.merge_tracks
+        merged = heapq.merge(*(self.track_events(i) for i in range(len(self.midi_file.tracks))), key=itemgetter(0))
+        def deltas():
+            last = 0
+            for tick, msg in merged:
+                yield tick - last, msg
+                last = tick
+        return resolve_tempo(deltas(), self.ticks_per_beat)
+
+    def schedule(self):
+        return batch_events(self.events())
+
+    def cache_key(self):
+        """Key for playback_cache: content hash of the source file plus the transform settings."""
+        from playback_cache import file_digest
+        path = getattr(self.midi_file, 'filename', None)
+        if not path or not os.path.isfile(path):
+            return None
+        h = hashlib.sha256(f"transform:{file_digest(path)}".encode('ascii'))
+        h.update(repr(sorted(self.assign_map.items())).encode('ascii'))
+        h.update(b'F' if self.filter_bank else b'-')
+        if self.program_sysex is not None:
+            for program in sorted(self.program_sysex):
+                h.update(bytes([program]) + bytes(self.program_sysex[program] or b'') + b'\xff')
+        return h.hexdigest()
+
+    def to_midi_file(self):
+        new_midi = mido.MidiFile(type=self.midi_file.type, ticks_per_beat=self.ticks_per_beat)
+        for i in range(len(self.midi_file.tracks)):
+            new_track = mido.MidiTrack()
+            last = 0
+            for tick, msg in self.track_events(i):
+                new_track.append(msg.copy(time=tick - last))
+                last = tick
+            new_midi.tracks.append(new_track)
+        return new_midi
+
+    def save(self, path):
+        # Lets FileSaveWorker / FileUtils.save_mid write a transform like a MidiFile
+        self.to_midi_file().save(path)
+
+if __name__ == "__main__":
+    # Benchmark: time to first event, streaming vs copy + save + reparse
+    import os
+    import time
+    import tempfile
+    from midi_player import build_schedule
+    midi = mido.MidiFile()
+    for t in range(16):
+        track = mido.MidiTrack()
+        track.append(mido.Message('program_change', program=t, channel=t))
+        for i in range(5000):
+            track.append(mido.Message('note_on', note=40 + i % 40, velocity=100, channel=t, time=10))
+            track.append(mido.Message('note_off', note=40 + i % 40, channel=t, time=10))
+        midi.tracks.append(track)
+    assign_map = {t: 16 - t for t in range(16)}
+    syx = [0xF0, 0x43, 0x00, 0x00, 0x01, 0x1B] + [0] * 155 + [0, 0xF7]
+    program_sysex = {t: syx for t in range(8)}
+    transform = MidiTransform(midi, assign_map, program_sysex=program_sysex)
+    t0 = time.perf_counter()
+    first = next(iter(transform.schedule()))
+    t_stream = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    path = os.path.join(tempfile.mkdtemp(), 'bench.modified.mid')
+    transform.save(path)
+    schedule = build_schedule(mido.MidiFile(path))
+    t_old = (time.perf_counter() - t0) * 1000
+    streamed = [(round(t, 9), [m.bytes() for m in msgs]) for t, msgs in transform.schedule()]
+    assert streamed == [(round(t, 9), [m.bytes() for m in msgs]) for t, msgs in schedule]
+    print(f"{sum(len(m) for _, m in schedule)} events: first batch after {t_stream:.2f} ms streaming, "
+          f"{t_old:.0f} ms via rewritten file")
@@ -0,0 +1,73 @@
+import time
+from PySide6.QtCore import QObject, QTimer
+
+DEFAULT_SEND_RATE = 100  # Parameter changes per second and parameter
+
+class ParamOutbox(QObject):
+    """
+    Latest-value-wins outbox for parameter changes made while dragging.
+    post() sends a parameter at once if it has not been sent within the last
+    1/rate seconds; otherwise only its newest value is kept and sent when the
+    interval has passed. Different parameters do not delay each other.
+    flush() sends everything pending immediately (e.g. on mouse release),
+    so the last value of a gesture always reaches the synth.
+    send(key, value) is called on the GUI thread.
+    """
+    def __init__(self, send, rate=DEFAULT_SEND_RATE, parent=None):
+        super().__init__(parent)
+        self.send = send
+        self.set_rate(rate)
+        self._last_sent = {}   # key -> time of the last send
+        self._pending = {}     # key -> newest value not sent yet
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._send_due)
+        self.posted = 0
+        self.sent = 0
+
+    def set_rate(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+
+    def post(self, key, value):
+        self.posted += 1
+        now = time.monotonic()
+        last = self._last_sent.get(key)
+        if key not in self._pending and (last is None or now - last >= self.interval):
+            self._send(key, value, now)
+            return
+        self._pending[key] = value
+        if not self._timer.isActive():
+            self._schedule(now)
+
+    def _send(self, key, value, now):
+        self._last_sent[key] = now
+        self.sent += 1
+        self.send(key, value)
+
+    def _schedule(self, now):
+        due = min(self._last_sent.get(key, now) + self.interval for key in self._pending)
+        self._timer.start(max(0, int((due - now) * 1000 + 0.5)))
+
+    def _send_due(self):
+        now = time.monotonic()
+        for key in list(self._pending):
+            if now - self._last_sent.get(key, 0.0) >= self.interval - 0.0005:
+                self._send(key, self._pending.pop(key), now)
+        if self._pending:
+            self._schedule(now)
+
+    def flush(self):
+        self._timer.stop()
+        now = time.monotonic()
+        pending, self._pending = self._pending, {}
+        for key, value in pending.items():
+            self._send(key, value, now)
+
+    def discard(self):
+        """Drop pending values without sending them (e.g. a new voice replaces the edit)."""
+        self._timer.stop()
+        self._pending.clear()
+
+    def stats_text(self):
+        saved = self.posted - self.sent
+        return f"{self.sent} of {self.posted} parameter changes sent ({saved} coalesced)"
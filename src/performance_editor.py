@@ -1,5 +1,5 @@
 import sys
-import warnings
+import time
 import logging
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView, QSpinBox, QLineEdit, QPushButton, QLabel,
@@ -12,8 +12,11 @@ from single_voice_dump_decoder import SingleVoiceDumpDecoder
 from voice_editor import VoiceEditor
 from voice_editor_panel import VoiceEditorPanelDialog
 from singleton_dialog import SingletonDialog
-from performance_fields import TG_FIELDS, GLOBAL_FIELDS, PERFORMANCE_FIELDS, PERFORMANCE_FIELD_RANGES, TG_LABELS
+from performance_fields import (TG_FIELDS, GLOBAL_FIELDS, PERFORMANCE_FIELDS, PERFORMANCE_FIELD_RANGES, TG_LABELS,
+                                GLOBAL_PARAM_FIELDS, TG_PARAM_FIELDS, FIELD_ROWS, decode_value)
+from performance_state import PerformanceState
 from voice_management import select_voice_dialog, open_voice_editor, on_voice_dump
+from sysex_transactions import prefix_matcher
 
 # Initialize PERFORMANCE_VALUES with default values (0) for all fields and TGs
 PERFORMANCE_VALUES = [
@@ -41,6 +44,8 @@ class PerformanceEditor(SingletonDialog):
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self._block_signal = False
+        # Shadow copy of the device's performance; edits are sent as a diff against it
+        self.state = PerformanceState(self._send_sysex_burst)
         # Fill table with initial values
         for row, field in enumerate(PERFORMANCE_FIELDS):
             if field in GLOBAL_FIELDS:
@@ -173,19 +178,12 @@ class PerformanceEditor(SingletonDialog):
         self.hide()  # Hide until data is loaded
         self._sysex_data_buffer = {}
         self._expected_sysex_count = 9  # 1 global + 8 TGs
-        self._sysex_request_queue = [[0xF0, 0x7D, 0x10, 0xF7]] + [[0xF0, 0x7D, 0x11, tg, 0xF7] for tg in range(8)]
-        self._sysex_request_index = 0
-        # Only connect handler once
-        if self.main_window and hasattr(self.main_window, "midi_handler"):
-            if hasattr(self.main_window, "receive_worker") and self.main_window.receive_worker:
-                try:
-                    with warnings.catch_warnings():
-                        warnings.simplefilter("ignore", category=RuntimeWarning)
-                        self.main_window.receive_worker.sysex_received.disconnect(self._on_performance_sysex)
-                except Exception:
-                    pass
-                self.main_window.receive_worker.sysex_received.connect(self._on_performance_sysex)
-        self._send_next_sysex_request()
+        self._voice_dump_data = {}
+        self._pending_voice_dumps = set(range(8))
+        self._early_voice_dumps = []  # Voice dumps that arrive before the TG channels are known
+        self._request_ids = []
+        self._load_failed = False
+        self._request_performance()
         import logging
         logging.basicConfig(level=logging.DEBUG)
         self._debug = True
@@ -206,219 +204,117 @@ class PerformanceEditor(SingletonDialog):
         self.send_midi_for_field(field, col, value)
 
     def send_midi_for_field(self, field, tg_index, value):
-
+        # Global fields live in column 0 but are not per TG
+        tg = None if field in GLOBAL_FIELDS else tg_index
         try:
-            # MiniDexed SysEx mapping for all fields in PERFORMANCE_FIELDS
-            field_to_param = {
-                "CompressorEnable": (0x00, 0x00),
-                "ReverbEnable": (0x00, 0x01),
-                "ReverbSize": (0x00, 0x02),
-                "ReverbHighDamp": (0x00, 0x03),
-                "ReverbLowDamp": (0x00, 0x04),
-                "ReverbLowPass": (0x00, 0x05),
-                "ReverbDiffusion": (0x00, 0x06),
-                "ReverbLevel": (0x00, 0x07),
-                "BankNumber": (0x00, 0x00),
-                "VoiceNumber": (0x00, 0x01),
-                "MIDIChannel": (0x00, 0x02),
-                "Volume": (0x00, 0x03),
-                "Pan": (0x00, 0x04),
-                "Detune": (0x00, 0x05),
-                "Cutoff": (0x00, 0x06),
-                "Resonance": (0x00, 0x07),
-                "NoteLimitLow": (0x00, 0x08),
-                "NoteLimitHigh": (0x00, 0x09),
-                "NoteShift": (0x00, 0x0A),
-                "ReverbSend": (0x00, 0x0B),
-                "PitchBendRange": (0x00, 0x0C),
-                "PitchBendStep": (0x00, 0x0D),
-                "PortamentoMode": (0x00, 0x0E),
-                "PortamentoGlissando": (0x00, 0x0F),
-                "PortamentoTime": (0x00, 0x10),
-                "MonoMode": (0x00, 0x11),
-                "ModulationWheelRange": (0x00, 0x12),
-                "ModulationWheelTarget": (0x00, 0x13),
-                "FootControlRange": (0x00, 0x14),
-                "FootControlTarget": (0x00, 0x15),
-                "BreathControlRange": (0x00, 0x16),
-                "BreathControlTarget": (0x00, 0x17),
-                "AftertouchRange": (0x00, 0x18),
-                "AftertouchTarget": (0x00, 0x19),
-            }
-            if field in field_to_param:
-                pp1, pp2 = field_to_param[field]
-                min_val, max_val = PERFORMANCE_FIELD_RANGES.get(field, (0, 127))
-                v = int(value)
-                # For MIDIChannel, use the value directly (0-15 for channels 1-16, 16 for Omni)
-                if field == "MIDIChannel":
-                    v = int(value)
-                # For signed 14-bit fields, use standard MIDI mapping: value = signed + 8192 (center at 8192)
-                if field in ["Detune", "NoteShift"]:
-                    v = int(value)
-                    # Clamp to allowed range
-                    min_val, max_val = PERFORMANCE_FIELD_RANGES.get(field, (-99, 99) if field == "Detune" else (-24, 24))
-                    v = max(min_val, min(max_val, v))
-                    # MIDI standard: encode as unsigned with center at 8192
-                    v = v + 8192
-                    vv1 = (v >> 7) & 0x7F
-                    vv2 = v & 0x7F
-                else:
-                    vv1 = (v >> 8) & 0x7F
-                    vv2 = v & 0x7F
-                if field in ["CompressorEnable", "ReverbEnable", "ReverbSize", "ReverbHighDamp", "ReverbLowDamp", "ReverbLowPass", "ReverbDiffusion", "ReverbLevel"]:
-                    sysex = [0xF0, 0x7D, 0x20, pp1, pp2, vv1, vv2, 0xF7]
-                else:
-                    sysex = [0xF0, 0x7D, 0x21, tg_index, pp1, pp2, vv1, vv2, 0xF7]
-
-                print(f"Sending SysEx: {' '.join(f'{b:02X}' for b in sysex)} (MIDI channel {tg_index+1})")
-                if self.main_window and hasattr(self.main_window, "midi_handler"):
-                    midi_handler = QApplication.instance().midi_handler
-                    import mido
-                    msg = mido.Message('sysex', data=sysex[1:-1])
-                    midi_handler.send_sysex(msg.bytes())
+            value = int(value)
+        except (TypeError, ValueError):
+            print(f"Failed to send MIDI for {field} TG{tg_index+1}: invalid value {value!r}", file=sys.stderr)
+            return
+        self.state.set(tg, field, value)
 
-                return
-        except Exception as e:
-            print(f"Failed to send MIDI for {field} TG{tg_index+1}: {e}", file=sys.stderr)
+    def _send_sysex_burst(self, messages):
+        if not (self.main_window and hasattr(self.main_window, "midi_handler")):
+            return
+        midi_handler = self.main_window.midi_handler
+        for sysex in messages:
+            midi_handler.send_sysex(sysex)
+        print(f"[MIDI LOG] Sent {len(messages)} performance parameter change(s)")
 
     def set_tg_to_channels(self):
         midi_channel_row = PERFORMANCE_FIELDS.index("MIDIChannel")
-        for col in range(8):
-            widget = self.table.cellWidget(midi_channel_row, col)
-            # Use 0-indexed for QComboBox (channel 1 = index 0, channel 2 = index 1, ...)
-            if widget is not None and widget.metaObject().className() == "QComboBox":
-                widget.setCurrentIndex(col)
-            elif isinstance(widget, QSpinBox):
-                widget.setValue(col + 1)
-        # Removed explicit call to send_midi_for_field to avoid duplicate SysEx messages
+        # One transaction, so the changed channels go out together when the loop is done
+        with self.state.transaction():
+            for col in range(8):
+                widget = self.table.cellWidget(midi_channel_row, col)
+                # Use 0-indexed for QComboBox (channel 1 = index 0, channel 2 = index 1, ...)
+                if widget is not None and widget.metaObject().className() == "QComboBox":
+                    widget.setCurrentIndex(col)
+                elif isinstance(widget, QSpinBox):
+                    widget.setValue(col + 1)
 
     def set_all_tg_to_ch1(self):
         midi_channel_row = PERFORMANCE_FIELDS.index("MIDIChannel")
-        for col in range(8):
-            widget = self.table.cellWidget(midi_channel_row, col)
-            # Use 0-indexed for QComboBox (channel 1 = index 0)
-            if widget is not None and widget.metaObject().className() == "QComboBox":
-                widget.setCurrentIndex(0)
-            elif isinstance(widget, QSpinBox):
-                widget.setValue(1)
-        # Removed explicit call to send_midi_for_field to avoid duplicate SysEx messages
+        with self.state.transaction():
+            for col in range(8):
+                widget = self.table.cellWidget(midi_channel_row, col)
+                # Use 0-indexed for QComboBox (channel 1 = index 0)
+                if widget is not None and widget.metaObject().className() == "QComboBox":
+                    widget.setCurrentIndex(0)
+                elif isinstance(widget, QSpinBox):
+                    widget.setValue(1)
 
-    def showEvent(self, event):
-        super().showEvent(event)
-        # Send voice dump requests for each TG (0-7) using the MIDI channel assigned to each TG
-        if self.main_window and hasattr(self.main_window, "midi_handler"):
-            midi_channel_row = PERFORMANCE_FIELDS.index("MIDIChannel")
-            for tg in range(8):
-                channel_widget = self.table.cellWidget(midi_channel_row, tg)
-                if isinstance(channel_widget, QSpinBox):
-                    midi_channel = channel_widget.value()
-                    # If MIDI channel > 15, use channel 0
-                    if midi_channel > 15:
-                        midi_channel = 0
-                    sysex = [0xF0, 0x43, 0x10 | ((midi_channel) & 0x0F), 0x00, 0xF7]
-                    self.main_window.midi_handler.send_sysex(sysex)
-        # Prepare to receive and parse voice dumps
-        if self.main_window and hasattr(self.main_window, "midi_handler"):
-            if hasattr(self.main_window, "receive_worker") and self.main_window.receive_worker:
-                self.main_window.receive_worker.sysex_received.connect(self._on_voice_dump)
-        self._pending_voice_dumps = set(range(8))
-        self._voice_dump_data = {}
+    def _transactions(self):
+        midi_handler = getattr(self.main_window, "midi_handler", None) if self.main_window else None
+        return getattr(midi_handler, "sysex_transactions", None)
 
-        # Start a timer to check for timeout after 2 seconds
-        def check_timeout():
-            if not self.isEnabled():
-                from dialogs import Dialogs
-                self.close()
-                Dialogs.show_error(self, "Timeout", "Not all responses to the dump requests were received within 2 seconds.\nThis feature only works with firmware from https://github.com/probonopd/MiniDexed/pull/915")
-        QTimer.singleShot(2000, check_timeout)
+    def _request_performance(self):
+        """
+        Request the global parameters, the parameters of all TGs and the TG voices at
+        once. The transaction manager keeps them in flight together, so loading takes
+        one round trip instead of one per request.
+        """
+        transactions = self._transactions()
+        if transactions is None:
+            QTimer.singleShot(0, lambda: self._on_performance_timeout("no MIDI connection"))
+            return
+        self._load_started = time.monotonic()
+        requests = [([0xF0, 0x7D, 0x10, 0xF7], prefix_matcher(0x7D, 0x20), 'global')]
+        requests += [([0xF0, 0x7D, 0x11, tg, 0xF7], prefix_matcher(0x7D, 0x21, tg), tg) for tg in range(8)]
+        for msg, match, key in requests:
+            self._request_ids.append(transactions.request(
+                msg, match,
+                on_reply=lambda data, key=key: self._on_performance_sysex(key, data),
+                on_error=self._on_performance_timeout))
+        for tg in range(8):
+            # F0 43 2n 00 F7 is answered with a single voice dump on channel n (if a TG listens on it)
+            self._request_ids.append(transactions.request(
+                [0xF0, 0x43, 0x20 + tg, 0x00, 0xF7], prefix_matcher(0x43, tg, 0x00),
+                on_reply=self._on_voice_dump, retries=0))
 
-    def _send_next_sysex_request(self, data=None):
-        if self._sysex_request_index < len(self._sysex_request_queue):
-            msg = self._sysex_request_queue[self._sysex_request_index]
-            self._sysex_request_index += 1
-            if self.main_window and hasattr(self.main_window, "midi_handler"):
-                self.main_window.midi_handler.send_sysex(msg)
+    def _cancel_requests(self):
+        transactions = self._transactions()
+        if transactions is not None:
+            for request_id in self._request_ids:
+                transactions.cancel(request_id)
+        self._request_ids = []
 
-    def _on_performance_sysex(self, data):
+    def _on_performance_timeout(self, message):
+        if self._load_failed or self.isEnabled():
+            return
+        self._load_failed = True
+        self._cancel_requests()
+        from dialogs import Dialogs
+        self.close()
+        Dialogs.show_error(self, "Timeout", f"Not all responses to the dump requests were received ({message}).\nThis feature only works with firmware from https://github.com/probonopd/MiniDexed/pull/915")
+
+    def _on_performance_sysex(self, key, data):
         try:
-            print(f"[PERF EDITOR DEBUG] Raw incoming SysEx: {' '.join(f'{b:02X}' for b in data)}")
-            if isinstance(data, bytes):
-                data = list(data)
-            print(f"[PERF EDITOR DEBUG] Parsed as list: {' '.join(f'{b:02X}' for b in data)}")
-            if data and data[0] == 0xF0:
-                data = data[1:]
-            if data and data[-1] == 0xF7:
-                data = data[:-1]
-            print(f"[PERF EDITOR DEBUG] Stripped F0/F7: {' '.join(f'{b:02X}' for b in data)}")
-            if not data or data[0] != 0x7D:
-                print(f"[PERF EDITOR DEBUG] Not a MiniDexed SysEx dump (missing 0x7D): {' '.join(f'{b:02X}' for b in data)}")
-                from PySide6.QtWidgets import QMessageBox
-                QMessageBox.critical(self, "SysEx Error", "Received invalid or unrecognized SysEx data.")
-                self._sysex_request_queue = []
-                self._sysex_request_index = 9999
-                return
-            # Global response: F0 7D 20 ... F7
-            if len(data) > 2 and data[1] == 0x20:
-                print(f"[PERF EDITOR DEBUG] Parsed as global response: {' '.join(f'{b:02X}' for b in data)}")
-                self._sysex_data_buffer['global'] = data.copy()
-            # TG response: F0 7D 21 nn ... F7 (device sends 7D 21 nn ...)
-            elif len(data) > 3 and data[1] == 0x21:
-                tg = data[2]
-                print(f"[PERF EDITOR DEBUG] Parsed as TG response for TG {tg}: {' '.join(f'{b:02X}' for b in data)}")
-                self._sysex_data_buffer[tg] = data.copy()
-            else:
-                print(f"[PERF EDITOR DEBUG] Unrecognized MiniDexed SysEx format: {' '.join(f'{b:02X}' for b in data)}")
-                from PySide6.QtWidgets import QMessageBox
-                QMessageBox.critical(self, "SysEx Error", "Received invalid or unrecognized SysEx data.")
-                self._sysex_request_queue = []
-                self._sysex_request_index = 9999
+            print(f"[PERF EDITOR DEBUG] Response for {'global' if key == 'global' else f'TG {key}'}: {' '.join(f'{b:02X}' for b in data)}")
+            self._sysex_data_buffer[key] = data
+            if len(self._sysex_data_buffer) < self._expected_sysex_count:
                 return
-            print(f"[PERF EDITOR DEBUG] Buffer state: {self._sysex_data_buffer}")
-            # When all expected responses are received, show window
-            if len(self._sysex_data_buffer) >= self._expected_sysex_count:
-                if self.main_window and hasattr(self.main_window, "receive_worker") and self.main_window.receive_worker:
-                    try:
-                        with warnings.catch_warnings():
-                            warnings.simplefilter("ignore", category=RuntimeWarning)
-                            self.main_window.receive_worker.sysex_received.disconnect(self._on_performance_sysex)
-                    except Exception:
-                        pass
-                print(f"[PERF EDITOR DEBUG] All expected responses received. Populating fields.")
-                self._populate_fields_from_sysex()
-                # --- BEGIN: Send voice dump requests for each TG and connect handler ---
-                if self.main_window and hasattr(self.main_window, "midi_handler"):
-                    for tg in range(8):
-                        sysex = [0xF0, 0x43, 0x20 + tg, 0x00, 0xF7]  # F0 43 2n 00 F7
-                        self.main_window.midi_handler.send_sysex(sysex)
-                if self.main_window and hasattr(self.main_window, "midi_handler"):
-                    if hasattr(self.main_window, "receive_worker") and self.main_window.receive_worker:
-                        self.main_window.receive_worker.sysex_received.connect(self._on_voice_dump)
-                self._pending_voice_dumps = set(range(8))
-                self._voice_dump_data = {}
-                # --- END: Send voice dump requests for each TG and connect handler ---
-                from PySide6.QtWidgets import QApplication
-                app = QApplication.instance()
-                if app:
-                    app.restoreOverrideCursor()
-                self.setEnabled(True)
-                self.show()
-                QApplication.processEvents()
-            else:
-                self._send_next_sysex_request()
+            elapsed = (time.monotonic() - self._load_started) * 1000
+            print(f"[PERF EDITOR] Performance loaded in {elapsed:.0f} ms ({self._transactions().stats_text()})")
+            self._populate_fields_from_sysex()
+            # Now that the TG channels are known, apply the voice dumps that came in early
+            early, self._early_voice_dumps = self._early_voice_dumps, None
+            for voice_data in early:
+                self._on_voice_dump(voice_data)
+            app = QApplication.instance()
+            if app:
+                app.restoreOverrideCursor()
+            self.setEnabled(True)
+            self.show()
+            QApplication.processEvents()
         except Exception as e:
             print(f"[PERF EDITOR] Exception in _on_performance_sysex: {e}", file=sys.stderr)
 
     def _on_voice_dump(self, data):
-        # Use the imported on_voice_dump function
-        on_voice_dump(self.table, self.main_window, data, getattr(self, '_voice_dump_data', {}), getattr(self, '_pending_voice_dumps', set()))
-        # If all TGs have received a voice dump, disconnect
-        if hasattr(self, '_pending_voice_dumps') and not self._pending_voice_dumps:
-            if self.main_window and hasattr(self.main_window, "midi_handler"):
-                if hasattr(self.main_window, "receive_worker") and self.main_window.receive_worker:
-                    try:
-                        self.main_window.receive_worker.sysex_received.disconnect(self._on_voice_dump)
-                    except Exception:
-                        pass
+        if self._early_voice_dumps is not None:
+            self._early_voice_dumps.append(data)
+            return
+        on_voice_dump(self.table, self.main_window, data, self._voice_dump_data, self._pending_voice_dumps)
 
     def _populate_fields_from_sysex(self):
         """
@@ -430,21 +326,11 @@ class PerformanceEditor(SingletonDialog):
             i = 2  # skip 0x7D, 0x20
             while i + 3 < len(global_data):
                 pp1, pp2, vv1, vv2 = global_data[i], global_data[i+1], global_data[i+2], global_data[i+3]
-                # Map param to field name
-                param_map = {
-                    (0x00, 0x00): "CompressorEnable",
-                    (0x00, 0x01): "ReverbEnable",
-                    (0x00, 0x02): "ReverbSize",
-                    (0x00, 0x03): "ReverbHighDamp",
-                    (0x00, 0x04): "ReverbLowDamp",
-                    (0x00, 0x05): "ReverbLowPass",
-                    (0x00, 0x06): "ReverbDiffusion",
-                    (0x00, 0x07): "ReverbLevel",
-                }
-                field = param_map.get((pp1, pp2))
-                if field and field in PERFORMANCE_FIELDS:
-                    row = PERFORMANCE_FIELDS.index(field)
-                    val = (vv1 << 8) | vv2
+                field = GLOBAL_PARAM_FIELDS.get((pp1, pp2))
+                if field:
+                    row = FIELD_ROWS[field]
+                    val = decode_value(field, vv1, vv2)
+                    self.state.load(None, field, val)
                     widget = self.table.cellWidget(row, 0)
                     if hasattr(widget, 'setChecked'):
                         self._block_signal = True
@@ -467,41 +353,11 @@ class PerformanceEditor(SingletonDialog):
                 i = 3  # skip 0x7D, 0x21, tg
                 while i + 3 < len(tg_data):
                     pp1, pp2, vv1, vv2 = tg_data[i], tg_data[i+1], tg_data[i+2], tg_data[i+3]
-                    # Map pp1, pp2 to field name
-                    field = None
-                    if pp1 == 0x00:
-                        tg_param_map = {
-                            0x00: "BankNumber",
-                            0x01: "VoiceNumber",
-                            0x02: "MIDIChannel",
-                            0x03: "Volume",
-                            0x04: "Pan",
-                            0x05: "Detune",
-                            0x06: "Cutoff",
-                            0x07: "Resonance",
-                            0x08: "NoteLimitLow",
-                            0x09: "NoteLimitHigh",
-                            0x0A: "NoteShift",
-                            0x0B: "ReverbSend",
-                            0x0C: "PitchBendRange",
-                            0x0D: "PitchBendStep",
-                            0x0E: "PortamentoMode",
-                            0x0F: "PortamentoGlissando",
-                            0x10: "PortamentoTime",
-                            0x11: "MonoMode",
-                            0x12: "ModulationWheelRange",
-                            0x13: "ModulationWheelTarget",
-                            0x14: "FootControlRange",
-                            0x15: "FootControlTarget",
-                            0x16: "BreathControlRange",
-                            0x17: "BreathControlTarget",
-                            0x18: "AftertouchRange",
-                            0x19: "AftertouchTarget"
-                        }
-                        field = tg_param_map.get(pp2)
-                    if field and field in PERFORMANCE_FIELDS:
-                        row = PERFORMANCE_FIELDS.index(field)
-                        val = (vv1 << 8) | vv2
+                    field = TG_PARAM_FIELDS.get((pp1, pp2))
+                    if field:
+                        row = FIELD_ROWS[field]
+                        val = decode_value(field, vv1, vv2)
+                        self.state.load(tg, field, val)
                         widget = self.table.cellWidget(row, tg)
                         if field == "MIDIChannel" and widget is not None and widget.metaObject().className() == "QComboBox":
                             self._block_signal = True
@@ -554,6 +410,7 @@ class PerformanceEditor(SingletonDialog):
         return cls._instance
 
     def closeEvent(self, event):
+        self._cancel_requests()
         type(self)._instance = None
         super().closeEvent(event)
 
@@ -50,3 +50,49 @@ PERFORMANCE_FIELD_RANGES = {
 }
 
 TG_LABELS = [f"TG{i+1}" for i in range(8)]
+
+# MiniDexed performance SysEx parameter numbers (pp1, pp2), built once at import
+GLOBAL_PARAMS = {field: (0x00, i) for i, field in enumerate(GLOBAL_FIELDS)}
+TG_PARAMS = {field: (0x00, i) for i, field in enumerate([
+    "BankNumber", "VoiceNumber", "MIDIChannel", "Volume", "Pan", "Detune", "Cutoff", "Resonance",
+    "NoteLimitLow", "NoteLimitHigh", "NoteShift", "ReverbSend", "PitchBendRange", "PitchBendStep",
+    "PortamentoMode", "PortamentoGlissando", "PortamentoTime", "MonoMode", "ModulationWheelRange",
+    "ModulationWheelTarget", "FootControlRange", "FootControlTarget", "BreathControlRange",
+    "BreathControlTarget", "AftertouchRange", "AftertouchTarget"
+])}
+GLOBAL_PARAM_FIELDS = {param: field for field, param in GLOBAL_PARAMS.items()}
+TG_PARAM_FIELDS = {param: field for field, param in TG_PARAMS.items()}
+FIELD_ROWS = {field: row for row, field in enumerate(PERFORMANCE_FIELDS)}
+# Signed fields are sent as 14-bit values centred at 8192
+SIGNED_FIELDS = frozenset(["Detune", "NoteShift"])
+
+def encode_value(field, value):
+    """Return (vv1, vv2) for a field value as sent to MiniDexed."""
+    v = int(value)
+    if field in SIGNED_FIELDS:
+        min_val, max_val = PERFORMANCE_FIELD_RANGES[field]
+        v = max(min_val, min(max_val, v)) + 8192
+        return (v >> 7) & 0x7F, v & 0x7F
+    return (v >> 8) & 0x7F, v & 0x7F
+
+def decode_value(field, vv1, vv2):
+    """Inverse of encode_value() for values in a performance dump."""
+    if field in SIGNED_FIELDS:
+        return ((vv1 << 7) | vv2) - 8192
+    return (vv1 << 8) | vv2
+
+def encode_param(tg, field, value):
+    """
+    SysEx message setting field to value: F0 7D 20 pp pp vv vv F7 for global fields
+    (tg is None), F0 7D 21 tg pp pp vv vv F7 for TG fields. None for fields that
+    have no parameter number (e.g. "Voice").
+    """
+    if tg is None:
+        param = GLOBAL_PARAMS.get(field)
+        header = [0xF0, 0x7D, 0x20]
+    else:
+        param = TG_PARAMS.get(field)
+        header = [0xF0, 0x7D, 0x21, tg]
+    if param is None:
+        return None
+    return header + list(param) + list(encode_value(field, value)) + [0xF7]
@@ -0,0 +1,71 @@
+from contextlib import contextmanager
+from performance_fields import FIELD_ROWS, encode_param
+
+class PerformanceState:
+    """
+    Shadow copy of the performance parameters on the device, keyed by (tg, field)
+    with tg None for global fields. set() records an edit; outside a transaction()
+    it is committed at once, inside one all edits are committed together when the
+    outermost transaction ends. commit() encodes only the values that differ from
+    what the device was last sent or reported, and passes the messages to
+    send(messages) in one burst.
+    """
+    def __init__(self, send):
+        self.send = send
+        self.device = {}   # (tg, field) -> value the device has
+        self.edits = {}    # (tg, field) -> value not committed yet
+        self._depth = 0
+        self.committed = 0
+        self.skipped = 0
+
+    def get(self, tg, field, default=None):
+        key = (tg, field)
+        return self.edits.get(key, self.device.get(key, default))
+
+    def load(self, tg, field, value):
+        """Record a value reported by the device (e.g. from a performance dump)."""
+        self.device[(tg, field)] = value
+        self.edits.pop((tg, field), None)
+
+    def set(self, tg, field, value):
+        self.edits[(tg, field)] = value
+        if self._depth == 0:
+            self.commit()
+
+    @contextmanager
+    def transaction(self):
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self.commit()
+
+    def changes(self):
+        """Edited (tg, field, value) tuples that differ from the device, in table order."""
+        changed = []
+        for (tg, field), value in self.edits.items():
+            if self.device.get((tg, field)) != value:
+                changed.append((tg, field, value))
+        changed.sort(key=lambda change: (FIELD_ROWS.get(change[1], 0), -1 if change[0] is None else change[0]))
+        return changed
+
+    def commit(self):
+        changed = self.changes()
+        self.skipped += len(self.edits) - len(changed)
+        self.edits = {}
+        messages = []
+        for tg, field, value in changed:
+            try:
+                sysex = encode_param(tg, field, value)
+            except (TypeError, ValueError) as e:
+                print(f"[ERROR] Invalid value {value!r} for {field}: {e}")
+                continue
+            self.device[(tg, field)] = value
+            if sysex is not None:
+                messages.append(sysex)
+        if messages:
+            self.committed += len(messages)
+            self.send(messages)
+        return messages
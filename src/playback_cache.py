@@ -0,0 +1,223 @@
+import os
+import mmap
+import glob
+import struct
+import hashlib
+import threading
+import mido
+from midi_player import schedule_for
+
+MAGIC = b'MDPC'
+VERSION = 2
+MAX_FILES = 64  # Preprocessed files kept; the least recently used are removed
+
+# File layout (little endian):
+#   header: magic, version (H), batch count (I), event count (I)
+#   batches: seconds (d), message count (I), then per message its length (I) and raw MIDI bytes
+_HEADER = struct.Struct('<4sHII')
+_BATCH = struct.Struct('<dI')
+_LENGTH = struct.Struct('<I')  # SysEx in a .mid can be longer than 64 KiB
+
+_digests = {}
+_digests_lock = threading.Lock()
+
+def file_digest(path):
+    """SHA-256 of a file's content, remembered while its size and mtime stay the same."""
+    st = os.stat(path)
+    stamp = (path, st.st_mtime_ns, st.st_size)
+    with _digests_lock:
+        digest = _digests.get(stamp)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        digest = h.hexdigest()
+        with _digests_lock:
+            _digests[stamp] = digest
+    return digest
+
+def source_key(source):
+    """
+    Cache key for something MIDIHandler.send_midi_file() plays: the content hash of
+    the .mid plus the transform settings (see MidiTransform.cache_key()), or None
+    for in-memory files that have no source on disk.
+    """
+    if hasattr(source, 'cache_key'):
+        return source.cache_key()
+    path = getattr(source, 'filename', None)
+    if path and os.path.isfile(path):
+        return hashlib.sha256(f"plain:{file_digest(path)}".encode('ascii')).hexdigest()
+    return None
+
+class MappedSchedule:
+    """
+    Iterates a preprocessed file as (seconds, [msgs]) straight from a memory map.
+    The file is only mapped while it is iterated, so a schedule that is never
+    played does not keep it open (which would block pruning it on Windows).
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"Not a playback cache file: {path}")
+        magic, version, self.batches, self.events = _HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a playback cache file: {path}")
+
+    def __iter__(self):
+        with open(self.path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Messages repeat a lot (same notes, same controllers); decode each distinct one once
+        decoded = {}
+        offset = _HEADER.size
+        try:
+            for _ in range(self.batches):
+                t, count = _BATCH.unpack_from(buf, offset)
+                offset += _BATCH.size
+                msgs = []
+                for _ in range(count):
+                    (length,) = _LENGTH.unpack_from(buf, offset)
+                    offset += _LENGTH.size
+                    raw = buf[offset:offset + length]
+                    offset += length
+                    msg = decoded.get(raw)
+                    if msg is None:
+                        msg = decoded[raw] = mido.Message.from_bytes(raw)
+                    msgs.append(msg)
+                yield t, msgs
+        finally:
+            buf.close()
+
+class PlaybackCache:
+    """
+    Tempo-resolved, channel-remapped event streams of played .mid files, so that
+    Repeat and re-sends skip parsing and transforming. The first play streams as
+    usual and writes the file alongside; it is only kept if playback ran to the end.
+    """
+    def __init__(self, root, max_files=MAX_FILES):
+        self.root = root
+        self.max_files = max_files
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.root, key + '.mpc')
+
+    def schedule(self, source):
+        """Return the schedule for source, memory-mapped if it was played before."""
+        try:
+            key = source_key(source)
+        except OSError:
+            key = None
+        if key is None:
+            return schedule_for(source)
+        path = self._path(key)
+        if os.path.exists(path):
+            try:
+                schedule = MappedSchedule(path)
+                os.utime(path)  # Mark as recently used
+                self.hits += 1
+                return schedule
+            except (OSError, ValueError) as e:
+                print(f"[ERROR] Discarding playback cache file {path}: {e}")
+        self.misses += 1
+        return self._record(schedule_for(source), path)
+
+    def _record(self, schedule, path):
+        tmp_path = path + f'.{threading.get_ident()}.tmp'
+        batches = events = 0
+        complete = False
+        f = None
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            f = open(tmp_path, 'wb')
+            f.write(_HEADER.pack(MAGIC, VERSION, 0, 0))
+        except OSError as e:
+            print(f"[ERROR] Could not write playback cache file {path}: {e}")
+            f = self._abandon(f)
+        try:
+            for t, msgs in schedule:
+                if f is not None:
+                    # A failed write only loses the cache file, never the playback
+                    try:
+                        record = [_BATCH.pack(t, len(msgs))]
+                        for msg in msgs:
+                            raw = bytes(msg.bytes())
+                            record.append(_LENGTH.pack(len(raw)))
+                            record.append(raw)
+                        f.write(b''.join(record))
+                    except (OSError, struct.error) as e:
+                        print(f"[ERROR] Could not write playback cache file {path}: {e}")
+                        f = self._abandon(f)
+                batches += 1
+                events += len(msgs)
+                yield t, msgs
+            if f is not None:
+                try:
+                    f.seek(0)
+                    f.write(_HEADER.pack(MAGIC, VERSION, batches, events))
+                    f.close()
+                    complete = True
+                except OSError as e:
+                    print(f"[ERROR] Could not write playback cache file {path}: {e}")
+        finally:
+            if f is not None and not f.closed:
+                f.close()
+            # Playback stopped early (generator closed) or failed: keep nothing
+            if complete:
+                try:
+                    os.replace(tmp_path, path)
+                    self._prune()
+                except OSError as e:
+                    print(f"[ERROR] Could not store playback cache file {path}: {e}")
+            else:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def _abandon(self, f):
+        # Stop recording; the partial file is removed once playback ends
+        if f is not None:
+            try:
+                f.close()
+            except OSError:
+                pass
+        return None
+
+    def _prune(self):
+        files = glob.glob(os.path.join(self.root, '*.mpc'))
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=lambda p: os.path.getmtime(p))
+        for path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+_cache = None
+
+def get_playback_cache():
+    global _cache
+    if _cache is None:
+        from cache_store import get_app_data_dir
+        _cache = PlaybackCache(os.path.join(get_app_data_dir(), 'playback_cache'))
+    return _cache
+
+if __name__ == "__main__":
+    # Benchmark: python playback_cache.py file.mid
+    import sys
+    import time
+    import tempfile
+    cache = PlaybackCache(tempfile.mkdtemp())
+    for attempt in ("first play", "repeat"):
+        t0 = time.perf_counter()
+        midi_file = mido.MidiFile(sys.argv[1]) if attempt == "first play" else midi_file
+        schedule = iter(cache.schedule(midi_file))
+        next(schedule)
+        t_first = (time.perf_counter() - t0) * 1000
+        count = 1 + sum(1 for _ in schedule)
+        print(f"{attempt}: first batch after {t_first:.2f} ms, {count} batches in {(time.perf_counter() - t0) * 1000:.0f} ms")
@@ -0,0 +1,176 @@
+import time
+from collections import deque
+from PySide6.QtCore import QObject, QTimer
+
+DEFAULT_MAX_OUTSTANDING = 16  # Requests sent but not answered yet
+DEFAULT_TIMEOUT = 1.0         # Seconds to wait for a reply before resending
+DEFAULT_RETRIES = 2           # Resends before a request fails
+LATENCY_HISTORY = 256         # Reply latencies kept for stats_text()
+
+def strip_sysex(data):
+    """Return SysEx data as a list without the F0/F7 framing."""
+    data = list(data)
+    if data and data[0] == 0xF0:
+        data = data[1:]
+    if data and data[-1] == 0xF7:
+        data = data[:-1]
+    return data
+
+def prefix_matcher(*prefix):
+    """Matcher for replies whose data (without F0) starts with prefix; None matches any byte."""
+    def match(data):
+        if len(data) < len(prefix):
+            return False
+        for want, got in zip(prefix, data):
+            if want is not None and want != got:
+                return False
+        return True
+    return match
+
+class SysexRequest:
+    """One request/response transaction; see SysexTransactionManager.request()."""
+    def __init__(self, request_id, data, match, on_reply, on_error, timeout, retries):
+        self.request_id = request_id
+        self.data = data
+        self.match = match
+        self.on_reply = on_reply
+        self.on_error = on_error
+        self.timeout = timeout
+        self.retries = retries
+        self.attempts = 0
+        self.first_sent_at = None  # Latency is measured from here, across retries
+        self.deadline = None
+        self.done = False
+
+class SysexTransactionManager(QObject):
+    """
+    Pipelined SysEx request/response engine. Requests are sent as soon as fewer than
+    max_outstanding are waiting for a reply, so independent dumps share one round
+    trip instead of waiting for each other. Incoming SysEx is passed to feed(); the
+    oldest outstanding request whose matcher accepts it gets the reply. A request
+    without a reply after timeout seconds is resent up to retries times and then
+    fails with on_error. send(data) and all callbacks run on the GUI thread.
+    """
+    def __init__(self, send, max_outstanding=DEFAULT_MAX_OUTSTANDING, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, parent=None):
+        super().__init__(parent)
+        self.send = send
+        self.max_outstanding = max_outstanding
+        self.timeout = timeout
+        self.retries = retries
+        self._next_id = 1
+        self._queue = deque()   # requests not sent yet
+        self._outstanding = []  # requests sent, oldest first
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._check_timeouts)
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+        self.replies = 0
+        self.resends = 0
+        self.failures = 0
+
+    def request(self, data, match, on_reply=None, on_error=None, timeout=None, retries=None):
+        """
+        Queue a SysEx request and return its request id. match(data) decides whether
+        an incoming message (list without F0/F7) answers it; on_reply(data) and
+        on_error(message) are called once, whichever comes first.
+        """
+        request = SysexRequest(self._next_id, list(data), match, on_reply, on_error,
+                               self.timeout if timeout is None else timeout,
+                               self.retries if retries is None else retries)
+        self._next_id += 1
+        self._queue.append(request)
+        self._pump()
+        return request.request_id
+
+    def cancel(self, request_id):
+        for requests in (self._queue, self._outstanding):
+            for request in list(requests):
+                if request.request_id == request_id:
+                    request.done = True
+                    requests.remove(request)
+        self._pump()
+
+    def cancel_all(self):
+        for request in list(self._queue) + self._outstanding:
+            request.done = True
+        self._queue.clear()
+        self._outstanding = []
+        self._timer.stop()
+
+    def pending(self):
+        return len(self._queue) + len(self._outstanding)
+
+    def feed(self, data):
+        """Offer an incoming SysEx message; returns True if it answered a request."""
+        data = strip_sysex(data)
+        for request in self._outstanding:
+            try:
+                matched = request.match(data)
+            except Exception as e:
+                print(f"[ERROR] SysEx matcher for request {request.request_id} failed: {e}")
+                matched = False
+            if matched:
+                self._outstanding.remove(request)
+                request.done = True
+                self.replies += 1
+                self.latencies.append(time.monotonic() - request.first_sent_at)
+                self._pump()
+                if request.on_reply:
+                    request.on_reply(data)
+                return True
+        return False
+
+    def _pump(self):
+        now = time.monotonic()
+        while self._queue and len(self._outstanding) < self.max_outstanding:
+            request = self._queue.popleft()
+            self._outstanding.append(request)
+            self._transmit(request, now)
+        self._schedule(now)
+
+    def _transmit(self, request, now):
+        request.attempts += 1
+        if request.first_sent_at is None:
+            request.first_sent_at = now
+        request.deadline = now + request.timeout
+        try:
+            self.send(request.data)
+        except Exception as e:
+            print(f"[ERROR] Sending SysEx request {request.request_id} failed: {e}")
+
+    def _schedule(self, now):
+        if not self._outstanding:
+            self._timer.stop()
+            return
+        due = min(request.deadline for request in self._outstanding)
+        self._timer.start(max(0, int((due - now) * 1000 + 0.5)))
+
+    def _check_timeouts(self):
+        now = time.monotonic()
+        failed = []
+        for request in list(self._outstanding):
+            if request.deadline > now + 0.0005:
+                continue
+            if request.attempts <= request.retries:
+                self.resends += 1
+                print(f"[MIDI LOG] No reply to SysEx request {request.request_id}, resending (attempt {request.attempts + 1})")
+                self._transmit(request, now)
+            else:
+                self._outstanding.remove(request)
+                request.done = True
+                self.failures += 1
+                failed.append(request)
+        self._pump()
+        for request in failed:
+            if request.on_error:
+                request.on_error(f"No reply within {request.timeout:g} s after {request.attempts} attempts")
+
+    def stats_text(self):
+        if not self.latencies:
+            return f"No SysEx replies yet ({self.failures} failed)"
+        ordered = sorted(self.latencies)
+        median = ordered[len(ordered) // 2] * 1000
+        worst = ordered[-1] * 1000
+        return (f"{self.replies} SysEx replies, median {median:.1f} ms, max {worst:.1f} ms, "
+                f"{self.resends} resent, {self.failures} failed")
@@ -0,0 +1,208 @@
+import os
+import re
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+SYSLOG_CAPACITY = 50000            # Rows kept in the syslog table; the oldest are evicted
+SPILL_MAX_BYTES = 10 * 1024 * 1024  # Size of one on-disk syslog file before it is rotated
+SPILL_BACKUPS = 5                   # Rotated files kept (syslog.log.1 ... syslog.log.5)
+SYSLOG_COLUMNS = ['Time', 'Index', 'IP', 'Service', 'Message']
+
+_FULL_LINE = re.compile(r'([0-9:.]+) ([<>][0-9]+) - ([0-9.]+) ([^ ]+) - - - (.*)')
+_EMPTY_MESSAGE = re.compile(r'([0-9:.]+) ([<>][0-9]+) - ([0-9.]+) ([^ ]+) - - -$')
+
+def parse_syslog_line(line):
+    """Split a received syslog line into (time, index, ip, service, message)."""
+    line = line.strip()
+    m = _FULL_LINE.match(line)
+    if m:
+        return m.groups()
+    m = _EMPTY_MESSAGE.match(line)
+    if m:
+        return m.groups() + ('',)
+    return ('', '', '', '', line)
+
+class SyslogTableModel(QAbstractTableModel):
+    """
+    Syslog rows for the main window table, kept in a ring of at most capacity rows
+    (the oldest are evicted). Rows are added in batches, one model update per
+    batch. Every row is indexed by its lowercased text, so set_filter() narrows the
+    table with a plain substring test per row instead of going through data().
+    """
+    def __init__(self, capacity=SYSLOG_CAPACITY, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self._rows = [None] * capacity
+        self._text = [None] * capacity  # Lowercased search text per row
+        self._first = 0   # Sequence number of the oldest row kept
+        self._next = 0    # Sequence number of the next row
+        self._filter = ''
+        self._view = None  # Sequence numbers of the matching rows while filtering
+        self._view_start = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self._view is None:
+            return self._next - self._first
+        return len(self._view) - self._view_start
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(SYSLOG_COLUMNS)
+
+    def _seq(self, row):
+        if self._view is None:
+            return self._first + row
+        return self._view[self._view_start + row]
+
+    def row_values(self, row):
+        return self._rows[self._seq(row) % self.capacity]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return self.row_values(index.row())[index.column()]
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return SYSLOG_COLUMNS[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        return Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+
+    def append_rows(self, rows):
+        if not rows:
+            return
+        if len(rows) > self.capacity:
+            rows = rows[-self.capacity:]
+        evict = max(0, self._next + len(rows) - self._first - self.capacity)
+        if evict:
+            self._evict(self._first + evict)
+        if self._view is None:
+            first = self.rowCount()
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._write(rows)
+            self.endInsertRows()
+            return
+        # Filtered rows are stored (and stay searchable) but only matches become visible
+        start = self._next
+        self._write(rows)
+        matching = [seq for seq in range(start, self._next) if self._filter in self._text[seq % self.capacity]]
+        if matching:
+            first = self.rowCount()
+            self.beginInsertRows(QModelIndex(), first, first + len(matching) - 1)
+            self._view.extend(matching)
+            self.endInsertRows()
+
+    def _write(self, rows):
+        for values in rows:
+            slot = self._next % self.capacity
+            self._rows[slot] = values
+            self._text[slot] = '\t'.join(values).lower()
+            self._next += 1
+
+    def _evict(self, new_first):
+        if self._view is None:
+            removed = new_first - self._first
+            self.beginRemoveRows(QModelIndex(), 0, removed - 1)
+            self._first = new_first
+            self.endRemoveRows()
+            return
+        removed = 0
+        view = self._view
+        while self._view_start + removed < len(view) and view[self._view_start + removed] < new_first:
+            removed += 1
+        if removed:
+            self.beginRemoveRows(QModelIndex(), 0, removed - 1)
+            self._view_start += removed
+            if self._view_start > len(view) // 2:
+                del view[:self._view_start]
+                self._view_start = 0
+            self.endRemoveRows()
+        self._first = new_first
+
+    def set_filter(self, text):
+        text = text.strip().lower()
+        if text == self._filter:
+            return
+        self.beginResetModel()
+        self._filter = text
+        if not text:
+            self._view = None
+        else:
+            capacity = self.capacity
+            texts = self._text
+            self._view = [seq for seq in range(self._first, self._next) if text in texts[seq % capacity]]
+        self._view_start = 0
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = [None] * self.capacity
+        self._text = [None] * self.capacity
+        self._first = self._next = 0
+        self._view = [] if self._filter else None
+        self._view_start = 0
+        self.endResetModel()
+
+class RotatingLogFile:
+    """
+    Appends syslog lines to path, renaming it to path.1 (path.1 to path.2, ...)
+    once it reaches max_bytes, so the full log of a long session is available
+    on disk for post-mortem analysis while using bounded space.
+    """
+    def __init__(self, path, max_bytes=SPILL_MAX_BYTES, backups=SPILL_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+
+    def write_lines(self, lines):
+        text = ''.join(line + '\n' for line in lines)
+        self._file.write(text)
+        self._file.flush()
+        self._size += len(text.encode('utf-8'))
+        if self._size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._size = 0
+
+    def close(self):
+        self._file.close()
+
+def syslog_spill_path():
+    from cache_store import get_app_data_dir
+    return os.path.join(get_app_data_dir(), 'syslog', 'syslog.log')
+
+if __name__ == "__main__":
+    # Benchmark: 10000 lines per second for ten minutes into the bounded model, then filter it
+    import time
+    from PySide6.QtCore import QCoreApplication
+    app = QCoreApplication([])
+    model = SyslogTableModel()
+    rows = [parse_syslog_line(f"0:00:01.{i % 1000:03d} <{i % 200}> - 192.168.0.10 minidexed - - - Note on TG{i % 8} key {i % 128}") for i in range(160)]
+    t0 = time.perf_counter()
+    for _ in range(10000 * 600 // len(rows)):  # Batches of one 16 ms frame
+        model.append_rows(rows)
+    elapsed = time.perf_counter() - t0
+    print(f"{model.rowCount()} rows kept of {10000 * 600} lines, {elapsed:.2f} s for ten minutes of input")
+    t0 = time.perf_counter()
+    model.set_filter("tg3 key 1")
+    print(f"Filter: {model.rowCount()} matching rows in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        model.append_rows(rows)
+    print(f"{model.rowCount()} matching rows after 1000 more batches, {(time.perf_counter() - t0) * 1000:.0f} ms")
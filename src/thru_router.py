@@ -0,0 +1,126 @@
+import time
+from bisect import bisect_right
+
+# Message types that can be filtered, in the order shown in the MIDI Thru dialog
+THRU_TYPES = [
+    ("note", "Notes"),
+    ("poly_aftertouch", "Polyphonic aftertouch"),
+    ("control_change", "Control change"),
+    ("program_change", "Program change"),
+    ("aftertouch", "Channel aftertouch"),
+    ("pitchwheel", "Pitch bend"),
+    ("sysex", "SysEx"),
+    ("realtime", "Clock and realtime"),
+    ("system", "Other system messages"),
+]
+_CHANNEL_TYPES = {0x8: "note", 0x9: "note", 0xA: "poly_aftertouch", 0xB: "control_change",
+                  0xC: "program_change", 0xD: "aftertouch", 0xE: "pitchwheel"}
+
+# Upper bounds of the latency histogram buckets in seconds; the last bucket is open
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02)
+
+def message_kind(status):
+    if status < 0xF0:
+        return _CHANNEL_TYPES[status >> 4]
+    if status in (0xF0, 0xF7):
+        return "sysex"
+    return "realtime" if status >= 0xF8 else "system"
+
+def bucket_label(index):
+    def fmt(seconds):
+        return f"{seconds * 1000:g} ms" if seconds >= 0.001 else f"{seconds * 1000000:g} µs"
+    if index == 0:
+        return f"< {fmt(LATENCY_BUCKETS[0])}"
+    if index == len(LATENCY_BUCKETS):
+        return f">= {fmt(LATENCY_BUCKETS[-1])}"
+    return f"{fmt(LATENCY_BUCKETS[index - 1])} - {fmt(LATENCY_BUCKETS[index])}"
+
+class ThruRouter:
+    """
+    MIDI thru for live playing. route() runs directly in the input callback thread
+    with one complete raw message: a 256 entry status table (compiled whenever the
+    settings change) says whether the message type passes and which status byte it
+    gets on output (channel map), and a 128 entry table transposes notes. Nothing is
+    logged or formatted on that path. The time from the input timestamp to the
+    return of send() is counted in a latency histogram. Messages send() rejects
+    (by returning False) are counted as unsendable.
+    """
+    def __init__(self, send):
+        self.send = send
+        self.enabled = False
+        self.blocked_types = set()
+        self.channel_map = list(range(16))  # Input channel -> output channel, None to drop
+        self.transpose = 0
+        self._tables = (None, None)
+        self.reset_stats()
+        self.compile()
+
+    def configure(self, blocked_types=None, channel_map=None, transpose=None):
+        if blocked_types is not None:
+            self.blocked_types = set(blocked_types)
+        if channel_map is not None:
+            self.channel_map = list(channel_map)
+        if transpose is not None:
+            self.transpose = int(transpose)
+        self.compile()
+
+    def compile(self):
+        status_map = [None] * 256
+        for status in range(0x80, 0x100):
+            if message_kind(status) in self.blocked_types:
+                continue
+            if status < 0xF0:
+                out_channel = self.channel_map[status & 0x0F]
+                if out_channel is None:
+                    continue
+                status_map[status] = (status & 0xF0) | out_channel
+            else:
+                status_map[status] = status
+        note_map = None
+        if self.transpose:
+            note_map = [n + self.transpose if 0 <= n + self.transpose <= 127 else None for n in range(128)]
+        # One assignment, so route() never sees half of an update
+        self._tables = (status_map, note_map)
+
+    def route(self, data, t_in):
+        status_map, note_map = self._tables
+        out_status = status_map[data[0]]
+        if out_status is None:
+            self.filtered += 1
+            return
+        if note_map is not None and 0x80 <= out_status < 0xB0 and len(data) > 1:
+            note = note_map[data[1]]
+            if note is None:
+                self.filtered += 1
+                return
+            data = bytes((out_status, note)) + data[2:]
+        elif out_status != data[0]:
+            data = bytes((out_status,)) + data[1:]
+        if self.send(data) is False:
+            self.unsendable += 1
+            return
+        latency = time.perf_counter() - t_in
+        self.histogram[bisect_right(LATENCY_BUCKETS, latency)] += 1
+        self.forwarded += 1
+        if latency > self.max_latency:
+            self.max_latency = latency
+
+    def reset_stats(self):
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.forwarded = 0
+        self.filtered = 0
+        self.unsendable = 0
+        self.errors = 0  # Counted by the caller when routing raised
+        self.max_latency = 0.0
+
+    def histogram_text(self, width=40):
+        peak = max(self.histogram) or 1
+        lines = []
+        for i, count in enumerate(self.histogram):
+            bar = '#' * (count * width // peak)
+            lines.append(f"{bucket_label(i):>18} {count:>8} {bar}")
+        lines.append("")
+        lines.append(f"{self.forwarded} forwarded, {self.filtered} filtered, max {self.max_latency * 1000:.2f} ms")
+        if self.unsendable or self.errors:
+            lines.append(f"{self.unsendable} not sendable to the output port, {self.errors} errors")
+        return '\n'.join(lines)
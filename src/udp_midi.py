@@ -0,0 +1,153 @@
+import threading
+import time
+
+DEFAULT_MAX_DATAGRAM = 1024    # Matches the receive buffer of older utility versions
+DEFAULT_FLUSH_INTERVAL = 0.001 # Seconds a partially filled datagram may wait
+
+# Number of data bytes following a channel status byte (indexed by status >> 4)
+_CHANNEL_DATA_LEN = {0x8: 2, 0x9: 2, 0xA: 2, 0xB: 2, 0xC: 1, 0xD: 1, 0xE: 2}
+# Number of data bytes following a system common status byte
+_SYSTEM_DATA_LEN = {0xF1: 1, 0xF2: 2, 0xF3: 1, 0xF6: 0}
+
+class UdpBatcher:
+    """
+    Coalesces complete MIDI messages into as few datagrams as possible.
+    Messages are appended to a pending buffer which is sent when it would exceed
+    max_datagram, when flush() is called (the file player does this once per
+    scheduling tick), or at the latest flush_interval seconds after the first
+    message was queued. A single message larger than max_datagram is sent on its own.
+    """
+    def __init__(self, sock, address, max_datagram=DEFAULT_MAX_DATAGRAM, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.sock = sock
+        self.address = address
+        self.max_datagram = max_datagram
+        self.flush_interval = flush_interval
+        self._buf = bytearray()
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+        self._flusher = None
+        self._closed = False
+        self.datagrams_sent = 0
+        self.messages_sent = 0
+
+    def add(self, midi_bytes):
+        with self._lock:
+            if self._buf and len(self._buf) + len(midi_bytes) > self.max_datagram:
+                self._flush_locked()
+            was_empty = not self._buf
+            self._buf += midi_bytes
+            self.messages_sent += 1
+            if len(self._buf) >= self.max_datagram:
+                self._flush_locked()
+            elif was_empty and self.flush_interval:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                    self._flusher.start()
+                self._pending.set()
+
+    def _flush_loop(self):
+        # Sends datagrams that nobody flushed explicitly (e.g. single sends from the UI)
+        while not self._closed:
+            self._pending.wait()
+            self._pending.clear()
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buf:
+            return
+        try:
+            self.sock.sendto(self._buf, self.address)
+            self.datagrams_sent += 1
+        except Exception as e:
+            print(f"[ERROR] UDP sendto failed: {e}")
+        self._buf = bytearray()
+
+    def close(self):
+        self.flush()
+        self._closed = True
+        self._pending.set()
+
+def split_midi_stream(data):
+    """
+    Split a datagram containing one or more complete MIDI messages into a list of bytes objects.
+    Stray data bytes without a status byte are skipped.
+    """
+    messages = []
+    n = len(data)
+    i = 0
+    while i < n:
+        status = data[i]
+        if status < 0x80:
+            i += 1
+            continue
+        if status == 0xF0:
+            end = data.find(b'\xF7', i + 1)
+            if end < 0:
+                end = n - 1
+            messages.append(bytes(data[i:end + 1]))
+            i = end + 1
+            continue
+        if status >= 0xF8 or status in (0xF4, 0xF5, 0xF7):
+            messages.append(bytes(data[i:i + 1]))
+            i += 1
+            continue
+        if status >= 0xF0:
+            length = 1 + _SYSTEM_DATA_LEN.get(status, 0)
+        else:
+            length = 1 + _CHANNEL_DATA_LEN[status >> 4]
+        messages.append(bytes(data[i:i + length]))
+        i += length
+    return messages
+
+if __name__ == "__main__":
+    # Benchmark: per-message sendto versus coalesced datagrams over the loopback interface
+    import socket
+    count = 200000
+    notes = [bytes((0x90, 60 + (i % 12), 100)) for i in range(128)]
+
+    def receiver(sock, expected, result):
+        received = 0
+        sock.settimeout(1.0)
+        try:
+            while received < expected:
+                data, _ = sock.recvfrom(65535)
+                received += len(split_midi_stream(data))
+        except socket.timeout:
+            pass
+        result.append(received)
+
+    def run(label, coalesce):
+        rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        rx.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+        rx.bind(('127.0.0.1', 0))
+        address = rx.getsockname()
+        tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        result = []
+        t = threading.Thread(target=receiver, args=(rx, count, result))
+        t.start()
+        start = time.perf_counter()
+        if coalesce:
+            batcher = UdpBatcher(tx, address)
+            for i in range(count):
+                batcher.add(notes[i & 127])
+                if i % 64 == 63:
+                    batcher.flush()  # One "scheduling tick" every 64 messages
+            batcher.flush()
+            datagrams = batcher.datagrams_sent
+        else:
+            for i in range(count):
+                tx.sendto(notes[i & 127], address)
+            datagrams = count
+        elapsed = time.perf_counter() - start
+        t.join()
+        rx.close()
+        tx.close()
+        print(f"{label:<12} {count / elapsed:12.0f} msg/s  {datagrams:7d} datagrams  {result[0]:7d} messages received")
+
+    run("per-message", False)
+    run("coalesced", True)
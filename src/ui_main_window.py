@@ -1,8 +1,10 @@
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QLabel, QSplitter, QTableView, QHeaderView
-from PySide6.QtGui import QStandardItemModel, QStandardItem, QAction, QKeySequence
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QLabel, QSplitter, QTableView, QHeaderView, QListView, QLineEdit
+from PySide6.QtGui import QAction, QKeySequence, QFont
 from PySide6.QtCore import Qt
-import re
+import time
 from dialogs import Dialogs
+from midi_monitor import MidiMonitorModel
+from syslog_log import SyslogTableModel, parse_syslog_line
 from PySide6.QtWidgets import QApplication
 
 class UiMainWindow:
@@ -35,9 +37,25 @@ class UiMainWindow:
         in_layout = QVBoxLayout()
         in_panel.setLayout(in_layout)
         in_layout.addWidget(QLabel("MIDI In"))
-        self.in_text = QTextEdit()
-        self.in_text.setReadOnly(True)
-        in_layout.addWidget(self.in_text)
+        # Bounded ring buffer model; the list view only renders the visible rows
+        self.midi_in_model = MidiMonitorModel(parent=self.central)
+        self.midi_in_model.on_flushed = self._autoscroll_in
+        self.in_view = QListView()
+        self.in_view.setModel(self.midi_in_model)
+        self.in_view.setUniformItemSizes(True)
+        self.in_view.setFont(QFont("Courier New"))
+        self.in_view.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
+        self.in_view.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        copy_in_action = QAction('Copy', self.in_view)
+        copy_in_action.setShortcut(QKeySequence.StandardKey.Copy)
+        def copy_selected_in():
+            rows = sorted(index.row() for index in self.in_view.selectionModel().selectedRows())
+            if rows:
+                QApplication.clipboard().setText('\n'.join(self.midi_in_model.iter_hex_lines(rows)))
+        copy_in_action.triggered.connect(copy_selected_in)
+        self.in_view.addAction(copy_in_action)
+        self.in_view.setContextMenuPolicy(Qt.ContextMenuPolicy.ActionsContextMenu)
+        in_layout.addWidget(self.in_view)
         self.btn_clear_in = QPushButton("Clear")
         in_btn_layout = QHBoxLayout()
         in_btn_layout.addWidget(self.btn_clear_in)
@@ -45,12 +63,20 @@ class UiMainWindow:
         splitter.addWidget(in_panel)
 
         main_layout.addWidget(splitter)
+        syslog_header = QHBoxLayout()
         self.syslog_label = QLabel("Syslog")
-        main_layout.addWidget(self.syslog_label)
+        syslog_header.addWidget(self.syslog_label)
+        syslog_header.addStretch()
+        self.syslog_filter = QLineEdit()
+        self.syslog_filter.setPlaceholderText("Filter")
+        self.syslog_filter.setClearButtonEnabled(True)
+        self.syslog_filter.setMaximumWidth(250)
+        syslog_header.addWidget(self.syslog_filter)
+        main_layout.addLayout(syslog_header)
         self.syslog_view = QTableView()
-        self.syslog_model = QStandardItemModel(0, 5)
-        self.syslog_model.setHorizontalHeaderLabels(['Time', 'Index', 'IP', 'Service', 'Message'])
+        self.syslog_model = SyslogTableModel()
         self.syslog_view.setModel(self.syslog_model)
+        self.syslog_filter.textChanged.connect(self.syslog_model.set_filter)
         self.syslog_view.setAlternatingRowColors(True)
         self.syslog_view.horizontalHeader().setStretchLastSection(True)
         self.syslog_view.verticalHeader().setDefaultSectionSize(6)  # 80% of previous 8px height
@@ -74,10 +100,8 @@ class UiMainWindow:
             if not selection:
                 return
             lines = []
-            for index in selection:
-                row = index.row()
-                values = [self.syslog_model.item(row, col).text() for col in range(self.syslog_model.columnCount())]
-                lines.append('\t'.join(values))
+            for index in sorted(selection, key=lambda index: index.row()):
+                lines.append('\t'.join(self.syslog_model.row_values(index.row())))
             from PySide6.QtWidgets import QApplication
             clipboard = QApplication.clipboard()
             clipboard.setText('\n'.join(lines))
@@ -108,37 +132,29 @@ class UiMainWindow:
             self.main_window.show_status(msg)
 
     def append_syslog(self, msg):
-        line = msg.strip()
-        # Try to match full line with message
-        m = re.match(r'([0-9:.]+) ([<>][0-9]+) - ([0-9.]+) ([^ ]+) - - - (.*)', line)
-        if m:
-            time, idx, ip, service, message = m.groups()
-        else:
-            # Try to match line with empty message
-            m2 = re.match(r'([0-9:.]+) ([<>][0-9]+) - ([0-9.]+) ([^ ]+) - - -$', line)
-            if m2:
-                time, idx, ip, service = m2.groups()
-                message = ''
-            else:
-                time, idx, ip, service, message = '', '', '', '', line
-        row = self.syslog_model.rowCount()
-        items = []
-        for val in [time, idx, ip, service, message]:
-            item = QStandardItem(val)
-            item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-            items.append(item)
-        self.syslog_model.appendRow(items)
+        self.append_syslog_batch([parse_syslog_line(msg)])
+
+    def append_syslog_batch(self, rows):
+        # One batch of parsed rows from SyslogWorker, inserted with a single model update
+        self.syslog_model.append_rows(rows)
         if getattr(self.main_window, 'autoscroll_enabled', True):
             self.syslog_view.scrollToBottom()
 
+    def display_midi_messages(self, messages):
+        # One batch of (timestamp, bytes) from MIDIReceiveWorker; rows are added per display frame
+        self.midi_in_model.append_batch(messages)
+
+    def _autoscroll_in(self):
+        if getattr(self.main_window, 'autoscroll_enabled', True):
+            self.in_view.scrollToBottom()
+
     def display_sysex(self, data):
-        hex_str = ' '.join(f'{b:02X}' for b in data)
-        self.in_text.append(hex_str)
-        self.in_text.append("")  # Add a blank line after each line
+        data = list(data)
+        if data and data[0] != 0xF0:
+            data = [0xF0] + data + [0xF7]
+        self.midi_in_model.append_batch([(time.time(), bytes(data))])
         if hasattr(self.main_window, 'show_status'):
             self.main_window.show_status(f"Received {len(data)} bytes successfully.")
-        if getattr(self.main_window, 'autoscroll_enabled', True):
-            self.in_text.verticalScrollBar().setValue(self.in_text.verticalScrollBar().maximum())
 
     def refresh_ports(self):
         pass
@@ -4,11 +4,11 @@ import sys
 import tempfile
 import zipfile
 import requests
-import ftplib
 import socket
 import time
 import re
 from zeroconf import ServiceBrowser, ServiceListener, Zeroconf
+from ftp_deploy import DEPLOY_CONNECTIONS, DeployManifest, FtpDeployer, deploy_manifest_path, ftp_connect
 
 class UpdaterWorker(QThread):
     status = Signal(str)
@@ -16,7 +16,8 @@ class UpdaterWorker(QThread):
     finished = Signal(bool, str)  # success, message
     device_list = Signal(list)
 
-    def __init__(self, release_type, pr_number, device_ip, update_performances, github_token=None, src_path=None):
+    def __init__(self, release_type, pr_number, device_ip, update_performances, github_token=None, src_path=None,
+                 ftp_connections=DEPLOY_CONNECTIONS, ftp_factory=None):
         super().__init__()
         self.release_type = release_type
         self.pr_number = pr_number
@@ -24,10 +25,19 @@ class UpdaterWorker(QThread):
         self.update_performances = update_performances
         self.github_token = github_token
         self.src_path = src_path
+        self.ftp_connections = ftp_connections
+        self.ftp_factory = ftp_factory  # Returns a logged in ftplib.FTP; defaults to the device
         self._stop = False
+        self._percent = -1
+
+    def _deploy_progress(self, done, total):
+        percent = int(done * 100 / total) if total else 100
+        if percent != self._percent:
+            self._percent = percent
+            self.progress.emit(percent)
 
     def run(self):
-        ftp = None
+        deployer = None
         try:
             self.status.emit("Starting update...")
             # --- Download release logic ---
@@ -58,130 +68,48 @@ class UpdaterWorker(QThread):
                 self.status.emit("Extracting release...")
                 extract_path = self.extract_zip(zip_path)
             # --- FTP upload logic ---
+            # Only files that differ from what the device has are sent (see ftp_deploy.py)
             self.status.emit(f"Connecting to {self.device_ip} ...")
-            ftp = ftplib.FTP()
-            ftp.connect(self.device_ip, 21, timeout=10)
-            ftp.login("admin", "admin")
-            ftp.set_pasv(True)
-            self.status.emit(f"Connected to {self.device_ip} (passive mode). Uploading kernel images...")
-            # Find kernel*.img files
-            kernel_files = []
+            deployer = FtpDeployer(self.ftp_factory or (lambda: ftp_connect(self.device_ip)), self.device_ip,
+                                   DeployManifest(deploy_manifest_path()), connections=self.ftp_connections,
+                                   status=self.status.emit, progress=self._deploy_progress)
+            self.status.emit(f"Connected to {self.device_ip} (passive mode). Comparing files...")
+            # Find kernel*.img files; each is uploaded as .new and then renamed over the old one
             for root, dirs, files in os.walk(extract_path):
                 for file in files:
                     if file.startswith("kernel") and file.endswith(".img"):
-                        kernel_files.append(os.path.join(root, file))
-            total = len(kernel_files)
-            uploaded_files = []
-            for idx, local_path in enumerate(kernel_files):
-                file = os.path.basename(local_path)
-                remote_path_new = f"/SD/{file}.new"
-                remote_path_final = f"/SD/{file}"
-                filesize = os.path.getsize(local_path)
-                uploaded = [0]
-                self.status.emit(f"Uploading {file} as {file}.new to {self.device_ip}...")
-                def progress_callback(data):
-                    uploaded[0] += len(data)
-                    percent = int(((idx + uploaded[0]/filesize) / total) * 100)
-                    self.progress.emit(percent)
-                with open(local_path, 'rb') as f:
-                    ftp.storbinary(f'STOR {remote_path_new}', f, 8192, callback=progress_callback)
-                self.status.emit(f"Uploaded {file} as {file}.new to {self.device_ip}.")
-                # Atomically replace old file with new one
-                try:
-                    try:
-                        ftp.delete(remote_path_final)
-                    except Exception:
-                        pass
-                    ftp.rename(remote_path_new, remote_path_final)
-                    self.status.emit(f"Renamed {file}.new to {file} on device.")
-                except Exception as e:
-                    self.status.emit(f"[WARN] Could not rename {remote_path_new} to {remote_path_final}: {e}")
+                        deployer.add_file(os.path.join(root, file), f"/SD/{file}", atomic=True)
             # --- Performances update logic ---
             if self.update_performances:
-                self.status.emit("Updating Performances: recursively deleting and uploading /SD/performance directory...")
-                def ftp_rmdirs(ftp, path):
-                    try:
-                        items = ftp.nlst(path)
-                    except Exception as e:
-                        self.status.emit(f"[WARN] Could not list {path}: {e}")
-                        return
-                    for item in items:
-                        if item in ['.', '..', path]:
-                            continue
-                        full_path = f"{path}/{item}" if not item.startswith(path) else item
-                        try:
-                            ftp.delete(full_path)
-                            self.status.emit(f"Deleted file: {full_path}")
-                        except Exception:
-                            try:
-                                ftp_rmdirs(ftp, full_path)
-                                ftp.rmd(full_path)
-                                self.status.emit(f"Deleted directory: {full_path}")
-                            except Exception as e:
-                                self.status.emit(f"[WARN] Could not delete {full_path}: {e}")
-                try:
-                    ftp_rmdirs(ftp, '/SD/performance')
-                    try:
-                        ftp.rmd('/SD/performance')
-                        self.status.emit("Deleted /SD/performance on device.")
-                    except Exception as e:
-                        self.status.emit(f"[WARN] Could not delete /SD/performance directory itself: {e}")
-                except Exception as e:
-                    self.status.emit(f"Warning: Could not delete /SD/performance: {e}")
-                # Upload extracted performance/ recursively
+                # /SD/performance is made identical to the extracted performance/ directory
                 local_perf = os.path.join(extract_path, 'performance')
-                def ftp_mkdirs(ftp, path):
-                    try:
-                        ftp.mkd(path)
-                    except Exception:
-                        pass
-                def ftp_upload_dir(ftp, local_dir, remote_dir):
-                    ftp_mkdirs(ftp, remote_dir)
-                    for item in os.listdir(local_dir):
-                        lpath = os.path.join(local_dir, item)
-                        rpath = f"{remote_dir}/{item}"
-                        if os.path.isdir(lpath):
-                            ftp_upload_dir(ftp, lpath, rpath)
-                        else:
-                            with open(lpath, 'rb') as fobj:
-                                ftp.storbinary(f'STOR {rpath}', fobj)
-                            self.status.emit(f"Uploaded {rpath}")
                 if os.path.isdir(local_perf):
-                    ftp_upload_dir(ftp, local_perf, '/SD/performance')
-                    self.status.emit("Uploaded new /SD/performance directory.")
+                    deployer.add_tree(local_perf, '/SD/performance')
                 else:
                     self.status.emit("No extracted performance/ directory found, skipping upload.")
-                # Upload performance.ini if it exists in extract_path
                 local_perfini = os.path.join(extract_path, 'performance.ini')
                 if os.path.isfile(local_perfini):
-                    with open(local_perfini, 'rb') as fobj:
-                        ftp.storbinary('STOR /SD/performance.ini', fobj)
-                    self.status.emit("Uploaded /SD/performance.ini.")
+                    deployer.add_file(local_perfini, '/SD/performance.ini')
                 else:
                     self.status.emit("No extracted performance.ini found, skipping upload.")
+            self.status.emit(f"Uploading {len(deployer.uploads)} changed files "
+                             f"({deployer.total_bytes() / 1e6:.1f} MB) to {self.device_ip}...")
+            deployer.run()
             try:
-                ftp.sendcmd("BYE")
+                deployer.ftp.sendcmd("BYE")
             except Exception:
                 pass
             self.status.emit(f"Disconnected from {self.device_ip}.")
             self.progress.emit(100)
             self.finished.emit(True, "Update finished successfully.")
         except Exception as e:
-            if ftp is not None:
-                try:
-                    ftp.close()
-                except Exception:
-                    pass
             import sys
             print(f"Error: {e}", file=sys.stderr)
             self.status.emit(f"Error: {e}")
             self.finished.emit(False, str(e))
         finally:
-            if ftp is not None:
-                try:
-                    ftp.close()
-                except Exception:
-                    pass
+            if deployer is not None:
+                deployer.close()
 
     def download_latest_release_github_api(self, release_type):
         headers = {'Accept': 'application/vnd.github.v3+json'}
@@ -1,76 +1,32 @@
 import sys
 import requests
 import os
-import hashlib
 import json
-import re
-from PySide6.QtCore import QThread, Signal, Qt, QSettings
+from PySide6.QtCore import Qt, QSettings, QTimer
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QLineEdit, QListWidget, QHBoxLayout, QComboBox, QPushButton, QLabel, QApplication, QListWidgetItem, QStatusBar, QMenuBar, QMenu
+    QDialog, QVBoxLayout, QLineEdit, QListView, QHBoxLayout, QComboBox, QPushButton, QLabel, QApplication, QStatusBar, QMenuBar, QMenu
 )
 from PySide6.QtGui import QAction
 from voice_editor import VoiceEditor
 from voice_editor_panel import VoiceEditorPanelDialog, VoiceEditorPanel
 from singleton_dialog import SingletonDialog
+from voice_index import VoiceListModel
+from cache_store import get_cache_store
+from download_service import get_download_service, PRIORITY_USER
+from voice_prefetch import VoicePrefetcher, DEFAULT_RADIUS
 
-VOICE_LIST_URL = "https://patches.fm/patches/dx7/patch_list.json"
+PATCHES_BASE_URL = "https://patches.fm/patches"
+VOICE_LIST_URL = f"{PATCHES_BASE_URL}/dx7/patch_list.json"
 VOICE_LIST_CACHE_NAME = "patch_list.json"
 
 def get_cache_dir():
     return os.path.join(os.getenv('LOCALAPPDATA') or os.path.expanduser('~/.local/share'), 'MiniDexed_Service_Utility', 'patches_cache')
 
-class VoiceDownloadWorker(QThread):
-    finished = Signal(list, str, object)  # syx_data, voice_name, error (None if ok)
-    def __init__(self, url, voice_name):
-        super().__init__()
-        self.url = url
-        self.voice_name = voice_name
-    def run(self):
-        try:
-            cache_dir = get_cache_dir()
-            os.makedirs(cache_dir, exist_ok=True)
-            url_hash = hashlib.sha256(self.url.encode('utf-8')).hexdigest()
-            cache_path = os.path.join(cache_dir, url_hash + '.syx')
-            if os.path.exists(cache_path):
-                with open(cache_path, 'rb') as f:
-                    syx_data = list(f.read())
-                self.finished.emit(syx_data, self.voice_name, None)
-                return
-            import requests
-            resp = requests.get(self.url)
-            resp.raise_for_status()
-            syx_data = resp.content
-            with open(cache_path, 'wb') as f:
-                f.write(syx_data)
-            self.finished.emit(list(syx_data), self.voice_name, None)
-        except Exception as e:
-            self.finished.emit([], self.voice_name, e)
-
-class VoiceJsonDownloadWorker(QThread):
-    finished = Signal(dict, str, object)  # json_data, voice_name, error
-    def __init__(self, url, voice_name):
-        super().__init__()
-        self.url = url
-        self.voice_name = voice_name
-    def run(self):
-        try:
-            cache_dir = get_cache_dir()
-            os.makedirs(cache_dir, exist_ok=True)
-            url_hash = hashlib.sha256(self.url.encode('utf-8')).hexdigest()
-            cache_path = os.path.join(cache_dir, url_hash + '.json')
-            if os.path.exists(cache_path):
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    json_data = json.load(f)
-                self.finished.emit(json_data, self.voice_name, None)
-                return
-            resp = requests.get(self.url)
-            resp.raise_for_status()
-            json_data = resp.json()
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f)
-            self.finished.emit(json_data, self.voice_name, None)
-        except Exception as e:
-            self.finished.emit({}, self.voice_name, e)
+def voice_syx_url(sig):
+    return f"{PATCHES_BASE_URL}/single-voice/dx7/{sig[:2]}/{sig}.syx"
+
+def voice_json_url(sig):
+    return f"{PATCHES_BASE_URL}/dx7/{sig[:2]}/{sig}.json"
 
 class VoiceBrowser(SingletonDialog):
     _instance = None
@@ -116,8 +72,11 @@ class VoiceBrowser(SingletonDialog):
         self.search_box = QLineEdit(self)
         self.search_box.setPlaceholderText("Search voices...")
         layout.addWidget(self.search_box)
-        self.list_widget = QListWidget(self)
-        layout.addWidget(self.list_widget)
+        self.voice_model = VoiceListModel(self)
+        self.list_view = QListView(self)
+        self.list_view.setModel(self.voice_model)
+        self.list_view.setUniformItemSizes(True)  # Lets the view skip measuring tens of thousands of rows
+        layout.addWidget(self.list_view)
         self.bank_label = QLabel(self)
         self.bank_label.setText("")
         layout.addWidget(self.bank_label)
@@ -139,25 +98,56 @@ class VoiceBrowser(SingletonDialog):
         layout.addLayout(controls_layout)
         self.status_bar = QStatusBar(self)
         self.status_bar.setStyleSheet("QStatusBar { margin: 0; padding: 0; border: none; }")
+        self.cache_label = QLabel(self)
+        self.status_bar.addPermanentWidget(self.cache_label)
         layout.addWidget(self.status_bar)
         self.voices = []
-        self.filtered_voices = []
+        self.search_box.textChanged.connect(self.filter_voices)
         self.search_box.returnPressed.connect(self.filter_voices)
-        self.list_widget.itemDoubleClicked.connect(self.open_voice_in_editor_on_double_click)
+        self.list_view.doubleClicked.connect(self.open_voice_in_editor_on_double_click)
         self.search_box.setMinimumWidth(0)
-        self.list_widget.setMinimumWidth(0)
-        self.list_widget.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.list_widget.setWordWrap(True)
+        self.list_view.setMinimumWidth(0)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.list_view.setTextElideMode(Qt.TextElideMode.ElideRight)
         self.load_voices()
         self.sending = False
         self.send_queue = []
         self.edit_button.setEnabled(False)
         self.edit_panel_button.setEnabled(False)
-        self.list_widget.itemSelectionChanged.connect(self._update_action_buttons)
-        self.list_widget.itemClicked.connect(self.on_voice_clicked)
+        self.list_view.selectionModel().currentChanged.connect(lambda *_: self._update_action_buttons())
+        self.list_view.clicked.connect(self.on_voice_clicked)
         self._active_workers = []  # Keep references to active workers
+        # Warm the cache with the neighbours of the clicked voice and the visible rows
+        radius = QSettings("MIDISend", "MIDISendApp").value("voice_prefetch_count", DEFAULT_RADIUS, type=int)
+        self.prefetcher = VoicePrefetcher(get_download_service(), [voice_syx_url, voice_json_url],
+                                          cache=get_cache_store(), radius=radius, parent=self)
+        self._viewport_timer = QTimer(self)
+        self._viewport_timer.setSingleShot(True)
+        self._viewport_timer.setInterval(150)
+        self._viewport_timer.timeout.connect(lambda: self.schedule_prefetch(None))
+        self.list_view.verticalScrollBar().valueChanged.connect(lambda _: self._viewport_timer.start())
+
+    def update_cache_stats(self):
+        text = get_cache_store().stats_text()
+        if getattr(self, 'prefetcher', None):
+            text += f" | {self.prefetcher.stats_text()}"
+        self.cache_label.setText(text)
+
+    def visible_rows(self):
+        viewport = self.list_view.viewport().rect()
+        first = self.list_view.indexAt(viewport.topLeft()).row()
+        if first < 0:
+            return range(0)
+        last = self.list_view.indexAt(viewport.bottomLeft()).row()
+        if last < 0:
+            last = self.voice_model.rowCount() - 1
+        return range(first, last + 1)
+
+    def schedule_prefetch(self, center):
+        self.prefetcher.schedule(self.voice_at, center, self.visible_rows())
 
     def set_status(self, msg, error=False):
+        self.update_cache_stats()
         if not error:
             self.status_bar.showMessage(msg)
         parent = self.parent() if self.parent() else self
@@ -188,32 +178,36 @@ class VoiceBrowser(SingletonDialog):
                 with open(cache_path, 'w', encoding='utf-8') as f:
                     json.dump(voices, f)
             self.voices = voices
+            # Build the search index once; filtering afterwards only consults the index
+            self.voice_model.set_voices(voices)
             self.set_status(f"Loaded {len(self.voices)} voices.")
             self.filter_voices()
         except Exception as e:
             self.set_status(f"Failed to load voices: {e}", error=True)
 
     def filter_voices(self):
-        query = re.sub(r'\s+', ' ', self.search_box.text().lower().strip())
-        self.list_widget.clear()
-        def norm(s):
-            return re.sub(r'\s+', ' ', s.lower().strip())
-        self.filtered_voices = [v for v in self.voices if query in norm(v["name"]) or query in norm(v.get("author", ""))]
-        for idx, voice in enumerate(self.filtered_voices):
-            display_name = re.sub(r'\s+', ' ', voice['name'])
-            item = QListWidgetItem(f"{display_name} - {voice.get('author', '')}")
-            self.list_widget.addItem(item)
+        self.voice_model.set_filter(self.search_box.text())
         self._update_action_buttons()
 
+    @property
+    def filtered_voices(self):
+        return self.voice_model.filtered_voices()
+
+    def current_row(self):
+        return self.list_view.currentIndex().row()
+
+    def voice_at(self, row):
+        return self.voice_model.voice_at(row)
+
     def add_edit_buttons_to_list(self):
         pass  # No longer needed
 
     def edit_selected_voice(self):
-        idx = self.list_widget.currentRow()
-        if idx < 0 or idx >= len(self.filtered_voices):
+        idx = self.current_row()
+        if self.voice_at(idx) is None:
             self.set_status("No voice selected.", error=True)
             return
-        voice = self.filtered_voices[idx]
+        voice = self.voice_at(idx)
         def after_download(syx_data, voice_name, error):
             if error or not syx_data:
                 self.set_status(f"Failed to get SysEx data for '{voice.get('name','')}'.", error=True)
@@ -247,11 +241,11 @@ class VoiceBrowser(SingletonDialog):
         self._active_workers.append(worker)
 
     def edit_selected_voice_panel(self):
-        idx = self.list_widget.currentRow()
-        if idx < 0 or idx >= len(self.filtered_voices):
+        idx = self.current_row()
+        if self.voice_at(idx) is None:
             self.set_status("No voice selected.", error=True)
             return
-        voice = self.filtered_voices[idx]
+        voice = self.voice_at(idx)
         def after_download(syx_data, voice_name, error):
             if error or not syx_data:
                 self.set_status(f"Failed to download voice: {error}", error=True)
@@ -281,15 +275,15 @@ class VoiceBrowser(SingletonDialog):
         self._active_workers.append(worker)
 
     def send_voice_on_click(self, item):
-        idx = self.list_widget.currentRow()
-        if idx < 0 or idx >= len(self.filtered_voices):
+        idx = self.current_row()
+        if self.voice_at(idx) is None:
             self.set_status("No voice selected.", error=True)
             return
         channel_idx = self.channel_combo.currentIndex()  # 0-based
         if channel_idx >= 16:  # 'Omni' selected
             self.set_status("Cannot send to 'Omni' channel. Please select a specific MIDI channel.", error=True)
             return
-        voice = self.filtered_voices[idx]
+        voice = self.voice_at(idx)
         def after_download(syx_data, voice_name, error):
             if error or not syx_data:
                 self.set_status(f"Failed to get SysEx data for '{voice.get('name','')}'.", error=True)
@@ -315,7 +309,7 @@ class VoiceBrowser(SingletonDialog):
         self._active_workers.append(worker)
 
     def download_and_send_voice(self, idx):
-        voice = self.filtered_voices[idx]
+        voice = self.voice_at(idx)
         channel_idx = self.channel_combo.currentIndex()  # 0-based
         def after_download(syx_data, voice_name, error):
             if error or not syx_data:
@@ -417,23 +411,35 @@ class VoiceBrowser(SingletonDialog):
                 mw.show_status(f"Could not access main window Out area: {e}")
 
     def on_voice_clicked(self, item):
-        idx = self.list_widget.currentRow()
-        if idx < 0 or idx >= len(self.filtered_voices):
+        idx = self.current_row()
+        voice = self.voice_at(idx)
+        if voice is None:
             self.bank_label.setText("")
             return
-        voice = self.filtered_voices[idx]
+        if voice.get('signature'):
+            self.prefetcher.record_click(voice_syx_url(voice['signature']))
         self.download_and_send_voice(idx)
+        self.schedule_prefetch(idx)
         sig = voice.get('signature')
         if not sig:
             self.bank_label.setText("")
             return
-        json_url = f"https://patches.fm/patches/dx7/{sig[:2]}/{sig}.json"
         self.bank_label.setText("Loading bank info...")
-        self.json_worker = VoiceJsonDownloadWorker(json_url, voice['name'])
-        self.json_worker.finished.connect(self.on_json_downloaded)
-        self.json_worker.start()
+        if getattr(self, 'json_request', None):
+            self.json_request.cancel()
+        def after_json(data, error):
+            self.json_request = None
+            json_data = {}
+            if data and not error:
+                try:
+                    json_data = json.loads(data)
+                except ValueError as e:
+                    error = e
+            self.on_json_downloaded(json_data, voice['name'], error)
+        self.json_request = get_download_service().fetch(voice_json_url(sig), after_json, PRIORITY_USER)
 
     def on_json_downloaded(self, json_data, voice_name, error):
+        self.update_cache_stats()
         if error or not json_data:
             self.bank_label.setText("Source: (not available)")
             return
@@ -445,10 +451,11 @@ class VoiceBrowser(SingletonDialog):
         self.bank_label.setText(f"Source: Bank {bank} by {author}")
 
     @staticmethod
-    def get_syx_data_for_voice_async(voice_obj, callback):
+    def get_syx_data_for_voice_async(voice_obj, callback, priority=PRIORITY_USER):
         """
-        Asynchronously retrieves SysEx data for a given voice object using a worker.
-        Calls callback(syx_data, voice_name, error) when done.
+        Asynchronously retrieves SysEx data for a given voice object through the shared download service.
+        Calls callback(syx_data, voice_name, error) on the GUI thread when done.
+        Returns a DownloadRequest that can be cancelled.
         """
         sig = voice_obj.get('signature')
         name = voice_obj.get('name', '(unknown)')
@@ -457,11 +464,9 @@ class VoiceBrowser(SingletonDialog):
             logging.warning(f"No signature for voice '{name}', cannot fetch syx.")
             callback(None, name, Exception("No signature for voice"))
             return None
-        url = f"https://patches.fm/patches/single-voice/dx7/{sig[:2]}/{sig}.syx"
-        worker = VoiceDownloadWorker(url, name)
-        worker.finished.connect(callback)
-        worker.start()
-        return worker
+        def on_done(data, error):
+            callback(list(data) if data else [], name, error)
+        return get_download_service().fetch(voice_syx_url(sig), on_done, priority)
 
     def showEvent(self, event):
         VoiceBrowser._instance = self
@@ -477,21 +482,20 @@ class VoiceBrowser(SingletonDialog):
             self.resize(self.width(), h)
 
     def closeEvent(self, event):
-        # Ensure any running worker threads are finished before closing
-        try:
-            if hasattr(self, 'download_worker') and self.download_worker is not None:
-                self.download_worker.quit()
-                self.download_worker.wait()
-            if hasattr(self, 'json_worker') and self.json_worker is not None:
-                self.json_worker.quit()
-                self.json_worker.wait()
-        except Exception:
-            pass
+        # Drop callbacks of downloads that are still pending
+        self.prefetcher.cancel()
+        for request in list(getattr(self, '_active_workers', [])):
+            if request is not None:
+                request.cancel()
+        self._active_workers = []
+        if getattr(self, 'json_request', None):
+            self.json_request.cancel()
+            self.json_request = None
         VoiceBrowser._instance = None
         super().closeEvent(event)
 
     def _update_action_buttons(self):
-        has_selection = self.list_widget.currentRow() >= 0
+        has_selection = self.current_row() >= 0
         self.edit_button.setEnabled(has_selection)
         self.edit_panel_button.setEnabled(has_selection)
 
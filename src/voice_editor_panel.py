@@ -1,5 +1,5 @@
 from PySide6.QtWidgets import QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QSlider, QWidget, QGridLayout, QFrame, QSizePolicy, QInputDialog, QLCDNumber, QTextEdit, QSplitter, QScrollArea, QPushButton
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, Signal, QSettings
 from PySide6.QtSvgWidgets import QSvgWidget
 from PySide6.QtGui import QResizeEvent, QPalette, QColor, QMouseEvent
 from single_voice_dump_decoder import SingleVoiceDumpDecoder
@@ -7,9 +7,12 @@ from envelope_widget import EnvelopeWidget
 from keyboard_scaling_widget import KeyboardScalingWidget
 from param_info_panel import ParamInfoPanel
 from algorithm_gallery_dialog import AlgorithmGalleryDialog
+from param_outbox import ParamOutbox, DEFAULT_SEND_RATE
 import os
 import json
 import glob
+from contextlib import contextmanager
+from dx7_bank import encode_vced_params, single_voice_sysex, decode_vced_params, init_voice_params, VOICE_SYSEX_SIZE
 
 # --- Static definitions and tables ---
 
@@ -62,10 +65,13 @@ OP_KS_DEFS = [
     ("RS", "Rate Scaling", "RS", 7),
 ]
 
+PARAM_CHANGE_SIZE = 7  # F0 43 1n gg pp vv F7, also the size of an Operator Select message
+
 # --- VoiceEditorPanel class ---
 
 class DraggableValueLabel(QLabel):
     valueChanged = Signal(int)
+    released = Signal()
     def __init__(self, value, min_val, max_val, get_label, parent=None):
         super().__init__(str(value), parent)
         self.setAlignment(Qt.AlignmentFlag.AlignHCenter)
@@ -106,6 +112,7 @@ class DraggableValueLabel(QLabel):
     def mouseReleaseEvent(self, event: QMouseEvent):
         if self._dragging:
             self._dragging = False
+            self.released.emit()
         super().mouseReleaseEvent(event)
 
     def wheelEvent(self, event):
@@ -164,10 +171,7 @@ class VoiceEditorPanel(QWidget):
             if midi_outport is not None:
                 cls._instance.midi_outport = midi_outport
             if voice_bytes is not None:
-                cls._instance.voice_bytes = voice_bytes
-                cls._instance.decoder = SingleVoiceDumpDecoder(voice_bytes)
-                cls._instance.decoder.decode()
-                cls._instance.params = cls._instance.decoder.params
+                cls._instance.load_voice(voice_bytes)
         return cls._instance
 
     @classmethod
@@ -201,6 +205,16 @@ class VoiceEditorPanel(QWidget):
         self.params = self.decoder.params
         self.op_count = 6
         self.op_bg_widgets = []
+        # Parameter changes go out through a rate-limited, latest-value-wins outbox
+        rate = QSettings("MIDISend", "MIDISendApp").value("param_send_rate_hz", DEFAULT_SEND_RATE, type=int)
+        self.param_outbox = ParamOutbox(self._send_param, rate, parent=self)
+        self._selected_op = None  # Operator last selected on the synth, None if unknown
+        # Changes collected inside batch_changes(): outbox key -> (key, value)
+        self._batch_depth = 0
+        self._dirty = {}
+        self._dump_required = False
+        self.wire_bytes_saved = 0
+        self._sliders = {}  # (op or None, param key) -> slider, for refresh_controls()
         self.status_bar = QLabel("")
         self.status_bar.setFixedHeight(36)
         self.status_bar.setFixedWidth(220)
@@ -242,9 +256,9 @@ class VoiceEditorPanel(QWidget):
             current_name = self.get_patch_name()
             new_name, ok = QInputDialog.getText(self, "Rename Voice", "Enter new voice name (max 10 chars):", text=current_name)
             if ok and new_name:
-                for i, c in enumerate(new_name.ljust(10)[:10]):
-                    self.set_param(f'VNAM{i+1}', ord(c))
-                self.update_status_bar("")
+                with self.batch_changes():
+                    for i, c in enumerate(new_name.ljust(10)[:10]):
+                        self.set_param(f'VNAM{i+1}', ord(c))
 
     def get_carrier_ops(self, alg_idx):
         return DX7_CARRIER_MAP[alg_idx] if 0 <= alg_idx < 32 else []
@@ -255,10 +269,12 @@ class VoiceEditorPanel(QWidget):
             return mapping.get(value, str(value))
         return str(value)
 
-    def _make_slider(self, value, min_val, max_val, slot, description, color, label=None, param_key=None):
+    def _make_slider(self, value, min_val, max_val, slot, description, color, label=None, param_key=None, op=None):
         if value is None:
             value = min_val
         slider = QSlider(Qt.Orientation.Vertical)
+        if param_key:
+            self._sliders[(op, param_key)] = slider
         slider.setMinimum(min_val)
         slider.setMaximum(max_val)
         slider.setPageStep(1)
@@ -267,6 +283,7 @@ class VoiceEditorPanel(QWidget):
         slider.setMinimumHeight(20)
         slider.setAttribute(Qt.WidgetAttribute.WA_Hover, True)
         slider.valueChanged.connect(slot)
+        slider.sliderReleased.connect(self.param_outbox.flush)
         def enterEvent(event, s=slider, d=description, k=param_key):
             val = s.value()
             label_val = self.get_value_label(k, val) if k else str(val)
@@ -286,6 +303,7 @@ class VoiceEditorPanel(QWidget):
             value_lbl = DraggableValueLabel(value, min_val, max_val, lambda v: self.get_value_label(param_key, v))
             value_lbl.setText(str(self.get_value_label(param_key, value)))
             value_lbl.valueChanged.connect(slider.setValue)
+            value_lbl.released.connect(self.param_outbox.flush)
             slider.valueChanged.connect(value_lbl.setValue)
             col.addWidget(value_lbl, alignment=Qt.AlignmentFlag.AlignHCenter)
             col.addWidget(slider, alignment=Qt.AlignmentFlag.AlignHCenter)
@@ -387,6 +405,10 @@ class VoiceEditorPanel(QWidget):
         topbar_layout.addWidget(self.status_bar, alignment=Qt.AlignmentFlag.AlignVCenter)
 
         topbar_layout.addStretch(3)
+        init_button = QPushButton("INIT")
+        init_button.setToolTip("Reset to the INIT voice and send it")
+        init_button.clicked.connect(self.init_voice)
+        topbar_layout.addWidget(init_button, alignment=Qt.AlignmentFlag.AlignVCenter)
 
         topbar_layout.addStretch(1)
         ch_col = QVBoxLayout()
@@ -397,6 +419,8 @@ class VoiceEditorPanel(QWidget):
         for i in range(1, 17):
             self.channel_combo.addItem(str(i))
         ch_col.addWidget(self.channel_combo, alignment=Qt.AlignmentFlag.AlignHCenter)
+        # Another channel may address another TG, whose selected operator is unknown
+        self.channel_combo.currentIndexChanged.connect(lambda _idx: setattr(self, '_selected_op', None))
         ch_lbl = QLabel("Channel")
         ch_lbl.setStyleSheet("font-size: 8pt; background: transparent;")
         ch_col.addWidget(ch_lbl, alignment=Qt.AlignmentFlag.AlignHCenter)
@@ -445,7 +469,7 @@ class VoiceEditorPanel(QWidget):
             operator_row_layout.addWidget(self._make_slider(
                 self.get_op_param(tg, 'TL'), 0, 99,
                 lambda v, o=tg: self.set_op_param(o, 'TL', v),
-                'Total Level', '#8ecae6', tl_short, param_key='TL'
+                'Total Level', '#8ecae6', tl_short, param_key='TL', op=tg
             ))
             # Insert separator between TL and PM
             operator_row_layout.addWidget(self._make_vline())
@@ -454,7 +478,7 @@ class VoiceEditorPanel(QWidget):
             operator_row_layout.addWidget(self._make_slider(
                 self.get_op_param(tg, 'PM'), 0, 1,
                 lambda v, o=tg: self.set_op_param(o, 'PM', v),
-                'Frequency Mode', '#8ecae6', pm_short, param_key='PM'
+                'Frequency Mode', '#8ecae6', pm_short, param_key='PM', op=tg
             ))
             # Add the rest of the frequency sliders (PC, PF, PD)
             for key, full_name, _short_lbl, max_val in OP_FREQ_DEFS:
@@ -464,7 +488,7 @@ class VoiceEditorPanel(QWidget):
                 operator_row_layout.addWidget(self._make_slider(
                     self.get_op_param(tg, key), 0, max_val,
                     lambda v, o=tg, k=key: self.set_op_param(o, k, v),
-                    full_name, '#8ecae6', short_label, param_key=key
+                    full_name, '#8ecae6', short_label, param_key=key, op=tg
                 ))
             operator_row_layout.addWidget(self._make_vline())
             # Add the rest of the level sliders (AMS, TS)
@@ -475,14 +499,14 @@ class VoiceEditorPanel(QWidget):
                 operator_row_layout.addWidget(self._make_slider(
                     self.get_op_param(tg, key), 0, max_val,
                     lambda v, o=tg, k=key: self.set_op_param(o, k, v),
-                    full_name, '#8ecae6', short_label, param_key=key
+                    full_name, '#8ecae6', short_label, param_key=key, op=tg
                 ))
             # Add RS (Rate Scaling) slider before AMS
             rs_short = self._vced_param_info.get('RS', {}).get('short', 'RS')
             operator_row_layout.addWidget(self._make_slider(
                 self.get_op_param(tg, 'RS'), 0, 7,
                 lambda v, o=tg: self.set_op_param(o, 'RS', v),
-                'Rate Scaling', '#8ecae6', rs_short, param_key='RS'
+                'Rate Scaling', '#8ecae6', rs_short, param_key='RS', op=tg
             ))
             operator_row_layout.addWidget(self._make_vline())
             # --- Remove EG Level, EG Rate, and Keyboard Scaling sliders ---
@@ -497,8 +521,14 @@ class VoiceEditorPanel(QWidget):
             def make_env_handler(op_idx):
                 def handler(rates, levels, send):
                     for i in range(4):
-                        self.set_op_param(op_idx, f'R{i+1}', int(rates[i]))
-                        self.set_op_param(op_idx, f'L{i+1}', int(levels[i]))
+                        # Only the dragged point changes; don't resend the others
+                        if self.get_op_param(op_idx, f'R{i+1}') != int(rates[i]):
+                            self.set_op_param(op_idx, f'R{i+1}', int(rates[i]))
+                        if self.get_op_param(op_idx, f'L{i+1}') != int(levels[i]):
+                            self.set_op_param(op_idx, f'L{i+1}', int(levels[i]))
+                    if send:
+                        # Mouse released: the final values go out now
+                        self.param_outbox.flush()
                 return handler
             env_widget.envelopeChanged.connect(make_env_handler(tg))
             # Connect labelHovered to show param info
@@ -540,13 +570,12 @@ class VoiceEditorPanel(QWidget):
             # Connect paramsChanged to MIDI update (robust closure for operator index)
             def make_ks_handler(op_idx):
                 def handler(bp, ld, rd, lc, rc):
-                    self.set_op_param(op_idx, 'BP', int(bp))
-                    self.set_op_param(op_idx, 'LD', int(ld))
-                    self.set_op_param(op_idx, 'RD', int(rd))
-                    self.set_op_param(op_idx, 'LC', int(lc))
-                    self.set_op_param(op_idx, 'RC', int(rc))
+                    for key, value in (('BP', bp), ('LD', ld), ('RD', rd), ('LC', lc), ('RC', rc)):
+                        if self.get_op_param(op_idx, key) != int(value):
+                            self.set_op_param(op_idx, key, int(value))
                 return handler
             ks_widget.paramsChanged.connect(make_ks_handler(tg))
+            ks_widget.editFinished.connect(self.param_outbox.flush)
             # Connect labelHovered to show param info
             def make_ks_label_hovered(op_idx):
                 def handler(param_key):
@@ -795,15 +824,10 @@ class VoiceEditorPanel(QWidget):
 
     def on_algorithm_changed(self, idx):
         print(f"[DEBUG] on_algorithm_changed called with idx={idx}")
+        # set_param() sends the change
         self.set_param('ALS', idx)
         self.update_operator_bg_colors()
         self.update_svg_overlay(resize_only=False)
-        param_num = self._get_param_num('ALS')
-        print(f"[DEBUG] _get_param_num('ALS') returned {param_num}")
-        if param_num is not None:
-            self.send_sysex('ALS', idx, param_num)
-        else:
-            print("[DEBUG] No param_num for 'ALS', SysEx not sent.")
 
     def get_patch_name(self):
         name = ''
@@ -813,8 +837,9 @@ class VoiceEditorPanel(QWidget):
         return name.strip()
 
     def on_name_changed(self, text):
-        for i, c in enumerate(text.ljust(10)[:10]):
-            self.set_param(f'VNAM{i+1}', ord(c))
+        with self.batch_changes():
+            for i, c in enumerate(text.ljust(10)[:10]):
+                self.set_param(f'VNAM{i+1}', ord(c))
         if not self.status_bar.text() or self.status_bar.text() == self.get_patch_name():
             self.update_status_bar("")
 
@@ -827,20 +852,25 @@ class VoiceEditorPanel(QWidget):
         return default
 
     def set_param(self, key, value):
+        old = self.params.get(key)
         self.params[key] = value
         param_num = self._get_param_num(key)
         if param_num is not None:
-            self.send_sysex(key, value, param_num)
+            self._queue_change((None, param_num), key, value, old)
+        elif self._batch_depth and key.startswith('VNAM') and key[4:].isdigit() and value != old:
+            # The name has no parameter change message; only a voice dump carries it
+            self._dump_required = True
 
     def set_op_param(self, op, key, value):
         if 'operators' not in self.params or not isinstance(self.params['operators'], list):
             self.params['operators'] = [{} for _ in range(self.op_count)]
         elif len(self.params['operators']) < self.op_count:
             self.params['operators'] += [{} for _ in range(self.op_count - len(self.params['operators']))]
+        old = self.params['operators'][op].get(key)
         self.params['operators'][op][key] = value
         param_num = self._get_operator_param_num(op, key)
         if param_num is not None:
-            self.send_sysex(key, value, param_num, op_idx=op)
+            self._queue_change((op, param_num), key, value, old)
         # Update envelope widget if key is R1-R4 or L1-L4
         if key in [f'R{i+1}' for i in range(4)] or key in [f'L{i+1}' for i in range(4)]:
             self._update_env_widget_for_operator(op)
@@ -848,14 +878,125 @@ class VoiceEditorPanel(QWidget):
         if key in ['BP', 'LD', 'RD', 'LC', 'RC']:
             self._update_ks_widget_for_operator(op)
 
+    def _queue_change(self, outbox_key, key, value, old):
+        if self._batch_depth:
+            if value != old:
+                self._dirty[outbox_key] = (key, value)
+        else:
+            self.param_outbox.post(outbox_key, (key, value))
+
+    @contextmanager
+    def batch_changes(self):
+        """
+        Collect the parameter changes made inside the block and send them on exit
+        either one by one or as a single voice dump, whichever is fewer bytes.
+        """
+        if self._batch_depth == 0:
+            self.param_outbox.flush()
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._commit_dirty()
+
+    def _individual_cost(self, changes):
+        # Each change is one message, plus an Operator Select whenever the operator differs
+        size = 0
+        selected = self._selected_op
+        for op_idx, _param_num in changes:
+            if op_idx is not None and op_idx != selected:
+                size += PARAM_CHANGE_SIZE
+                selected = op_idx
+            size += PARAM_CHANGE_SIZE
+        return size
+
+    def _commit_dirty(self):
+        dirty, self._dirty = self._dirty, {}
+        dump_required, self._dump_required = self._dump_required, False
+        if not dirty and not dump_required:
+            return
+        # Globals first, then grouped by operator, so each operator is selected once
+        changes = sorted(dirty, key=lambda k: (k[0] is not None, k[0] or 0, k[1]))
+        individual = self._individual_cost(changes)
+        if dump_required:
+            self.send_voice_dump()
+            self.update_status_bar(f"Voice dump: {VOICE_SYSEX_SIZE} B (name changed)")
+        elif VOICE_SYSEX_SIZE < individual:
+            self.send_voice_dump()
+            self.wire_bytes_saved += individual - VOICE_SYSEX_SIZE
+            self.update_status_bar(f"Voice dump: {VOICE_SYSEX_SIZE} B for {len(changes)} changes, {individual - VOICE_SYSEX_SIZE} B saved")
+        else:
+            for outbox_key in changes:
+                self._send_param(outbox_key, dirty[outbox_key])
+            self.wire_bytes_saved += VOICE_SYSEX_SIZE - individual
+            self.update_status_bar(f"{len(changes)} changes: {individual} B, {VOICE_SYSEX_SIZE - individual} B less than a dump")
+        print(f"[VOICE EDITOR PANEL] {len(changes)} changes, {individual} B individually; {self.wire_bytes_saved} B saved so far")
+
+    def send_voice_dump(self):
+        """Send the whole voice as a VCED single voice dump (163 bytes with checksum)."""
+        ch = self.channel_combo.currentIndex()
+        if self.midi_handler:
+            self.midi_handler.send_sysex(list(single_voice_sysex(encode_vced_params(self.params), ch)))
+        else:
+            print("[VOICE EDITOR PANEL] midi_handler not set, cannot send SysEx.")
+
+    def load_voice(self, voice_bytes, send=False):
+        """
+        Show another voice in the panel. With send=True the differences to the
+        current voice are also sent to the synth (see batch_changes()).
+        """
+        decoder = SingleVoiceDumpDecoder(voice_bytes)
+        if not decoder.params:
+            return
+        self.param_outbox.discard()
+        self.voice_bytes = voice_bytes
+        self.decoder = decoder
+        with self.batch_changes():
+            new_params = decoder.params
+            for op, op_params in enumerate(new_params.get('operators', [])[:self.op_count]):
+                for key, value in op_params.items():
+                    self.set_op_param(op, key, value)
+            for key, value in new_params.items():
+                if key != 'operators':
+                    self.set_param(key, value)
+            if not send:
+                self._dirty.clear()
+                self._dump_required = False
+            self.refresh_controls()
+
+    def refresh_controls(self):
+        # Show the current parameters; values are already set, so nothing is queued for sending
+        for (op, key), slider in self._sliders.items():
+            value = self.get_param(key) if op is None else self.get_op_param(op, key)
+            if value is not None and slider.value() != value:
+                slider.setValue(value)
+        for op in range(self.op_count):
+            self._update_env_widget_for_operator(op)
+            self._update_ks_widget_for_operator(op)
+        if self.alg_combo.currentIndex() != self.get_param('ALS', 0):
+            self.alg_combo.setCurrentIndex(self.get_param('ALS', 0))
+        self.update_status_bar("")
+
+    def init_voice(self):
+        self.load_voice(self.init_patch_bytes(), send=True)
+
+    def _send_param(self, outbox_key, item):
+        op_idx, param_num = outbox_key
+        key, value = item
+        self.send_sysex(key, value, param_num, op_idx=op_idx)
+
     def send_sysex(self, key, value, param_num, op_idx=None):
         print(f"[DEBUG] send_sysex called with key={key}, value={value}, param_num={param_num}, op_idx={op_idx}")
         ch = self.channel_combo.currentIndex()  # 0-indexed for MIDI
-        # If this is an operator parameter, send an Operator Select message first
-        if op_idx is not None:
+        # If this is an operator parameter, send an Operator Select message first,
+        # unless that operator is already selected
+        if op_idx is not None and op_idx != self._selected_op:
             sel_msg = [0xF0, 0x43, 0x10 | (ch & 0x0F), 0x00, 0x15, op_idx, 0xF7]
             if self.midi_handler:
                 self.midi_handler.send_sysex(sel_msg)
+                self._selected_op = op_idx
         if param_num is not None and value is not None:
             if 0 <= param_num <= 155:
                 group = 0x00
@@ -906,41 +1047,8 @@ class VoiceEditorPanel(QWidget):
         self.op_ks_widgets[widget_idx].set_params(50, 50, 50, 0, 0)
 
     def init_patch_bytes(self):
-        # Returns 161 bytes for an INIT patch (all params default, name 'INIT PATCH')
-        # See DX7 parameter order and default values from the provided table
-        data = [0xF0, 0x43, 0x00, 0x09, 0x20]
-        # Operator parameters (6 operators, each 21 bytes)
-        op_defaults = [
-            # R1, R2, R3, R4, L1, L2, L3, L4, LD, RD, LC, RC, RS, TL, AMS, TS, PM, PC, PF, PD, BP
-            99, 99, 99, 99, 99, 99, 99, 0, 99, 99, 0, 0, 0, 99, 0, 0, 0, 1, 0, 7, 39
-        ]
-        # The DX7 stores operator data in reverse order: OP6, OP5, ..., OP1
-        for _ in range(6):
-            data.extend(op_defaults)
-        # PEG (Pitch EG) rates and levels
-        data.extend([99, 99, 99, 99])  # PR1-PR4
-        data.extend([99, 99, 99, 99])  # PL1-PL4
-        # Algorithm selector
-        data.append(0)  # ALS
-        # Feedback level
-        data.append(0)  # FBL
-        # Oscillator phase init
-        data.append(0)  # OPI
-        # LFO
-        data.extend([35, 0, 0, 0, 0, 0, 0, 0, 0, 24])  # LFS, LFD, LPMD, LAMD, LFKS, LFW, LPMS, TRNP
-        # Voice name (10 chars, ASCII)
-        name = b'INIT PATCH'
-        for i in range(10):
-            data.append(name[i] if i < len(name) else 32)
-        # Operator enable (OPSEL): all enabled (0b111111 = 63)
-        data.append(63)
-        # Operator select (OPSEL): 0
-        data.append(0)
-        # Pad to 155 bytes if needed
-        while len(data) < 160:
-            data.append(0)
-        data.append(0xF7)
-        return bytes(data)
+        # 163-byte single voice dump (with checksum) of the DX7 INIT voice, named 'INIT PATCH'
+        return single_voice_sysex(encode_vced_params(init_voice_params()))
 
     def get_lcd_widget(self):
         return self.lcd_number
@@ -1005,10 +1113,7 @@ class VoiceEditorPanelDialog(QDialog):
             if midi_outport is not None:
                 panel.midi_outport = midi_outport
             if voice_bytes is not None:
-                panel.voice_bytes = voice_bytes
-                panel.decoder = SingleVoiceDumpDecoder(voice_bytes)
-                panel.decoder.decode()
-                panel.params = panel.decoder.params
+                panel.load_voice(voice_bytes)
             cls._instance.raise_()
             cls._instance.activateWindow()
             cls._instance.show()
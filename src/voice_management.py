@@ -28,9 +28,9 @@ def select_voice_dialog(table, main_window, row, col):
     if channel_index is not None and hasattr(dlg, "channel_combo"):
         dlg.channel_combo.setCurrentIndex(channel_index)
     def on_voice_selected():
-        idx = dlg.list_widget.currentRow()
-        if idx >= 0 and idx < len(dlg.filtered_voices):
-            voice = dlg.filtered_voices[idx]
+        idx = dlg.current_row()
+        voice = dlg.voice_at(idx)
+        if voice is not None:
             name = voice['name']
             midi_channel_row = PERFORMANCE_FIELDS.index("MIDIChannel")
             for c in range(8):
@@ -54,7 +54,7 @@ def select_voice_dialog(table, main_window, row, col):
                     btn = table.cellWidget(PERFORMANCE_FIELDS.index("Voice"), c)
                     if isinstance(btn, QPushButton):
                         btn.setText(name)
-    dlg.list_widget.itemDoubleClicked.connect(lambda _: on_voice_selected())
+    dlg.list_view.doubleClicked.connect(lambda _: on_voice_selected())
     dlg.show()
     dlg.raise_()
     dlg.activateWindow()
@@ -0,0 +1,111 @@
+from collections import deque
+from PySide6.QtCore import QObject, QTimer
+from download_service import PRIORITY_PREFETCH
+
+DEFAULT_RADIUS = 4         # Voices before and after the clicked one
+DEFAULT_RATE = 8           # Requests started per second
+DEFAULT_MAX_OUTSTANDING = 2
+
+class VoicePrefetcher(QObject):
+    """
+    Warms the download cache with voices the user is likely to click next.
+    schedule() replaces the current plan (queued URLs that are no longer wanted
+    are cancelled); a timer then starts at most `rate` low priority downloads per
+    second with at most `max_outstanding` in flight, so prefetching never competes
+    with user clicks or saturates patches.fm.
+    record_click() counts whether a clicked voice had been prefetched and is still
+    in the cache, which is the number to look at when tuning the radius.
+    """
+    def __init__(self, service, url_builders, cache=None, radius=DEFAULT_RADIUS,
+                 rate=DEFAULT_RATE, max_outstanding=DEFAULT_MAX_OUTSTANDING, parent=None):
+        super().__init__(parent)
+        self.service = service
+        self.url_builders = url_builders  # Functions mapping a voice signature to URLs to warm
+        self.cache = cache
+        self.radius = radius
+        self.max_outstanding = max_outstanding
+        self._queue = deque()
+        self._outstanding = {}
+        self._prefetched = set()  # URLs this prefetcher downloaded or found cached
+        self._timer = QTimer(self)
+        self._timer.setInterval(max(1, int(1000 / rate)))
+        self._timer.timeout.connect(self._tick)
+        self.issued = 0
+        self.completed = 0
+        self.hits = 0
+        self.misses = 0
+
+    def schedule(self, voice_at, center=None, visible=()):
+        """Plan prefetches for the neighbours of row center and the visible rows; voice_at(row) returns a voice or None."""
+        rows = []
+        if center is not None:
+            for distance in range(1, self.radius + 1):
+                rows.extend((center + distance, center - distance))
+        rows.extend(visible)
+        urls = []
+        seen = set()
+        for row in rows:
+            voice = voice_at(row)
+            sig = voice.get('signature') if voice else None
+            if not sig:
+                continue
+            for build in self.url_builders:
+                url = build(sig)
+                if url in seen:
+                    continue
+                seen.add(url)
+                if self._cached(url):
+                    continue
+                urls.append(url)
+        # Cancel in-flight requests that are no longer part of the plan
+        for url in [u for u in self._outstanding if u not in seen]:
+            self._outstanding.pop(url).cancel()
+        self._queue = deque(u for u in urls if u not in self._outstanding)
+        if self._queue and not self._timer.isActive():
+            self._timer.start()
+
+    def _tick(self):
+        if not self._queue:
+            self._timer.stop()
+            return
+        if len(self._outstanding) >= self.max_outstanding:
+            return
+        url = self._queue.popleft()
+        def done(_result, error, url=url):
+            self._outstanding.pop(url, None)
+            if error is None:
+                self._prefetched.add(url)
+                self.completed += 1
+        self._outstanding[url] = self.service.fetch(url, done, PRIORITY_PREFETCH)
+        self.issued += 1
+
+    def _cached(self, url):
+        # The cache may have evicted a prefetched file since; forget those
+        if self.cache is None:
+            return url in self._prefetched
+        if self.cache.contains(url):
+            self._prefetched.add(url)
+            return True
+        self._prefetched.discard(url)
+        return False
+
+    def record_click(self, url):
+        if url in self._prefetched and self._cached(url):
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    @property
+    def hit_rate(self):
+        clicks = self.hits + self.misses
+        return self.hits / clicks if clicks else 0.0
+
+    def stats_text(self):
+        return f"Prefetch: {self.hit_rate * 100:.0f}% of {self.hits + self.misses} clicks"
+
+    def cancel(self):
+        self._timer.stop()
+        self._queue.clear()
+        for request in self._outstanding.values():
+            request.cancel()
+        self._outstanding.clear()
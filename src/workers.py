@@ -5,15 +5,23 @@ import sys
 import queue
 from dialogs import Dialogs
 from file_utils import FileUtils
+from midi_player import MidiPlayer
+from playback_cache import get_playback_cache
+from midi_input import MAX_BATCH, UI_INTERVAL
+from syslog_log import RotatingLogFile, parse_syslog_line, syslog_spill_path
+
+LOG_INTERVAL = 20  # Milliseconds between status updates while messages keep coming
+SYSLOG_BATCH_INTERVAL = 0.016  # Seconds of syslog datagrams collected into one batch (one frame)
 
 class MIDIReceiveWorker(QThread):
+    """
+    Dispatcher for MIDI input. The input callbacks only push raw bytes into
+    midi_handler.input_ring; this thread drains it in batches, lets the handler route
+    each message to thru forwarding and SysEx handling right away, and hands the
+    messages to the UI with one messages_received signal per UI_INTERVAL at most.
+    """
     log = Signal(str)
-    # Signals for different MIDI message types
-    sysex_received = Signal(list)
-    note_on_received = Signal(object)
-    note_off_received = Signal(object)
-    control_change_received = Signal(object)
-    other_message_received = Signal(object)
+    messages_received = Signal(list)  # (timestamp, raw MIDI bytes) received since the last emit
 
     def __init__(self, midi_handler):
         super().__init__()
@@ -22,80 +30,87 @@ class MIDIReceiveWorker(QThread):
 
     def run(self):
         print("[MIDI LOG] MIDIReceiveWorker.run started")
-        import logging
-        logging.debug('MIDIReceiveWorker.run: started')
-        inport = self.midi_handler.inport
-        if inport is None or getattr(inport, 'closed', True):
-            print(f"[MIDI LOG] No MIDI input port open or port is closed. Inport: {inport}")
-            self.log.emit("No MIDI input port open or port is closed.")
-            logging.debug(f'MIDIReceiveWorker.run: no open inport ({inport}), exiting')
-            return
-        print(f"[MIDI LOG] MIDIReceiveWorker using inport: {inport}")
-        try:
-            for msg in inport:
-                if not self.running:
-                    logging.debug('MIDIReceiveWorker.run: self.running is False, breaking loop')
-                    break
-                # Log every received MIDI message
-                print(f"[MIDI LOG] Incoming: {msg}")
-                self.log.emit(f"Received MIDI: {msg}")
-                if msg.type == 'sysex':
-                    self.sysex_received.emit(list(msg.data))
-                elif msg.type == 'note_on':
-                    self.note_on_received.emit(msg)
-                elif msg.type == 'note_off':
-                    self.note_off_received.emit(msg)
-                elif msg.type == 'control_change':
-                    self.control_change_received.emit(msg)
-                else:
-                    self.other_message_received.emit(msg)
-        except Exception as e:
-            print(f"[MIDI LOG] Exception in MIDIReceiveWorker.run: {e}")
-            self.log.emit(f"MIDI receive error: {e}")
-            logging.debug(f'MIDIReceiveWorker.run: exception {e}')
-        logging.debug('MIDIReceiveWorker.run: exiting')
+        ring = self.midi_handler.input_ring
+        pending = []
+        last_emit = 0.0
+        while self.running:
+            # Wake up on new input, or when a held back UI batch is due
+            ring.ready.wait(UI_INTERVAL if pending else 0.5)
+            ring.ready.clear()
+            try:
+                batch = ring.pop_batch(MAX_BATCH)
+                while batch:
+                    pending.extend(self.midi_handler.dispatch_input(batch))
+                    batch = ring.pop_batch(MAX_BATCH)
+            except Exception as e:
+                print(f"[MIDI LOG] Exception in MIDIReceiveWorker.run: {e}")
+                self.log.emit(f"MIDI receive error: {e}")
+            now = time.monotonic()
+            if pending and now - last_emit >= UI_INTERVAL:
+                self.messages_received.emit(pending)
+                pending = []
+                last_emit = now
+        if ring.dropped:
+            print(f"[MIDI LOG] MIDI input ring overflowed, {ring.dropped} chunks dropped")
 
     def stop(self):
-        import logging
-        logging.debug('MIDIReceiveWorker.stop: called')
         self.running = False
-        # Try to close the MIDI input port to unblock the thread
-        if hasattr(self.midi_handler, 'inport') and self.midi_handler.inport:
-            try:
-                self.midi_handler.inport.close()
-                logging.debug('MIDIReceiveWorker.stop: inport closed')
-            except Exception as e:
-                logging.debug(f'MIDIReceiveWorker.stop: error closing inport: {e}')
-        else:
-            logging.debug('MIDIReceiveWorker.stop: no inport to close')
-        # Wait for thread to finish, but timeout after 2 seconds
-        finished = self.wait(2000)
-        if finished:
-            logging.debug('MIDIReceiveWorker.stop: finished cleanly')
-        else:
-            logging.debug('MIDIReceiveWorker.stop: did not finish, forcing terminate')
+        self.midi_handler.input_ring.ready.set()
+        if not self.wait(2000):
             self.terminate()
             self.wait()
-            logging.debug('MIDIReceiveWorker.stop: forcibly terminated')
 
 class LogWorker(QThread):
-    log = Signal(str)
+    """
+    Delivers status messages from any thread to the GUI. The thread blocks on a
+    queue until a message arrives, then takes everything queued, collapses runs of
+    the same message into one line and emits the batch as a single log_batch.
+    """
+    log_batch = Signal(list)
     def __init__(self):
         super().__init__()
-        self.messages = []
+        self.messages = queue.SimpleQueue()
         self.running = True
     def run(self):
         while self.running:
-            if self.messages:
-                msg = self.messages.pop(0)
-                self.log.emit(msg)
-            self.msleep(100)
+            msg = self.messages.get()
+            batch = []
+            while msg is not None:
+                batch.append(msg)
+                try:
+                    msg = self.messages.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self.log_batch.emit(collapse_repeats(batch))
+            if msg is None:
+                break
+            # Let a burst pile up for a moment instead of emitting per message
+            self.msleep(LOG_INTERVAL)
     def add_message(self, msg):
-        self.messages.append(msg)
+        self.messages.put(msg)
     def stop(self):
         self.running = False
+        self.messages.put(None)
         self.wait()
 
+def collapse_repeats(messages):
+    collapsed = []
+    last = None
+    count = 0
+    for msg in messages:
+        if msg == last:
+            count += 1
+            continue
+        if count > 1:
+            collapsed[-1] = f"{last} (repeated {count} times)"
+        collapsed.append(msg)
+        last = msg
+        count = 1
+    if count > 1:
+        collapsed[-1] = f"{last} (repeated {count} times)"
+    return collapsed
+
 class MidiSendWorker(QThread):
     log = Signal(str)
     finished = Signal()
@@ -105,18 +120,17 @@ class MidiSendWorker(QThread):
         self.midi_file = midi_file
         self._stop = False
     def run(self):
-        start_time = time.time()
-        for msg in self.midi_file.play():
-            if self._stop:
-                self.log.emit("MIDI sending stopped by user.")
-                break
+        schedule = get_playback_cache().schedule(self.midi_file)
+        if hasattr(self.midi_outport, 'send_sysex'):
             # Use the global MIDIHandler send_sysex if available
-            if hasattr(self.midi_outport, 'send_sysex'):
-                self.midi_outport.send_sysex(msg.bytes())
-            else:
-                self.midi_outport.send(msg)
-        elapsed = time.time() - start_time
-        self.log.emit(f"MIDI file sent in {elapsed:.2f} seconds.")
+            send = lambda msg: self.midi_outport.send_sysex(msg.bytes())
+        else:
+            send = self.midi_outport.send
+        player = MidiPlayer(send, lambda: self._stop)
+        stats = player.play(schedule)
+        if player.stopped:
+            self.log.emit("MIDI sending stopped by user.")
+        self.log.emit(f"MIDI file sent in {stats.elapsed:.2f} seconds ({stats.summary()}).")
         self.finished.emit()
     def stop(self):
         self._stop = True
@@ -130,21 +144,25 @@ class UdpMidiSendWorker(QThread):
         self.midi_file = midi_file
         self._stop = False
     def run(self):
-        start_time = time.time()
-        for msg in self.midi_file.play():
-            if self._stop:
-                self.log.emit("MIDI sending stopped by user.")
-                break
-            if hasattr(msg, 'bytes'):
-                self.midi_handler.send_mido_message(msg)
-        elapsed = time.time() - start_time
-        self.log.emit(f"MIDI file sent in {elapsed:.2f} seconds.")
+        schedule = get_playback_cache().schedule(self.midi_file)
+        player = MidiPlayer(self.midi_handler.send_mido_message, lambda: self._stop, self.midi_handler.flush_udp)
+        stats = player.play(schedule)
+        if player.stopped:
+            self.log.emit("MIDI sending stopped by user.")
+        self.log.emit(f"MIDI file sent in {stats.elapsed:.2f} seconds ({stats.summary()}).")
         self.finished.emit()
     def stop(self):
         self._stop = True
 
 class SyslogWorker(QThread):
-    syslog_message = Signal(str)
+    """
+    Receives syslog datagrams and emits them parsed, (time, index, ip, service, message)
+    per line, in batches: after the first datagram, everything arriving within
+    SYSLOG_BATCH_INTERVAL (one display frame) goes into the same syslog_batch, so the
+    table gets one insert per frame even when a device floods the log. With
+    spill_enabled every line is also appended to a rotating file on disk.
+    """
+    syslog_batch = Signal(list)
     log = Signal(str)
     def __init__(self, host='0.0.0.0', port=8514):
         super().__init__()
@@ -152,6 +170,8 @@ class SyslogWorker(QThread):
         self.port = port
         self.running = True
         self.start_time = None
+        self.spill_enabled = False
+        self._spill = None
     def run(self):
         try:
             server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -163,21 +183,42 @@ class SyslogWorker(QThread):
             self.log.emit(f"Syslog server listening on {socket.gethostbyname(socket.gethostname())}:{self.port}")
             while self.running:
                 try:
-                    data, address = server.recvfrom(1024)
-                    self.handle_message(data)
+                    data, address = server.recvfrom(65535)
                 except socket.timeout:
                     continue
                 except Exception as e:
                     self.log.emit(f"Syslog error: {e}")
+                    continue
+                lines = []
+                self._add_line(data, lines)
+                deadline = time.monotonic() + SYSLOG_BATCH_INTERVAL
+                try:
+                    while (remaining := deadline - time.monotonic()) > 0:
+                        server.settimeout(remaining)
+                        data, address = server.recvfrom(65535)
+                        self._add_line(data, lines)
+                except socket.timeout:
+                    pass
+                except Exception as e:
+                    self.log.emit(f"Syslog error: {e}")
+                server.settimeout(0.5)
+                if lines:
+                    self._write_spill(lines)
+                    self.syslog_batch.emit([parse_syslog_line(line) for line in lines])
             server.close()
+            self._write_spill([])
             self.log.emit("Syslog server stopped.")
         except Exception as e:
             Dialogs.show_error(None, "Syslog Error", str(e))
             self.log.emit(f"Syslog error: {e}")
-    def handle_message(self, data):
+    def _add_line(self, data, lines):
+        line = self.format_message(data)
+        if line is not None:
+            lines.append(line)
+    def format_message(self, data):
         message = data[2:].decode('utf-8', errors='replace').strip()
         if "Time exceeded (0)" in message:
-            return
+            return None
         if self.start_time is None:
             self.start_time = time.time()
             relative_time = "0:00:00.000"
@@ -188,7 +229,22 @@ class SyslogWorker(QThread):
             seconds = int(elapsed_time % 60)
             milliseconds = int((elapsed_time % 1) * 1000)
             relative_time = f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
-        self.syslog_message.emit(f"{relative_time} {message}")
+        return f"{relative_time} {message}"
+    def _write_spill(self, lines):
+        # The file is only opened and closed here, in the worker thread
+        if self.spill_enabled and self.running:
+            try:
+                if self._spill is None:
+                    self._spill = RotatingLogFile(syslog_spill_path())
+                    self.log.emit(f"Writing syslog to {self._spill.path}")
+                if lines:
+                    self._spill.write_lines(lines)
+            except OSError as e:
+                self.log.emit(f"Syslog file error: {e}")
+                self.spill_enabled = False
+        elif self._spill is not None:
+            self._spill.close()
+            self._spill = None
     def stop(self):
         self.running = False
         self.wait()
@@ -267,3 +323,35 @@ class FirewallCheckWorker(QThread):
         from windows_firewall_checker import WindowsFirewallChecker
         has_rule, current_profile, rule_profiles, enabled_profiles, disabled_profiles, has_block = WindowsFirewallChecker.check_firewall_rule(verbose=True)
         self.result.emit(has_rule, current_profile, rule_profiles, enabled_profiles, disabled_profiles, has_block)
+
+if __name__ == "__main__":
+    # Benchmark: status message backlog latency at 10000 messages per second
+    import threading
+    from PySide6.QtCore import QCoreApplication, QTimer
+    app = QCoreApplication(sys.argv)
+    worker = LogWorker()
+    latencies = []
+    delivered = [0]
+    def on_batch(messages):
+        now = time.perf_counter()
+        for msg in messages:
+            delivered[0] += 1
+            latencies.append(now - float(msg.split()[1]))
+    worker.log_batch.connect(on_batch)
+    worker.start()
+    rate, seconds = 10000, 3
+    def produce():
+        start = time.perf_counter()
+        for i in range(rate * seconds):
+            due = start + i / rate
+            while time.perf_counter() < due:
+                pass
+            worker.add_message(f"msg {time.perf_counter()} {i}")
+    threading.Thread(target=produce, daemon=True).start()
+    QTimer.singleShot(seconds * 1000 + 500, app.quit)
+    app.exec()
+    worker.stop()
+    latencies.sort()
+    print(f"{delivered[0]} of {rate * seconds} messages delivered, backlog latency median "
+          f"{latencies[len(latencies) // 2] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+    print(f"Polling one message per 100 ms would have needed {rate * seconds / 10:.0f} s to drain the backlog")